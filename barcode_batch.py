@@ -0,0 +1,290 @@
+import os
+import json
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from ocr_engine import BarcodeEngine
+from expected_store import ExpectedValueIndex
+from result_cache import config_digest, cache_key
+from image_decode import content_digest
+
+
+# ==================================================
+# PER-IMAGE WORK (shared by pool workers and callers)
+# ==================================================
+def load_expected(recipe):
+    """
+    Expected values for a recipe
+    - "expected_index_path": CSV / JSON list of valid values
+    - otherwise the single "expected_value"
+    """
+    path = recipe.get("expected_index_path")
+    if path:
+        return ExpectedValueIndex.load(path)
+    value = recipe.get("expected_value", "").strip()
+    return ExpectedValueIndex([value] if value else [])
+
+
+def decode_file(engine, path, recipe):
+    """
+    Read, preprocess and decode one image file
+    - returns (raws, rung); raws is None when the file can't be read
+    - raws are the undecorated barcode strings, the cacheable part
+    """
+    img = engine.read_image(path)
+    if img is None:
+        return None, None
+
+    img = engine.apply_recipe(img, recipe)
+    before = dict(engine.ladder_stats)
+    result, _ = engine.decode(img)
+    rung = next(
+        (k for k, v in engine.ladder_stats.items() if v != before.get(k)),
+        None
+    )
+    return engine.raw_values(result), rung
+
+
+def make_entry(engine, path, raws, expected):
+    """
+    Judge decoded strings; the entry matches the barcode_results.json schema
+    """
+    status, values = engine.verdict_values(raws, expected)
+    return {
+        "image": os.path.basename(path),
+        "values": values,
+        "status": status
+    }
+
+
+def process_file(engine, path, recipe, expected=None):
+    """
+    decode_file + make_entry in the calling thread
+    - returns (entry, rung); entry is None when the file can't be read
+    """
+    raws, rung = decode_file(engine, path, recipe)
+    if raws is None:
+        return None, None
+    if expected is None:
+        expected = load_expected(recipe)
+    return make_entry(engine, path, raws, expected), rung
+
+
+_worker_engine = None
+_worker_recipe = None
+
+
+def _init_worker(recipe, pack=None):
+    global _worker_engine, _worker_recipe
+    _worker_engine = BarcodeEngine()
+    _worker_engine.configure(recipe)
+    if pack is not None:
+        # Each worker maps the same pack; the pages are shared
+        from packed_dataset import PackedDataset
+        _worker_engine.decoder = PackedDataset(pack, color_out=False)
+    _worker_recipe = recipe
+
+
+def _decode_path(path):
+    return decode_file(_worker_engine, path, _worker_recipe)
+
+
+# ==================================================
+# INCREMENTAL JSON
+# ==================================================
+class JsonArrayWriter:
+    """
+    Append entries to a JSON array file
+    - the file is a valid JSON array after every append
+    - same layout as json.dump(..., indent=4)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.f = open(path, "wb")
+        self.f.write(b"[]")
+        self.f.flush()
+
+    def append(self, entry):
+        body = json.dumps(entry, indent=4)
+        body = "\n".join("    " + line for line in body.splitlines())
+        sep = "\n" if self.count == 0 else ",\n"
+
+        # Overwrite the closing "]" (or "\n]" once there are entries)
+        self.f.seek(-1 if self.count == 0 else -2, os.SEEK_END)
+        self.f.write((sep + body + "\n]").encode("utf-8"))
+        self.f.flush()
+        self.count += 1
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+# ==================================================
+# PROCESS-POOL EXECUTOR
+# ==================================================
+class BarcodeBatchExecutor:
+    """
+    Decode a folder on a process pool
+    - one engine per worker process, built from the recipe
+    - results come back in input order through on_result
+    - pause stops submitting (in-flight images still finish), stop cancels
+    - with a ResultCache, images already decoded under the same content,
+      config and engine are not decoded again; byte-identical files in
+      one run are decoded once
+    - pack: a PackedDataset directory the workers read instead of the files
+    """
+
+    def __init__(self, recipe, workers=None, window=None, cache=None, pack=None):
+        self.recipe = dict(recipe)
+        self.pack = pack
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window or self.workers * 4
+        self.cache = cache
+
+        # Verdicts are computed here, so cached decodes follow new rules
+        self.engine = BarcodeEngine()
+        self.engine.configure(self.recipe)
+        self.expected = load_expected(self.recipe)
+
+        # Pack pixels were decoded with the pack's settings, not the files'
+        decode = None
+        if pack is not None:
+            from packed_dataset import PackedDataset
+            decode = PackedDataset(pack).describe()
+        self.cfg_digest = config_digest(
+            self.recipe if decode is None else {**self.recipe, "decode": decode}
+        )
+
+        self.ladder_stats = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.run_duplicates = 0
+
+        self._resume = threading.Event()
+        self._resume.set()
+        self._stop = threading.Event()
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def stop(self):
+        self._stop.set()
+        self._resume.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _key(self, path):
+        if self.cache is None:
+            return None
+        try:
+            digest = content_digest(path)
+        except OSError:
+            return None
+        return cache_key(digest, self.cfg_digest, self.engine.engine_id)
+
+    def _submit(self, pool, path, memo, leaders):
+        """
+        Queue one path; returns (path, key, future-or-None)
+        - None future: answered from the cache or by an earlier identical file
+        """
+        key = self._key(path)
+        if key is None:
+            return path, None, pool.submit(_decode_path, path)
+
+        if key in memo or key in leaders:
+            self.run_duplicates += 1
+            return path, key, None
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            memo[key] = cached
+            return path, key, None
+
+        self.cache_misses += 1
+        leaders.add(key)
+        return path, key, pool.submit(_decode_path, path)
+
+    def run(self, paths, on_result, on_progress=None, on_error=None):
+        total = len(paths) if hasattr(paths, "__len__") else 0
+        done = 0
+        pending = deque()
+        source = iter(paths)
+        exhausted = False
+
+        memo = {}       # key -> raws decoded (or cached) in this run
+        leaders = set() # keys currently being decoded
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.recipe, self.pack)
+        )
+
+        try:
+            while not self._stop.is_set():
+                if self._resume.is_set():
+                    while not exhausted and len(pending) < self.window:
+                        path = next(source, None)
+                        if path is None:
+                            exhausted = True
+                            break
+                        pending.append(self._submit(pool, path, memo, leaders))
+
+                if not pending:
+                    if exhausted:
+                        break
+                    self._resume.wait(0.1)
+                    continue
+
+                path, key, fut = pending[0]
+                raws, rung = None, None
+
+                if fut is None:
+                    # Leaders sit earlier in the FIFO, so memo is filled by now
+                    raws = memo.get(key)
+                else:
+                    try:
+                        raws, rung = fut.result(timeout=0.1)
+                    except TimeoutError:
+                        continue
+                    except Exception as e:
+                        if on_error:
+                            on_error(path, e)
+
+                    if key is not None:
+                        leaders.discard(key)
+                        memo[key] = raws
+                        # A budget exit is a timing accident, not a verdict on
+                        # the image; only reads and full-ladder misses are kept
+                        if raws is not None and rung != "budget":
+                            self.cache.put(key, raws)
+                pending.popleft()
+
+                if rung:
+                    self.ladder_stats[rung] = self.ladder_stats.get(rung, 0) + 1
+
+                done += 1
+                if raws is not None:
+                    on_result(path, make_entry(self.engine, path, raws, self.expected))
+                if on_progress:
+                    on_progress(done, total)
+        finally:
+            for _, _, fut in pending:
+                if fut is not None:
+                    fut.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+            if self.cache is not None:
+                self.cache.flush()
+
+        return done
@@ -1,6 +1,7 @@
 import cv2
 import json
 import os
+import time
 
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QFileDialog,
@@ -12,6 +13,12 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 from camera.mv_camera import MVCamera
 from ocr_engine import BarcodeEngine
+from part_voting import PartVoter, PartPresence, SceneChangeDetector, PartCounter
+from expected_store import ExpectedValueIndex
+from seen_store import shared_store, DEFAULT_PATH
+from results_store import shared_results, DEFAULT_PATH as RESULTS_PATH
+from result_cache import config_digest
+from plc_publisher import publisher_from_config
 
 
 # ================= CAMERA THREAD =================
@@ -40,20 +47,62 @@ class CameraWorker(QThread):
 # ================= BARCODE THREAD =================
 class BarcodeWorker(QThread):
     result_ready = pyqtSignal(object, str)
+    verdict_ready = pyqtSignal(dict)
 
-    def __init__(self, engine, cfg):
+    STATUS_COLORS = {
+        "MATCH": (0, 255, 0),
+        "NOT MATCH": (0, 165, 255),
+        "NO BARCODE": (0, 0, 255),
+        "UNDECIDED": (0, 255, 255)
+    }
+
+    def __init__(self, engine, cfg, log=None):
         super().__init__()
         self.engine = engine
         self.cfg = cfg
         self.frame = None
         self.running = True
 
+        # One verdict per part: K of N reads must agree, then decoding
+        # pauses until the scene changes (next part in view)
+        window, agree = cfg.get("vote_window", 7), cfg.get("vote_agree", 4)
+        threshold = cfg.get("scene_change_threshold", 12.0)
+        self.voter = PartVoter(window, agree)
+        self.scene = SceneChangeDetector(threshold)
+
+        # NO BARCODE / UNDECIDED only for a part that came into view and
+        # left unread; "part_max_frames" also closes parts on a belt that
+        # is never empty between them
+        self.presence = PartPresence(
+            threshold, settle=window, min_frames=agree,
+            max_frames=cfg.get("part_max_frames")
+        )
+
+        self.expected = ExpectedValueIndex()
+
+        # Duplicate-serial check, scoped to the lot named in the recipe
+        self.lot = cfg.get("lot", "")
+        self.seen = shared_store(cfg.get("seen_store", DEFAULT_PATH)) if self.lot else None
+
+        # One row per part verdict, queryable with results_store.py
+        self.results = shared_results(cfg.get("results_store", RESULTS_PATH))
+        self.recipe_id = config_digest(cfg)
+        self.part_ids = PartCounter()
+
+        # Verdicts pushed to the line PLC / MES ("plc" in the recipe)
+        self.publisher = publisher_from_config(cfg, log)
+
     def update_frame(self, frame):
         self.frame = frame.copy()
 
+    def set_expected(self, index):
+        # Single attribute swap; the decode loop picks it up on the next frame
+        self.expected = index
+
     def run(self):
         while self.running:
             if self.frame is None:
+                self.msleep(1)
                 continue
 
             img = self.frame
@@ -61,50 +110,89 @@ class BarcodeWorker(QThread):
 
             display_img = img.copy()
 
+            # ---------- DEBOUNCE ----------
+            if self.voter.locked:
+                if not self.scene.changed(img):
+                    self.emit_frame(display_img, self.voter.verdict["status"])
+                    continue
+                self.voter.reset()
+                self.scene.clear()
+                self.presence.decided()
+
+            # ---------- PRESENCE ----------
+            if self.presence.update(img):
+                self.finish(self.voter.no_read(), None)
+
             # ---------- PREPROCESS ----------
             if self.cfg.get("enable_preprocessing", True):
+                total_rot = self.cfg.get("rotate_preset", 0) + self.cfg.get("fine_rotate", 0)
                 img = self.engine.preprocess(
                     img,
                     self.cfg.get("brightness", 0),
                     self.cfg.get("contrast", 1.0),
                     self.cfg.get("gamma", 1.0),
+                    total_rot,
                     self.cfg.get("use_clahe", False)
                 )
 
-            # ---------- OCR ----------
-            result = self.engine.run_batch([img])[0]
-            values = self.engine.extract_all_text(result)
-
-            expected = self.cfg.get("expected_value", "").strip()
-
-            # ---------- MATCH LOGIC ----------
-            if not values:
-                status = "NO BARCODE"
-                color = (0, 0, 255)
-            elif expected and expected in values:
-                status = "MATCH"
-                color = (0, 255, 0)
-            else:
-                status = "NOT MATCH"
-                color = (0, 165, 255)
-
-            # ---------- DRAW STATUS ----------
-            cv2.putText(
-                display_img,
-                status,
-                (30, 50),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.2,
-                color,
-                3,
-                cv2.LINE_AA
+            # ---------- DECODE ----------
+            t0 = time.perf_counter()
+            result, _ = self.engine.decode(img)
+            decode_ms = (time.perf_counter() - t0) * 1000
+            status, values = self.engine.verdict(result, self.expected)
+
+            # ---------- VOTE ----------
+            verdict = self.voter.add(status, values[0] if values else None)
+            if verdict:
+                self.scene.set_reference(display_img)
+                self.finish(verdict, decode_ms)
+
+            self.emit_frame(display_img, verdict["status"] if verdict else status)
+
+    def finish(self, verdict, decode_ms):
+        # Read-only lookup first (the Bloom filter answers unseen values
+        # from memory); the SQLite write happens after the PLC has it
+        value = verdict["value"]
+        verdict["duplicate"] = bool(self.seen and value and self.seen.seen(value, self.lot))
+        verdict["part"] = self.part_ids.next()
+        if self.publisher:
+            self.publisher.publish(
+                verdict["part"], verdict["status"],
+                {"value": value} if value else None,
+                infer_ms=decode_ms, duplicate=verdict["duplicate"]
             )
+        if self.seen and value:
+            self.seen.check_and_add(value, self.lot, "barcode_live")
+        self.record(verdict)
+        self.verdict_ready.emit(verdict)
+
+    def record(self, verdict):
+        self.results.add(
+            "barcode_live", verdict["part"], verdict["status"],
+            [verdict["value"]] if verdict["value"] else [],
+            lot=self.lot, recipe=self.recipe_id, engine=self.engine.engine_id,
+            duplicate=verdict["duplicate"], payload=verdict
+        )
 
-            self.result_ready.emit(display_img, status)
+    def emit_frame(self, display_img, status):
+        cv2.putText(
+            display_img,
+            status,
+            (30, 50),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.2,
+            self.STATUS_COLORS.get(status, (255, 255, 255)),
+            3,
+            cv2.LINE_AA
+        )
+        self.result_ready.emit(display_img, status)
 
     def stop(self):
         self.running = False
         self.wait()
+        self.results.flush()
+        if self.publisher:
+            self.publisher.close()
 
 
 # ================= MAIN GUI =================
@@ -120,6 +208,7 @@ class BarcodeLiveGui(QWidget):
         self.camera_config = None
         self.preprocess_cfg = None
         self.barcode_engine = None
+        self.expected_index = ExpectedValueIndex()
 
         self.camera_serial = "055060223096"
 
@@ -231,8 +320,10 @@ class BarcodeLiveGui(QWidget):
         ml = QVBoxLayout(match_group)
         self.expected_input = QLineEdit()
         self.expected_input.setPlaceholderText("Expected barcode value")
+        self.load_expected_btn = QPushButton("Load Expected List")
         ml.addWidget(QLabel("Expected value"))
         ml.addWidget(self.expected_input)
+        ml.addWidget(self.load_expected_btn)
 
         cl.addWidget(self.load_preprocess_btn)
         cl.addWidget(self.load_camera_cfg_btn)
@@ -267,6 +358,8 @@ class BarcodeLiveGui(QWidget):
     # ---------------- SIGNALS ----------------
     def _connect_signals(self):
         self.load_preprocess_btn.clicked.connect(self.load_preprocess_json)
+        self.load_expected_btn.clicked.connect(self.load_expected_list)
+        self.expected_input.textChanged.connect(self.set_expected_value)
         self.load_camera_cfg_btn.clicked.connect(self.load_camera_cfg)
         self.connect_camera_btn.clicked.connect(self.start_camera)
         self.stop_camera_btn.clicked.connect(self.stop_camera)
@@ -281,6 +374,10 @@ class BarcodeLiveGui(QWidget):
             self.preprocess_cfg = json.load(f)
 
         self.barcode_engine = BarcodeEngine()
+        try:
+            self.barcode_engine.configure(self.preprocess_cfg)
+        except ValueError as e:
+            self.log_console.append(str(e))
         self.log_console.append("Barcode engine loaded")
 
     def load_camera_cfg(self):
@@ -305,8 +402,12 @@ class BarcodeLiveGui(QWidget):
         self.camera_worker.log.connect(self.log_console.append)
         self.camera_worker.start()
 
-        self.barcode_worker = BarcodeWorker(self.barcode_engine, self.preprocess_cfg)
+        self.barcode_worker = BarcodeWorker(
+            self.barcode_engine, self.preprocess_cfg, self.log_console.append
+        )
+        self.barcode_worker.set_expected(self.expected_index)
         self.barcode_worker.result_ready.connect(self.update_processed_view)
+        self.barcode_worker.verdict_ready.connect(self.handle_verdict)
         self.barcode_worker.start()
 
         self.connect_camera_btn.setEnabled(False)
@@ -320,6 +421,10 @@ class BarcodeLiveGui(QWidget):
 
         if self.barcode_worker:
             self.barcode_worker.stop()
+            if self.barcode_worker.seen:
+                self.barcode_worker.seen.flush()
+            if self.barcode_worker.publisher:
+                self.log_console.append(self.barcode_worker.publisher.summary())
             self.barcode_worker = None
 
         self.connect_camera_btn.setEnabled(True)
@@ -328,9 +433,35 @@ class BarcodeLiveGui(QWidget):
 
     def update_frame(self, frame):
         if self.barcode_worker:
-            self.preprocess_cfg["expected_value"] = self.expected_input.text().strip()
             self.barcode_worker.update_frame(frame)
 
+    # ---------------- EXPECTED VALUES ----------------
+    def set_expected_value(self, text):
+        text = text.strip()
+        self.expected_index = ExpectedValueIndex([text] if text else [])
+        if self.barcode_worker:
+            self.barcode_worker.set_expected(self.expected_index)
+
+    def load_expected_list(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Expected Values", "", "Values (*.csv *.json *.txt)"
+        )
+        if not path:
+            return
+
+        try:
+            index = ExpectedValueIndex.load(path)
+        except (OSError, ValueError) as e:
+            self.log_console.append(f"Expected list not loaded: {e}")
+            return
+
+        self.expected_index = index
+        if self.barcode_worker:
+            self.barcode_worker.set_expected(index)
+        self.log_console.append(
+            f"Expected list loaded: {len(index)} values ({os.path.basename(path)})"
+        )
+
     def update_processed_view(self, frame, status):
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w, _ = rgb.shape
@@ -344,4 +475,13 @@ class BarcodeLiveGui(QWidget):
         )
 
         self.live_image.setPixmap(pix)
-        self.barcode_output.append(status)
+
+    def handle_verdict(self, verdict):
+        text = verdict["status"]
+        if verdict["value"]:
+            text += f" : {verdict['value']}"
+        if verdict.get("duplicate"):
+            text += " [DUPLICATE]"
+        self.barcode_output.append(
+            f"{verdict['part']} {text} ({verdict['votes']}/{verdict['frames']} frames)"
+        )
@@ -0,0 +1,412 @@
+"""
+Headless batch runner (no display, no PyQt5)
+
+    python batch_cli.py ocr  <folder|glob> --config config_filesss/parry.json
+    python batch_cli.py barcode <folder|glob> --config config_filesss/preprocess_config.json
+    python batch_cli.py ocr  <folder> --config ... --watch    (hot folder)
+    python batch_cli.py ocr  <folder> -r --pattern "*_top.tif" (subfolders, filter)
+    python batch_cli.py ocr  packs/labels.pack              (packed_dataset.py)
+
+- OCR rows match exports/batch_result_*.csv; JSONL lines carry the
+  ocr_outputs/*.json result fields (image, raw_text, matches)
+- barcode lines match barcode_results.json entries
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+
+BARCODE_CSV_FIELDS = ["image", "values", "status", "duplicate"]
+
+
+def load_config(path):
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RowWriter:
+    """
+    CSV + JSONL written row by row, so a killed run keeps what it finished
+    - parquet_path: typed columns (parquet_export), written in record batches
+    """
+
+    def __init__(self, csv_path, jsonl_path, fields, parquet_path=None, columns=None):
+        self.fields = fields
+        self.csv_f = self.csv = self.jsonl_f = self.parquet = None
+        if csv_path:
+            self.csv_f = open(csv_path, "w", newline="", encoding="utf-8")
+            self.csv = csv.DictWriter(self.csv_f, fieldnames=fields, extrasaction="ignore")
+            self.csv.writeheader()
+        if jsonl_path:
+            self.jsonl_f = open(jsonl_path, "w", encoding="utf-8")
+        if parquet_path:
+            import parquet_export
+            self.parquet = parquet_export.ParquetRowWriter(parquet_path, columns)
+
+    def write(self, row, record):
+        if self.csv:
+            self.csv.writerow(row)
+            self.csv_f.flush()
+        if self.jsonl_f:
+            self.jsonl_f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.jsonl_f.flush()
+        if self.parquet:
+            self.parquet.append({**row, **record})
+
+    def close(self):
+        for f in (self.csv_f, self.jsonl_f, self.parquet):
+            if f:
+                f.close()
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def open_journal(args, kind, paths, digest):
+    """
+    Resume journal for this input + settings; None with --no-resume
+    """
+    if args.no_resume:
+        return None
+    from run_journal import RunJournal
+    from folder_scan import FolderScan
+    if isinstance(paths, FolderScan):
+        # Identity is the folder + scan filters, not a listing still in progress
+        digest = f"{digest}:{json.dumps([paths.recursive, paths.patterns])}"
+        paths = [os.path.join(paths.root, "*")]
+    journal = RunJournal.for_run(kind, paths, digest, sync_every=args.batch_size)
+    if len(journal):
+        log(f"↩ Resuming from {journal.path} ({len(journal)} files recorded)")
+    return journal
+
+
+def close_journal(journal, completed=True):
+    # A crash never gets here, so the journal stays resumable
+    if journal is None:
+        return
+    if completed:
+        journal.finish()
+    else:
+        journal.close()
+
+
+def on_error(path, e):
+    log(f"⚠️ {os.path.basename(path)}: {e}")
+
+
+# ================= OCR =================
+def run_ocr(args, cfg, paths, writer, store, pack=None, results=None):
+    from ocr_batch import (
+        OCR_ENGINES, OCRPipeline, ShapeBatcher, make_rules, evaluate_texts, check_duplicate
+    )
+    from result_cache import shared_cache, config_digest
+    from image_decode import PageStream, page_ids
+
+    model = args.engine or cfg.get("ocr_model", "Model - 1")
+    if model not in OCR_ENGINES:
+        raise SystemExit(f"Unknown OCR engine '{model}' ({', '.join(OCR_ENGINES)})")
+    engine = OCR_ENGINES[model]()
+
+    rules = make_rules(
+        args.expected_count if args.expected_count is not None
+        else cfg.get("expected_char_count"),
+        args.regex if args.regex is not None else cfg.get("regex", "")
+    )
+    counts = {"OK": 0, "NOT_OK": 0}
+    replayed = [0]
+    lock = threading.Lock()
+
+    def on_result(path, records, duplicate=None):
+        # Journal replay runs on the pipeline's feeder thread
+        with lock:
+            write_result(path, records, duplicate)
+
+    def on_replay(path, result):
+        replayed[0] += 1
+        on_result(path, result["records"], result["duplicate"])
+
+    def write_result(path, records, duplicate):
+        file_name = os.path.basename(path)
+        texts = engine.records_text(records)
+        matches = engine.records_matches(records, rules["regex"]) if rules["regex"] else []
+
+        eval_data = evaluate_texts(texts, rules)
+        if duplicate is None:
+            check_duplicate(
+                store, texts, eval_data, rules, args.lot, f"ocr_cli:{file_name}", path
+            )
+            if journal is not None:
+                journal.append(path, {"records": records, "duplicate": eval_data["duplicate"]})
+            if results is not None:
+                results.add(
+                    "ocr_cli", file_name, eval_data["final_result"], matches,
+                    lot=args.lot, recipe=recipe_id, engine=engine.engine_id,
+                    duplicate=eval_data["duplicate"],
+                    payload={"path": path, "raw_text": texts, **eval_data}
+                )
+        else:
+            # Replayed from the journal; the seen store already has this value
+            eval_data["duplicate"] = duplicate
+            if duplicate:
+                eval_data["final_result"] = "NOT_OK"
+        counts[eval_data["final_result"]] += 1
+
+        writer.write(
+            {"file_name": file_name, **eval_data, **(pipeline.timing if duplicate is None else {})},
+            {"image": file_name, "raw_text": texts, "matches": matches, **eval_data}
+        )
+        if args.verbose:
+            log(f"{file_name} → {eval_data['final_result']}")
+
+    recipe_id = config_digest(cfg)
+    journal = open_journal(args, "ocr", paths, f"{recipe_id}:{engine.engine_id}")
+    if args.watch:
+        # The journal doubles as the processed-marker index of the hot folder
+        from folder_watch import FolderWatcher
+        paths = PageStream(FolderWatcher(
+            args.source,
+            settle=args.settle,
+            is_done=journal and (
+                lambda p: all(journal.result(q) is not None for q in page_ids(p))
+            )
+        ))
+        log(f"👀 Watching {args.source} (Ctrl+C to stop)")
+    elif pack is None:
+        # Multi-page TIFFs run (and are journaled) page by page
+        paths = PageStream(paths)
+        if journal is not None:
+            paths = journal.unfinished(paths, on_replay)
+
+    pipeline = OCRPipeline(
+        engine, cfg,
+        workers=args.workers,
+        cache=None if args.no_cache else shared_cache(),
+        batcher=ShapeBatcher(args.batch_size, args.budget_mb, by_shape=args.budget_mb > 0),
+        eager=args.watch,
+        decoder=pack
+    )
+    decode = pipeline.decoder.describe()
+    if decode:
+        log(f"🖼 Reduced decode: {decode}")
+    try:
+        done = pipeline.run(
+            paths,
+            on_result=lambda path, records, img: on_result(path, records),
+            on_error=on_error
+        )
+    except KeyboardInterrupt:
+        log("⛔ Stopped")
+        close_journal(journal, completed=False)
+        return sum(counts.values()), counts
+    finally:
+        log(f"🖼 {pipeline.decoder.summary()}")
+
+    if pipeline.error is not None:
+        log(f"❌ Inference failed, run not complete: {pipeline.error}")
+        args.incomplete = True
+    # A watched folder is never "complete"; keep its index
+    close_journal(journal, completed=not args.watch and not pipeline.stopped)
+    return done + replayed[0], counts
+
+
+# ================= BARCODE =================
+def run_barcode(args, cfg, paths, writer, store, pack=None, results=None):
+    from barcode_batch import BarcodeBatchExecutor
+    from result_cache import shared_cache, config_digest
+    from image_decode import PageStream, image_id
+
+    recipe = dict(cfg)
+    if args.expected is not None:
+        if os.path.isfile(args.expected):
+            recipe["expected_index_path"] = args.expected
+        else:
+            recipe["expected_value"] = args.expected
+
+    executor = BarcodeBatchExecutor(
+        recipe,
+        workers=args.workers,
+        cache=None if args.no_cache else shared_cache(),
+        pack=pack and pack.path
+    )
+    counts = {}
+    replayed = [0]
+
+    def record(entry):
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        writer.write({**entry, "values": ";".join(entry["values"])}, entry)
+        if args.verbose:
+            log(f"{entry['image']} → {entry['status']}")
+
+    def on_result(path, entry):
+        if store is not None and args.lot:
+            entry["duplicate"] = store.check_values(
+                entry["values"], args.lot, f"barcode_cli:{entry['image']}",
+                image_id(path)
+            )
+        if journal is not None:
+            journal.append(path, entry)
+        if results is not None:
+            results.add(
+                "barcode_cli", entry["image"], entry["status"], entry["values"],
+                lot=args.lot, recipe=recipe_id, engine=executor.engine.engine_id,
+                duplicate=entry.get("duplicate", False), payload={"path": path, **entry}
+            )
+        record(entry)
+
+    recipe_id = config_digest(recipe)
+    journal = open_journal(
+        args, "barcode", paths, json.dumps(recipe, sort_keys=True, default=str)
+    )
+
+    def on_replay(path, entry):
+        replayed[0] += 1
+        record(entry)
+
+    if pack is None:
+        paths = PageStream(paths)
+    if journal is not None:
+        paths = journal.unfinished(paths, on_replay)
+
+    done = executor.run(paths, on_result=on_result, on_error=on_error)
+    close_journal(journal, completed=not executor.stopped)
+    return done + replayed[0], counts
+
+
+# ================= ENTRY POINT =================
+def build_parser():
+    p = argparse.ArgumentParser(description="Headless OCR / barcode batch runner")
+    p.add_argument("mode", choices=["ocr", "barcode"])
+    p.add_argument("source", help="image folder, glob pattern or .pack directory")
+    p.add_argument("-r", "--recursive", action="store_true",
+                   help="folder source: include subfolders")
+    p.add_argument("--pattern", action="append",
+                   help="folder source: file name glob, e.g. 'IMG_*' (repeatable)")
+    p.add_argument("--config", help="preprocess JSON (config_filesss/*.json)")
+    p.add_argument("--engine", help="OCR engine, e.g. 'Model - 1' or Doctr; default from config")
+    p.add_argument("--regex", help="override the config regex")
+    p.add_argument("--expected-count", type=int, help="minimum character count (OCR)")
+    p.add_argument("--expected", help="expected barcode value, or a CSV/JSON list of values")
+    p.add_argument("--lot", default="", help="flag values already seen in this lot")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--batch-size", type=int, default=16,
+                   help="max images per OCR engine call")
+    p.add_argument("--budget-mb", type=int, default=512,
+                   help="decoded pixels per OCR batch; 0 = fixed batches in folder order")
+    p.add_argument("--csv", help="CSV output path (default exports/<mode>_batch_<ts>.csv)")
+    p.add_argument("--jsonl", help="JSONL output path (default next to the CSV)")
+    p.add_argument("--parquet", help="also write typed columns to this Parquet file (pyarrow)")
+    p.add_argument("--no-cache", action="store_true", help="skip the result cache")
+    p.add_argument("--results-db", default=None,
+                   help="results store (default results/results.db)")
+    p.add_argument("--no-results", action="store_true",
+                   help="don't record rows in the results store")
+    p.add_argument("--no-resume", action="store_true",
+                   help="ignore / don't write the run journal (journals/)")
+    p.add_argument("--watch", action="store_true",
+                   help="OCR: keep processing new files dropped into the folder")
+    p.add_argument("--settle", type=float, default=0.3,
+                   help="--watch: seconds a file must stay unchanged before it is read")
+    p.add_argument("-v", "--verbose", action="store_true")
+    return p
+
+
+def main(argv=None):
+    from packed_dataset import is_pack, PackedDataset
+
+    args = build_parser().parse_args(argv)
+    cfg = load_config(args.config)
+
+    scan = pack = None
+    if args.watch:
+        if args.mode != "ocr" or not os.path.isdir(args.source):
+            log("❌ --watch needs ocr mode and a folder")
+            return 2
+        # Journal identity is the folder itself
+        paths = [os.path.join(args.source, "*")]
+    elif is_pack(args.source):
+        # Pre-decoded benchmark input; results still name the original files.
+        # A benchmark pass starts over, so there is nothing to resume, and
+        # runs the engine on every image, so the result cache is off
+        pack = PackedDataset(args.source)
+        paths = pack.paths
+        args.no_resume = True
+        args.no_cache = True
+    elif os.path.isdir(args.source):
+        # Stream the folder: the first files start while the rest is still listed
+        from folder_scan import FolderScan
+        scan = FolderScan(args.source, args.recursive, args.pattern).start()
+        if not next(iter(scan), None):
+            log(f"❌ No images found: {args.source}")
+            return 1
+        paths = scan
+    else:
+        from ocr_batch import list_images
+        paths = list_images(args.source)
+        if not paths:
+            log(f"❌ No images found: {args.source}")
+            return 1
+
+    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    csv_path = args.csv or os.path.join("exports", f"{args.mode}_batch_{ts}.csv")
+    jsonl_path = args.jsonl or os.path.splitext(csv_path)[0] + ".jsonl"
+    for p in (csv_path, jsonl_path):
+        os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+
+    store = None
+    if args.lot:
+        from seen_store import shared_store
+        store = shared_store()
+
+    results = None
+    if not args.no_results:
+        from results_store import shared_results, DEFAULT_PATH
+        results = shared_results(args.results_db or DEFAULT_PATH)
+
+    import parquet_export
+    if args.parquet and not parquet_export.available():
+        log("❌ --parquet needs pyarrow")
+        return 2
+    fields = BARCODE_CSV_FIELDS if args.mode == "barcode" else None
+    columns = parquet_export.BARCODE_COLUMNS if args.mode == "barcode" else None
+    if fields is None:
+        from ocr_batch import BATCH_CSV_FIELDS
+        fields = BATCH_CSV_FIELDS
+        columns = parquet_export.OCR_BATCH_COLUMNS
+    writer = RowWriter(csv_path, jsonl_path, fields, args.parquet, columns)
+
+    if scan is not None:
+        log(f"▶ {args.mode}: {args.source} (listing while running), {args.workers} workers")
+    elif not args.watch:
+        log(f"▶ {args.mode}: {len(paths)} images, {args.workers} workers")
+    t0 = time.perf_counter()
+    try:
+        run = run_barcode if args.mode == "barcode" else run_ocr
+        done, counts = run(args, cfg, paths, writer, store, pack, results)
+    finally:
+        if results is not None:
+            results.flush()
+        if scan is not None:
+            scan.stop()
+        writer.close()
+        if store is not None:
+            store.flush()
+
+    elapsed = time.perf_counter() - t0
+    summary = " ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    log(f"✅ {done} images in {elapsed:.1f} s | {summary}")
+    log(f"📁 {csv_path}\n📁 {jsonl_path}")
+    if args.parquet:
+        log(f"📁 {args.parquet}")
+    return 1 if getattr(args, "incomplete", False) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
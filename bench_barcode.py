@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import argparse
+
+import cv2
+from pyzbar.pyzbar import decode as zbar_decode
+
+from ocr_engine import BarcodeEngine
+from image_decode import IMAGE_EXTS
+
+
+def list_images(folder):
+    return [
+        os.path.join(folder, f)
+        for f in sorted(os.listdir(folder))
+        if f.lower().endswith(IMAGE_EXTS)
+    ]
+
+
+def bench(name, paths, read, decode, repeat):
+    hits = 0
+    best = float("inf")
+
+    for _ in range(repeat):
+        hits = 0
+        t0 = time.perf_counter()
+        for p in paths:
+            img = read(p)
+            if img is not None and decode(img):
+                hits += 1
+        best = min(best, time.perf_counter() - t0)
+
+    per_img = best / max(len(paths), 1) * 1000
+    print(f"{name:<34} {per_img:8.2f} ms/img   hits {hits}/{len(paths)}")
+    return per_img
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Barcode decode time per image")
+    ap.add_argument("folder", nargs="?", default="barcodee")
+    ap.add_argument("--symbols", default="CODE128")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    paths = list_images(args.folder)
+    if not paths:
+        print(f"No images in {args.folder}")
+        return 1
+
+    print(f"{len(paths)} images from {args.folder}, best of {args.repeat}\n")
+
+    # Before: color read, every symbology, full frame
+    before = bench(
+        "before (BGR, all symbols)",
+        paths,
+        cv2.imread,
+        zbar_decode,
+        args.repeat
+    )
+
+    gray_all = BarcodeEngine(use_localization=False)
+    bench(
+        "gray, all symbols",
+        paths,
+        gray_all.read_image,
+        lambda img: gray_all.decode(img)[0],
+        args.repeat
+    )
+
+    gray_sym = BarcodeEngine(use_localization=False, symbols=args.symbols)
+    bench(
+        f"gray, {args.symbols}",
+        paths,
+        gray_sym.read_image,
+        lambda img: gray_sym.decode(img)[0],
+        args.repeat
+    )
+
+    after_engine = BarcodeEngine(symbols=args.symbols)
+    after = bench(
+        f"after (gray, {args.symbols}, localized)",
+        paths,
+        after_engine.read_image,
+        lambda img: after_engine.decode(img)[0],
+        args.repeat
+    )
+
+    print(f"\nspeedup: {before / max(after, 1e-9):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+from ocr_engine import BarcodeEngine, BARCODE_BACKENDS
+from folder_scan import iter_images
+
+
+def load_recipe(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_backend(backend, recipe, paths, expected):
+    engine = BarcodeEngine(backend=backend)
+    engine.configure({k: v for k, v in recipe.items() if k != "barcode_backend"})
+
+    images = [engine.read_image(p) for p in paths]
+    images = [img for img in images if img is not None]
+
+    hits = 0
+    t0 = time.perf_counter()
+    for img in images:
+        result, _ = engine.decode(img)
+        if expected:
+            status, _ = engine.verdict(result, expected)
+            hits += status == "MATCH"
+        else:
+            hits += bool(result)
+    elapsed = time.perf_counter() - t0
+
+    n = max(len(images), 1)
+    return elapsed / n * 1000, hits / n
+
+
+def pick_backend(rows, min_accuracy):
+    """
+    Fastest backend whose hit rate meets min_accuracy,
+    else the most accurate one
+    """
+    ok = [r for r in rows if r["hit_rate"] >= min_accuracy]
+    if ok:
+        return min(ok, key=lambda r: r["ms_per_img"])
+    return max(rows, key=lambda r: (r["hit_rate"], -r["ms_per_img"]))
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Compare barcode backends per recipe and pick the fastest accurate one"
+    )
+    ap.add_argument("folder", nargs="?", default="barcodee")
+    ap.add_argument("--recipe", action="append", default=[],
+                    help="preprocess JSON (repeatable); default: built-in Code128 recipe")
+    ap.add_argument("--expected", default="",
+                    help="count only reads equal to this value (default: any read)")
+    ap.add_argument("--min-accuracy", type=float, default=0.95)
+    ap.add_argument("--write", action="store_true",
+                    help="store the chosen backend as barcode_backend in each recipe")
+    args = ap.parse_args()
+
+    paths = sorted(iter_images(args.folder))
+    if not paths:
+        print(f"No images in {args.folder}")
+        return 1
+
+    recipes = [(p, load_recipe(p)) for p in args.recipe]
+    if not recipes:
+        recipes = [("<default>", {"barcode_symbols": ["CODE128"]})]
+
+    backends = [name for name, cls in BARCODE_BACKENDS.items() if cls.available()]
+    print(f"{len(paths)} images, backends: {', '.join(backends)}\n")
+
+    for path, recipe in recipes:
+        expected = args.expected or recipe.get("expected_value", "")
+        rows = []
+
+        print(f"recipe {os.path.basename(path)}")
+        for backend in backends:
+            ms, rate = run_backend(backend, recipe, paths, expected)
+            rows.append({"backend": backend, "ms_per_img": ms, "hit_rate": rate})
+            print(f"  {backend:<8} {ms:8.2f} ms/img   hit rate {rate:6.1%}")
+
+        best = pick_backend(rows, args.min_accuracy)
+        print(f"  -> {best['backend']}\n")
+
+        if args.write and path != "<default>":
+            recipe["barcode_backend"] = best["backend"]
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(recipe, f, indent=4)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
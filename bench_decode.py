@@ -0,0 +1,60 @@
+import sys
+import time
+import argparse
+
+from ocr_batch import OCR_ENGINES, list_images
+from image_decode import ImageDecoder, PageStream
+
+
+def bench(name, paths, read, repeat):
+    best = float("inf")
+    pixels = 0
+
+    for _ in range(repeat):
+        pixels = 0
+        t0 = time.perf_counter()
+        for p in paths:
+            img = read(p)
+            if img is not None:
+                pixels += img.shape[0] * img.shape[1]
+        best = min(best, time.perf_counter() - t0)
+
+    per_img = best / max(len(paths), 1) * 1000
+    print(f"{name:<40} {per_img:8.2f} ms/img   {pixels / max(len(paths), 1) / 1e6:6.2f} MP/img")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Image decode time: plain imread vs ImageDecoder")
+    ap.add_argument("folder", help="image folder (or glob)")
+    ap.add_argument("--engine", default="Doctr", help="engine whose DECODE_SIDE is the target")
+    ap.add_argument("--max-side", type=int, help="override the engine's decode side")
+    ap.add_argument("--gray", action="store_true", help="decode to one channel")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    paths = list(PageStream(list_images(args.folder)))
+    if not paths:
+        print(f"No images in {args.folder}")
+        return 1
+
+    max_side = args.max_side
+    if max_side is None:
+        max_side = OCR_ENGINES[args.engine].DECODE_SIDE
+    print(f"{len(paths)} images from {args.folder}, best of {args.repeat}\n")
+
+    # Page ids need the decoder; plain imread only reads files
+    plain = ImageDecoder()
+    before = bench("before (imread, full BGR)", paths, plain.read, args.repeat)
+
+    label = f"after (max side {max_side}{', gray' if args.gray else ''})"
+    decoder = ImageDecoder(max_side, args.gray)
+    after = bench(label, paths, decoder.read, args.repeat)
+
+    print(f"\nsaved {before - after:.2f} s per pass ({before / max(after, 1e-9):.2f}x)")
+    print(f"decoder's own estimate over {args.repeat} passes: {decoder.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
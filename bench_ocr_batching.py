@@ -0,0 +1,72 @@
+import sys
+import json
+import time
+import argparse
+
+from ocr_batch import OCR_ENGINES, OCRPipeline, ShapeBatcher, list_images, load_image
+from packed_dataset import is_pack, PackedDataset
+
+
+def bench(name, engine, paths, recipe, batcher, workers, repeat, decoder=None):
+    best = float("inf")
+    batches = 0
+
+    for _ in range(repeat):
+        pipeline = OCRPipeline(engine, recipe, workers=workers, batcher=batcher, decoder=decoder)
+        t0 = time.perf_counter()
+        done = pipeline.run(paths, on_result=lambda path, records, img: None)
+        best = min(best, time.perf_counter() - t0)
+        batches = pipeline.stats["batches"]
+
+    rate = done / max(best, 1e-9)
+    print(f"{name:<36} {rate:8.2f} img/s   {batches} engine calls")
+    return rate
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR batch throughput: fixed vs shape-bucketed")
+    ap.add_argument("folder", help="mixed TIFF / PNG folder (or glob, or a .pack)")
+    ap.add_argument("--engine", default="Model - 1", help="default DocTR")
+    ap.add_argument("--config", help="preprocess JSON (config_filesss/*.json)")
+    ap.add_argument("--max-batch", type=int, default=16)
+    ap.add_argument("--budget-mb", type=int, default=512)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--repeat", type=int, default=2)
+    args = ap.parse_args()
+
+    # A pack takes decoding out of the measurement
+    pack = PackedDataset(args.folder) if is_pack(args.folder) else None
+    paths = pack.paths if pack is not None else list_images(args.folder)
+    if not paths:
+        print(f"No images in {args.folder}")
+        return 1
+
+    recipe = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            recipe = json.load(f)
+    engine = OCR_ENGINES[args.engine]()
+
+    print(f"{len(paths)} images from {args.folder}, best of {args.repeat}\n")
+
+    # Warm-up: lazy init / CUDA kernels shouldn't count against the first scheme
+    warm = load_image(engine, paths[0], recipe, pack)
+    if warm is not None:
+        engine.run_batch([warm])
+
+    before = bench(
+        "before (fixed 4, folder order)",
+        engine, paths, recipe, ShapeBatcher(4, by_shape=False), args.workers, args.repeat, pack
+    )
+    after = bench(
+        f"after (buckets, <= {args.max_batch}, {args.budget_mb} MB)",
+        engine, paths, recipe, ShapeBatcher(args.max_batch, args.budget_mb),
+        args.workers, args.repeat, pack
+    )
+
+    print(f"\nspeedup: {after / max(before, 1e-9):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import os
+import csv
+import json
+
+
+# Fixed-length GS1 Application Identifiers (data length, without the AI).
+# Anything not listed is variable length, terminated by GS (FNC1) or end.
+GS1_FIXED = {
+    "00": 18, "01": 14, "02": 14,
+    "11": 6, "12": 6, "13": 6, "15": 6, "16": 6, "17": 6,
+    "20": 2,
+}
+GS1_VARIABLE = ("10", "21", "22", "30", "37", "240", "241", "250", "400")
+GS = "\x1d"
+
+# Symbology identifiers some scanners/decoders prefix to the payload
+SYMBOLOGY_PREFIXES = ("]C1", "]e0", "]d2", "]Q3")
+
+
+def normalize_key(text: str) -> str:
+    """
+    Same cleanup as BarcodeEngine.normalize, case-folded
+    - strips whitespace, removes spaces / dashes / underscores
+    """
+    return (
+        text.strip()
+        .replace(" ", "")
+        .replace("-", "")
+        .replace("_", "")
+        .upper()
+    )
+
+
+def is_gs1(text: str) -> bool:
+    """
+    Only text marked as GS1 is split into AIs
+    - parenthesized AIs, a GS1 symbology prefix, or a GS (FNC1) inside
+    - a plain "2112345" is a serial, not AI 21 + "12345"
+    """
+    return (
+        text.startswith("(")
+        or text.startswith(SYMBOLOGY_PREFIXES)
+        or GS in text
+    )
+
+
+def parse_gs1(text: str):
+    """
+    Split a GS1 element string into {AI: data}
+    - "(01)09501101530003(21)ABC123" (human readable)
+    - "]C1" "0109501101530003" GS "21ABC123" (raw, FNC1 separated)
+    - returns {} when the text is not a GS1 string (see is_gs1)
+    """
+    if not is_gs1(text):
+        return {}
+
+    for prefix in SYMBOLOGY_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+
+    fields = {}
+
+    if text.startswith("("):
+        for part in text.split("(")[1:]:
+            ai, sep, data = part.partition(")")
+            if not sep or not ai.isdigit():
+                return {}
+            fields[ai] = data.strip()
+        return fields
+
+    text = text.lstrip(GS)
+    while text:
+        ai = next(
+            (a for a in list(GS1_FIXED) + list(GS1_VARIABLE) if text.startswith(a)),
+            None
+        )
+        if ai is None:
+            return {}
+
+        text = text[len(ai):]
+        if ai in GS1_FIXED:
+            n = GS1_FIXED[ai]
+            if len(text) < n:
+                return {}
+            fields[ai] = text[:n]
+            text = text[n:].lstrip(GS)
+        else:
+            data, _, text = text.partition(GS)
+            fields[ai] = data
+
+    return fields
+
+
+def _is_header(first, following):
+    """
+    Header row: no digit in it while the values below carry digits
+    - serials / lot codes always contain digits, column names do not
+    """
+    def has_digit(text):
+        return any(c.isdigit() for c in text)
+
+    return not has_digit(first) and all(has_digit(v) for v in following)
+
+
+class ExpectedValueIndex:
+    """
+    Set of valid barcode values for one production order
+    - exact lookups on normalized keys (hash set, O(1))
+    - entries ending in "*" are prefixes ("J12B1*")
+    - GS1 strings are also indexed per AI, so a decoded "(01)..(21)SN"
+      matches a list of plain serials through `match_ais`
+    """
+
+    def __init__(self, values=(), match_ais=("21", "10", "01")):
+        self.match_ais = tuple(match_ais)
+        self.values = set()
+        self.prefixes = set()
+        self.prefix_lengths = set()
+        self.ai_values = {}
+
+        for v in values:
+            self.add(v)
+
+    def __len__(self):
+        return len(self.values) + len(self.prefixes)
+
+    def add(self, value):
+        value = str(value)
+        if not value.strip():
+            return
+
+        if value.rstrip().endswith("*"):
+            key = normalize_key(value.rstrip()[:-1])
+            if key:
+                self.prefixes.add(key)
+                self.prefix_lengths.add(len(key))
+            return
+
+        self.values.add(normalize_key(value))
+        for ai, data in parse_gs1(value.strip()).items():
+            self.ai_values.setdefault(ai, set()).add(normalize_key(data))
+
+    def match(self, raw: str) -> bool:
+        key = normalize_key(raw)
+        if key in self.values:
+            return True
+
+        for n in self.prefix_lengths:
+            if key[:n] in self.prefixes:
+                return True
+
+        fields = parse_gs1(raw.strip())
+        for ai in self.match_ais:
+            data = fields.get(ai)
+            if data is None:
+                continue
+            data = normalize_key(data)
+            if data in self.values or data in self.ai_values.get(ai, ()):
+                return True
+
+        return False
+
+    # ---------------- LOADERS ----------------
+    @classmethod
+    def from_csv(cls, path, column=None, **kwargs):
+        """
+        One value per row
+        - `column` picks a header name; default is the first column
+        - without `column`, a header row ("serial") is skipped, see _is_header
+        """
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            if column is not None:
+                return cls((row.get(column, "") for row in csv.DictReader(f)), **kwargs)
+
+            rows = [row[0] for row in csv.reader(f) if row]
+            if len(rows) > 1 and _is_header(rows[0], rows[1:6]):
+                rows = rows[1:]
+            return cls(rows, **kwargs)
+
+    @classmethod
+    def from_json(cls, path, **kwargs):
+        """
+        Either a list of values or {"values": [...], "match_ais": [...]}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            if "match_ais" in data:
+                kwargs.setdefault("match_ais", data["match_ais"])
+            data = data.get("values", [])
+
+        return cls(data, **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".json":
+            return cls.from_json(path, **kwargs)
+        if ext in (".csv", ".txt"):
+            return cls.from_csv(path, **kwargs)
+        raise ValueError(f"Unsupported expected-value file: {path}")
@@ -0,0 +1,104 @@
+import os
+import fnmatch
+import threading
+
+from image_decode import IMAGE_EXTS
+
+
+def iter_images(root, recursive=False, patterns=None, exts=IMAGE_EXTS):
+    """
+    Lazy os.scandir walk yielding image paths as the directory is read
+    - scandir order, not sorted: sorting would mean reading the whole
+      directory before the first file can start
+    - patterns: fnmatch globs on the file name ("IMG_*", "*_top.tif"), any match
+    """
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            it = os.scandir(folder)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                name = entry.name
+                if not name.lower().endswith(exts):
+                    continue
+                if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+                    continue
+                yield entry.path
+
+
+class FolderScan:
+    """
+    Background enumeration of a (possibly huge) folder
+    - start() returns immediately; `found` grows while the walk runs
+    - iterating yields paths as they are found and ends when the walk is done;
+      it can be iterated again (paths are kept, pixels never are)
+    """
+
+    def __init__(self, root, recursive=False, patterns=None, exts=IMAGE_EXTS):
+        self.root = root
+        self.recursive = recursive
+        self.patterns = patterns
+        self.exts = exts
+
+        self.paths = []
+        self.done = False
+        self.cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def found(self):
+        return len(self.paths)
+
+    def _run(self):
+        try:
+            for path in iter_images(self.root, self.recursive, self.patterns, self.exts):
+                if self._stop.is_set():
+                    break
+                with self.cond:
+                    self.paths.append(path)
+                    self.cond.notify_all()
+        finally:
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.paths) and not self.done:
+                    self.cond.wait(0.5)
+                if i >= len(self.paths):
+                    return
+                chunk = self.paths[i:]
+            i += len(chunk)
+            yield from chunk
+
+
+def known_total(paths):
+    # Length of a list, files found so far for a FolderScan, else 0
+    if isinstance(paths, FolderScan):
+        return paths.found
+    return len(paths) if hasattr(paths, "__len__") else 0
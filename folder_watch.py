@@ -0,0 +1,203 @@
+import os
+import stat
+import time
+import threading
+
+from image_decode import IMAGE_EXTS
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _WakeHandler(FileSystemEventHandler):
+    def __init__(self, on_path):
+        super().__init__()
+        self.on_path = on_path
+
+    def on_any_event(self, event):
+        self.on_path(event.src_path)
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            self.on_path(dest)
+
+
+class FolderWatcher:
+    """
+    Hot folder: yield image files as they land
+    - a file is ready once its size / mtime hold still for `settle` seconds
+      and it can be opened (writers on Windows shares keep it locked)
+    - is_done(path) skips files already processed (e.g. RunJournal.result)
+    - the folder is only listed when it changed: watchdog events when
+      installed, else the folder's own mtime (bumped by create / delete /
+      rename); between listings only files still settling are stat'ed
+    - a full listing every `rescan` seconds catches what both miss (files
+      rewritten in place, dropped events); files gone from the folder are
+      forgotten, so memory follows the folder, not its history
+    """
+
+    def __init__(self, folder, settle=0.3, poll=0.25, is_done=None, exts=IMAGE_EXTS,
+                 rescan=30.0):
+        self.folder = folder
+        self.settle = settle
+        self.poll = poll
+        self.is_done = is_done
+        self.exts = exts
+        self.rescan = rescan
+
+        self.candidates = {}  # path -> (stamp, time the stamp was first seen)
+        self.yielded = {}     # path -> stamp handed out
+        self.dirty = set()    # paths watchdog reported since the last scan
+        self.dirty_lock = threading.Lock()
+        self.dir_mtime = None
+        self.last_listing = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._observer = None
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    @staticmethod
+    def _openable(path):
+        try:
+            with open(path, "rb") as f:
+                f.read(1)
+            return True
+        except OSError:
+            return False
+
+    def _on_event(self, path):
+        with self.dirty_lock:
+            self.dirty.add(path)
+        self._wake.set()
+
+    def _needs_listing(self, now):
+        if self.last_listing is None or now - self.last_listing >= self.rescan:
+            return True
+        if self._observer is not None:
+            return False
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return False
+        # A change within the filesystem's mtime tick of the last look could
+        # leave the stamp unchanged; a recently touched folder is listed again
+        recent = time.time() - mtime / 1e9 < 2.0
+        changed = mtime != self.dir_mtime
+        self.dir_mtime = mtime
+        return changed or recent
+
+    def _listing(self):
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            return None
+        found = {}
+        for entry in entries:
+            if not entry.name.lower().endswith(self.exts):
+                continue
+            try:
+                if entry.is_file():
+                    found[entry.path] = entry.stat()
+            except OSError:
+                continue
+        return found
+
+    def _stat_paths(self, paths):
+        found = {}
+        for path in paths:
+            if not path.lower().endswith(self.exts):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                found[path] = st
+        return found
+
+    def scan(self):
+        """
+        Paths that became ready since the last scan, oldest first
+        """
+        now = time.monotonic()
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, set()
+
+        listed = self._needs_listing(now)
+        if listed:
+            files = self._listing()
+            if files is None:
+                return []
+            self.last_listing = now
+            # Forget files that left the folder
+            for known in (self.candidates, self.yielded):
+                for path in [p for p in known if p not in files]:
+                    del known[path]
+        else:
+            todo = set(self.candidates) | dirty
+            files = self._stat_paths(todo)
+            for path in todo - set(files):
+                self.candidates.pop(path, None)
+                self.yielded.pop(path, None)
+
+        ready = []
+        for path, st in files.items():
+            stamp = (st.st_size, st.st_mtime_ns)
+            if self.yielded.get(path) == stamp:
+                continue
+
+            prev = self.candidates.get(path)
+            if prev is None or prev[0] != stamp:
+                # New or still growing: restart its settle clock
+                self.candidates[path] = (stamp, now)
+                continue
+            if st.st_size == 0 or now - prev[1] < self.settle:
+                continue
+            if not self._openable(path):
+                continue
+
+            del self.candidates[path]
+            self.yielded[path] = stamp
+            if self.is_done is not None and self.is_done(path):
+                continue
+            ready.append((st.st_mtime_ns, path))
+
+        return [p for _, p in sorted(ready)]
+
+    def _start_observer(self):
+        if Observer is None:
+            return
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_WakeHandler(self._on_event), self.folder, recursive=False)
+            self._observer.start()
+        except OSError:
+            self._observer = None
+
+    def __iter__(self):
+        self._start_observer()
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                for path in self.scan():
+                    if self._stop.is_set():
+                        return
+                    yield path
+                # Pending candidates need another look after `settle`
+                timeout = min(self.poll, self.settle) if self.candidates else self.poll
+                self._wake.wait(timeout)
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+                self._observer = None
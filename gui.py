@@ -2,14 +2,166 @@ import os, json, cv2, re
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QFileDialog,
     QVBoxLayout, QHBoxLayout, QSlider, QTextEdit,
-    QLineEdit, QCheckBox, QComboBox, QGroupBox
+    QLineEdit, QCheckBox, QComboBox, QGroupBox, QTabWidget
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtWidgets import QSizePolicy
 from ocr_engine import DoctrEngine, EasyOCREngine, PPOCREngine
 from datetime import datetime
 import csv
+import time
+from seen_store import shared_store
+from results_store import shared_results
+import parquet_export
+from result_cache import shared_cache, config_digest
+from run_journal import RunJournal
+from folder_watch import FolderWatcher
+from folder_scan import FolderScan, known_total
+from image_decode import ImageDecoder, PageStream, page_ids
+from preview_pipeline import PreviewPipeline
+from preview_worker import PreviewWorker
+from results_view import ResultsView
+from ocr_batch import (
+    BATCH_CSV_FIELDS, OCRPipeline, ShapeBatcher, make_rules, evaluate_texts,
+    load_image as load_batch_image, check_duplicate as flag_duplicate
+)
+
+
+# ================= BATCH THREAD =================
+class OCRBatchWorker(QThread):
+    """
+    Runs an OCRPipeline off the GUI thread
+    - evaluation and the seen-store check happen here, in input order
+    - result_ready carries the row; img only every PREVIEW_INTERVAL seconds
+    - with a RunJournal, files finished by an earlier run are replayed
+      from it instead of being inferred again
+    - watch_folder: run on files as they land (the journal is the
+      processed-marker index) until stopped
+    - results: a ResultsStore; every newly inferred file is recorded
+    """
+    result_ready = pyqtSignal(dict, object)
+    progress = pyqtSignal(int, int)
+    log = pyqtSignal(str)
+
+    # Seconds between annotated previews; the pipeline outruns repaint
+    PREVIEW_INTERVAL = 0.25
+
+    def __init__(self, engine, paths, recipe, rules, lot="", batcher=None,
+                 workers=2, seen=None, cache=None, journal=None, watch_folder=None,
+                 results=None):
+        super().__init__()
+        # A list or a FolderScan still enumerating; consumed lazily either way
+        self.paths = paths
+        self.watch_folder = watch_folder
+        self.rules = rules
+        self.lot = lot
+        self.seen = seen
+        self.journal = journal
+        self.results = results
+        self.recipe_id = config_digest(recipe)
+        self.engine = engine
+        self.pipeline = OCRPipeline(
+            engine, recipe, workers=workers, cache=cache, batcher=batcher,
+            eager=watch_folder is not None
+        )
+        self.last_preview = 0.0
+        self.skipped = 0
+
+    def on_result(self, path, records, img):
+        file_name = os.path.basename(path)
+        texts = self.engine.records_text(records)
+
+        eval_data = evaluate_texts(texts, self.rules)
+        flag_duplicate(
+            self.seen, texts, eval_data, self.rules, self.lot, f"ocr_batch:{file_name}",
+            path
+        )
+        if self.journal is not None:
+            self.journal.append(
+                path, {"records": records, "duplicate": eval_data["duplicate"]}
+            )
+        if self.results is not None:
+            regex = self.rules["regex"]
+            self.results.add(
+                "ocr_batch", file_name, eval_data["final_result"],
+                self.engine.records_matches(records, regex) if regex else [],
+                lot=self.lot, recipe=self.recipe_id, engine=self.engine.engine_id,
+                duplicate=eval_data["duplicate"],
+                payload={"path": path, "raw_text": texts, **eval_data}
+            )
+        self.emit_row(path, records, eval_data, img, dict(self.pipeline.timing))
+
+    def replay(self, path, result):
+        # Journaled file: re-score the stored records, keep its duplicate flag
+        eval_data = evaluate_texts(self.engine.records_text(result["records"]), self.rules)
+        eval_data["duplicate"] = result["duplicate"]
+        if result["duplicate"]:
+            eval_data["final_result"] = "NOT_OK"
+        self.emit_row(path, result["records"], eval_data, None)
+
+    def emit_row(self, path, records, eval_data, img, timing=None):
+        preview = None
+        now = time.monotonic()
+        if img is not None and now - self.last_preview >= self.PREVIEW_INTERVAL:
+            self.last_preview = now
+            preview = img
+
+        self.result_ready.emit({
+            "path": path,
+            "file_name": os.path.basename(path),
+            "records": records,
+            "eval": eval_data,
+            "timing": timing or {}
+        }, preview)
+
+    def replay_journaled(self, path, result):
+        # Called from the pipeline's feeder thread as the input streams past
+        self.skipped += 1
+        if self.skipped == 1:
+            self.log.emit("↩ Resuming: images already in the journal are replayed")
+        self.replay(path, result)
+
+    def run(self):
+        if self.watch_folder is not None:
+            journal = self.journal
+            todo = PageStream(FolderWatcher(
+                self.watch_folder,
+                is_done=journal and (
+                    lambda p: all(journal.result(q) is not None for q in page_ids(p))
+                )
+            ))
+            self.log.emit(f"👀 Watching {self.watch_folder}")
+        elif self.journal is not None:
+            todo = self.journal.unfinished(PageStream(self.paths), self.replay_journaled)
+        else:
+            todo = PageStream(self.paths)
+
+        completed = False
+        try:
+            self.pipeline.run(
+                todo,
+                on_result=self.on_result,
+                on_progress=lambda n, _: self.progress.emit(
+                    self.skipped + n, known_total(self.paths)
+                ),
+                on_error=lambda path, e: self.log.emit(
+                    f"⚠️ {os.path.basename(path)}: {e}"
+                )
+            )
+            completed = not self.pipeline.stopped
+        finally:
+            if self.seen is not None:
+                self.seen.flush()
+            if self.results is not None:
+                self.results.flush()
+            if self.journal is not None:
+                # Only a run that reached the end retires its journal
+                if completed:
+                    self.journal.finish()
+                else:
+                    self.journal.close()
+
 
 class OCRGui(QWidget):
     back_to_selection = pyqtSignal()
@@ -19,17 +171,32 @@ class OCRGui(QWidget):
 
         # ---------- STATE ----------
         self.engine = EasyOCREngine()
-        self.BATCH_SIZE = 4
+        # Max images per engine call; shape buckets shrink it for big frames
+        self.BATCH_SIZE = 16
+        self.BATCH_BUDGET_MB = 512
+        self.DECODE_WORKERS = 2
         self.original_image = None
         self.single_image = None
+        self.single_records = None
+        self.batch_raw = []
+        self.batch_recipe = None
+        self.batch_decoder = None
         self.folder_images = []
 
-        self.batch_index = 0
+        # Slider preview: stage-memoized, proxy while dragging
+        self.preview = PreviewPipeline(self.engine)
+        self.preview_stale = False
+        self.preview_worker = PreviewWorker()
+
         self.batch_running = False
         self.batch_paused = False
+        self.batch_worker = None
+        self.batch_folder = None
+        self.watch_csv = None
+        self.watch_parquet = None
 
-        self.batch_timer = QTimer()
-        self.batch_timer.timeout.connect(self.run_batch_step)
+        self.scan_timer = QTimer()
+        self.scan_timer.timeout.connect(self.update_scan_status)
 
         self._apply_styles()
         self._build_ui()
@@ -40,6 +207,7 @@ class OCRGui(QWidget):
         # Set initial window size to fit any screen
         self.showMaximized()  
         self.batch_results = []
+        self.scored_rules = None
 
 
     # ================= STYLES =================
@@ -225,6 +393,8 @@ class OCRGui(QWidget):
         self.regex.setPlaceholderText("Optional regex")
         self.char_count_input = QLineEdit()
         self.char_count_input.setPlaceholderText("Expected character count")
+        self.lot_input = QLineEdit()
+        self.lot_input.setPlaceholderText("Lot (duplicate check on regex match)")
 
         ol.addWidget(QLabel("Model"))
         ol.addWidget(self.ocr_selector)
@@ -232,6 +402,8 @@ class OCRGui(QWidget):
         ol.addWidget(self.regex)
         ol.addWidget(QLabel("Expected character count"))
         ol.addWidget(self.char_count_input)
+        ol.addWidget(QLabel("Lot"))
+        ol.addWidget(self.lot_input)
 
         control_panel.addWidget(preprocess_group)
         control_panel.addWidget(ocr_group)
@@ -251,9 +423,17 @@ class OCRGui(QWidget):
             QSizePolicy.Preferred
         )
         self.output.setReadOnly(True)
+        # The full log is in logs/; the widget keeps the recent part
+        self.output.document().setMaximumBlockCount(5000)
         # self.output.setMinimumHeight(80)   # Very soft minimum
         # self.output.setMaximumHeight(300)  # Prevent too tall
-        out_l.addWidget(self.output)
+
+        # Batch rows: one table row per image, thumbnails on demand
+        self.results_view = ResultsView()
+        self.output_tabs = QTabWidget()
+        self.output_tabs.addTab(self.output, "Log")
+        self.output_tabs.addTab(self.results_view, "Batch results")
+        out_l.addWidget(self.output_tabs)
 
         # Actions
         action_group = QGroupBox("Actions")
@@ -264,15 +444,33 @@ class OCRGui(QWidget):
         self.load_cfg_btn = QPushButton("Load config")
         self.run_single_btn = QPushButton("Run OCR (Single)")
         self.run_batch_btn = QPushButton("Run Batch")
+        self.export_btn = QPushButton("Export results")
 
         for b in (
             self.save_cfg_btn,
             self.load_cfg_btn,
             self.run_single_btn,
-            self.run_batch_btn
+            self.run_batch_btn,
+            self.export_btn
         ):
             al.addWidget(b)
 
+        self.use_cache = QCheckBox("Reuse cached results")
+        self.use_cache.setChecked(True)
+        al.addWidget(self.use_cache)
+
+        self.watch_folder = QCheckBox("Watch folder for new images")
+        al.addWidget(self.watch_folder)
+
+        self.scan_subfolders = QCheckBox("Include subfolders")
+        al.addWidget(self.scan_subfolders)
+
+        self.export_parquet = QCheckBox("Also export Parquet")
+        if not parquet_export.available():
+            self.export_parquet.setEnabled(False)
+            self.export_parquet.setToolTip("pyarrow is not installed")
+        al.addWidget(self.export_parquet)
+
         # Pause / Resume / Stop row
         ctrl = QHBoxLayout()
         self.pause_btn = QPushButton("Pause")
@@ -313,6 +511,8 @@ class OCRGui(QWidget):
         slider.valueChanged.connect(
             lambda v: (label.setText(f"{name}: {v}"), self.update_preview())
         )
+        # Dragging previews on a proxy; refine at full resolution on release
+        slider.sliderReleased.connect(self.update_preview)
         
         l.addWidget(label)
         l.addWidget(slider)
@@ -324,13 +524,24 @@ class OCRGui(QWidget):
         self.btn_reset.clicked.connect(self.reset_view)
 
         self.run_single_btn.clicked.connect(self.run_single)
+        self.regex.editingFinished.connect(self.rules_changed)
+        self.char_count_input.editingFinished.connect(self.rules_changed)
         self.run_batch_btn.clicked.connect(self.start_batch)
+        self.export_btn.clicked.connect(self.export_results)
 
         self.pause_btn.clicked.connect(self.pause_batch)
         self.resume_btn.clicked.connect(self.resume_batch)
         self.stop_btn.clicked.connect(self.stop_batch)
 
         self.use_clahe.stateChanged.connect(self.update_preview)
+        self.enable_pre.stateChanged.connect(self.update_preview)
+        self.preview_worker.rendered.connect(self.on_preview_rendered)
+        self.preview_worker.failed.connect(self.log)
+        self.results_view.row_selected.connect(self.show_batch_item)
+        self.results_view.overlay_ready.connect(self.show_overlay)
+        self.results_view.overlay_failed.connect(
+            lambda msg: self.log(f"⚠️ Overlay failed: {msg}")
+        )
 
         self.save_cfg_btn.clicked.connect(self.save_preprocess_config)
         self.load_cfg_btn.clicked.connect(self.load_preprocess_config)
@@ -338,11 +549,16 @@ class OCRGui(QWidget):
 
     # ================= CORE =================
     def switch_engine(self):
+        if self.batch_running:
+            self.log("⚠️ Engine can't be switched while a batch is running")
+            return
         self.engine = {
             "Model - 1": DoctrEngine,
             "Model - 2": EasyOCREngine,
             "Model - 3": PPOCREngine
         }[self.ocr_selector.currentText()]()
+        self.preview.set_engine(self.engine)
+        self.single_records = None
         # self.output.append("Engine switched")
         self.log("Engine switched")
 
@@ -363,8 +579,13 @@ class OCRGui(QWidget):
             self.log("❌ Failed to load image")
             return
 
-        # Reset batch state
+        self.preview.set_source(self.original_image)
+
+        # Reset batch state; Watch must not start on the previous folder
+        if isinstance(self.folder_images, FolderScan):
+            self.folder_images.stop()
         self.folder_images = []
+        self.batch_folder = None
         self.batch_running = False
 
         # Preview immediately
@@ -379,41 +600,73 @@ class OCRGui(QWidget):
         if not folder:
             return
 
-        self.folder_images = [
-            os.path.join(folder, f)
-            for f in sorted(os.listdir(folder))
-            if f.lower().endswith((".jpg", ".png", ".bmp", ".tiff"))
-        ]
-
-        if not self.folder_images:
-            # self.output.append("❌ No valid images found")
-            self.log("❌ No valid images found")
-            return
+        # Enumerate in the background; a batch can start on the first files
+        if isinstance(self.folder_images, FolderScan):
+            self.folder_images.stop()
+        self.folder_images = FolderScan(
+            folder, recursive=self.scan_subfolders.isChecked()
+        ).start()
+        self.batch_folder = folder
+        self.scan_timer.start(500)
 
         # Clear single-image state
         self.original_image = None
         self.single_image = None
+        self.preview.clear()
+        self.preview_worker.invalidate()
 
         # Keep upload card visible
         self.image_label.clear()
-        self.image_label.setText("Batch loaded\nClick 'Run Batch' to preview images")
+        self.image_label.setText("Scanning folder…\nClick 'Run Batch' to start now")
         self.image_label.setAlignment(Qt.AlignCenter)
 
         self.upload_card.show()
         self.upload_card.raise_()
 
+    def update_scan_status(self):
+        scan = self.folder_images
+        if not isinstance(scan, FolderScan):
+            self.scan_timer.stop()
+            return
+
+        if not scan.done:
+            if not self.batch_running:
+                self.image_label.setText(
+                    f"Scanning folder… {scan.found} images so far\n"
+                    "Click 'Run Batch' to start now"
+                )
+            return
+
+        self.scan_timer.stop()
+        # An empty hot folder is fine; files arrive once watching starts
+        if not scan.found and not self.watch_folder.isChecked():
+            self.folder_images = []
+            # self.output.append("❌ No valid images found")
+            self.log("❌ No valid images found")
+            return
+
+        if not self.batch_running:
+            self.image_label.setText("Batch loaded\nClick 'Run Batch' to preview images")
         # self.output.append(f"📂 Loaded {len(self.folder_images)} images")
-        self.log(f"📂 Loaded {len(self.folder_images)} images")
+        self.log(f"📂 Loaded {scan.found} images")
 
 
     def reset_view(self):
         self.original_image = None
         self.single_image = None
+        self.single_records = None
+        self.batch_raw = []
+        if isinstance(self.folder_images, FolderScan):
+            self.folder_images.stop()
         self.folder_images = []
+        self.batch_folder = None
+        self.preview.clear()
+        self.preview_worker.invalidate()
 
+        if self.batch_worker is not None:
+            self.batch_worker.pipeline.stop()
         self.batch_running = False
         self.batch_paused = False
-        self.batch_timer.stop()
 
         self.image_label.clear()
         self.image_label.setText("")
@@ -423,47 +676,80 @@ class OCRGui(QWidget):
         self.upload_card.raise_()
 
         self.output.clear()
+        self.results_view.clear()
 
 
+    def sliders_dragging(self):
+        return any(
+            s[1].isSliderDown()
+            for s in (self.brightness, self.contrast, self.gamma, self.rotate)
+        )
+
     def update_preview(self):
         if self.original_image is None:
             return
 
-        img = self.original_image.copy()
+        recipe = self.preprocess_recipe()
+        self.single_records = None
+        self.preview_stale = True
 
-        if self.enable_pre.isChecked():
-            img = self.engine.preprocess(
-                img,
-                self.brightness[1].value(),
-                self.contrast[1].value() / 100,
-                self.gamma[1].value() / 100,
-                self.rotate[1].value(),
-                self.use_clahe.isChecked()
-            )
+        # Proxy sized to the label while dragging; full resolution on release
+        size = (self.image_label.width(), self.image_label.height())
+        proxy = size if self.sliders_dragging() else None
 
-        self.single_image = img
-        self.show_image(img)
+        self.preview_worker.submit(
+            lambda: self.preview.render(recipe, proxy=proxy),
+            size,
+            tag="proxy" if proxy else "full"
+        )
+
+    def on_preview_rendered(self, gen, qimg, img, tag):
+        if not self.preview_worker.is_current(gen):
+            return
+        if tag == "full":
+            self.single_image = img
+            self.preview_stale = False
+        self.image_label.setPixmap(QPixmap.fromImage(qimg))
+        self.upload_card.hide()
 
 
     def run_single(self):
+        if self.batch_running:
+            # The engine is busy on the batch thread
+            return
+        if self.preview_stale and self.original_image is not None:
+            # Full-resolution render has not landed yet; do it here
+            self.preview_worker.invalidate()
+            self.single_image = self.preview.render(self.preprocess_recipe())
+            self.preview_stale = False
         if self.single_image is None:
             return
 
+        # OCR only when the image, preprocessing or engine changed
+        if self.single_records is None:
+            result = self.engine.run_batch([self.single_image])[0]
+            self.single_records = self.engine.to_records(result, self.single_image.shape)
+
+        self.rescore_single()
+
+    def rescore_single(self):
         self.output.clear()
 
         img = self.single_image.copy()
-
-        # OCR
-        result = self.engine.run_batch([img])[0]
-        raw_text = self.engine.extract_all_text(result)
+        records = self.single_records
+        raw_text = self.engine.records_text(records)
 
         regex = self.regex.text().strip()
         matches = []
 
         # Regex highlighting
         if regex:
-            matches = self.engine.extract_matches(result, regex)
-            img = self.engine.draw_matches(img, result, regex)
+            try:
+                matches = self.engine.records_matches(records, regex)
+            except re.error as e:
+                self.log(f"❌ Invalid regex: {e}")
+                return
+            img = self.engine.draw_records(img, records, regex)
 
         # Character count validation + overlay
         status = self.validate_char_count(raw_text)
@@ -480,29 +766,75 @@ class OCRGui(QWidget):
 
 
 
-    # ================= BATCH (unchanged logic) =================
+    # ================= BATCH =================
     def start_batch(self):
-        if not self.folder_images:
+        watching = self.watch_folder.isChecked() and self.batch_folder is not None
+        if not (self.folder_images or watching) or self.batch_running:
             return
         self.batch_results.clear()
         self.upload_card.hide()
-        self.batch_index = 0
         self.batch_running = True
         self.batch_paused = False
+        self.batch_raw = []
+        self.scored_rules = self.rules_key()
+        self.batch_recipe = self.preprocess_recipe()
+        # Same reads as the pipeline, so stored boxes land on the overlay
+        self.batch_decoder = ImageDecoder.for_engine(self.engine, self.batch_recipe)
+        self.results_view.clear()
+        self.output_tabs.setCurrentWidget(self.results_view)
+
+        lot = self.lot_input.text().strip()
+        # Same folder + preprocessing + engine + mode resumes an unfinished
+        # run; a watch journal marks files as processed, a batch one doesn't
+        journal = RunJournal.for_run(
+            "ocr",
+            [os.path.join(self.batch_folder, "*")],
+            f"{config_digest(self.batch_recipe)}:{self.engine.engine_id}:"
+            f"{self.scan_subfolders.isChecked()}:{'watch' if watching else 'batch'}",
+            sync_every=1 if watching else self.BATCH_SIZE
+        )
+        self.batch_worker = OCRBatchWorker(
+            self.engine,
+            self.folder_images,
+            self.batch_recipe,
+            self.validation_rules(),
+            lot=lot,
+            batcher=ShapeBatcher(self.BATCH_SIZE, self.BATCH_BUDGET_MB),
+            workers=self.DECODE_WORKERS,
+            seen=shared_store() if lot else None,
+            cache=shared_cache() if self.use_cache.isChecked() else None,
+            journal=journal,
+            watch_folder=self.batch_folder if watching else None,
+            results=shared_results()
+        )
+        self.batch_worker.result_ready.connect(self.on_batch_result)
+        self.batch_worker.log.connect(self.log)
+        self.batch_worker.finished.connect(self.on_batch_finished)
 
         self.run_batch_btn.setEnabled(False)
         self.pause_btn.setEnabled(True)
         self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
 
-        # self.output.append("▶ Batch started")
-        self.log("▶ Batch started")
-        self.batch_timer.start(300)
+        if watching:
+            self.open_watch_csv()
+        else:
+            scan = self.folder_images
+            if isinstance(scan, FolderScan) and not scan.done:
+                self.log(f"▶ Batch started ({scan.found} images found, scan continuing)")
+            else:
+                self.log(f"▶ Batch started ({known_total(scan)} images)")
+        decode = self.batch_decoder.describe()
+        if decode:
+            self.log(f"🖼 Reduced decode: {decode}")
+        self.batch_worker.start()
 
 
     def pause_batch(self):
+        if not self.batch_running:
+            return
         self.batch_paused = True
-        self.batch_timer.stop()
+        self.batch_worker.pipeline.pause()
         self.pause_btn.setEnabled(False)
         self.resume_btn.setEnabled(True)
         # self.output.append("⏸ Batch paused")
@@ -514,7 +846,7 @@ class OCRGui(QWidget):
         if not self.batch_running:
             return
         self.batch_paused = False
-        self.batch_timer.start(300)
+        self.batch_worker.pipeline.resume()
         self.pause_btn.setEnabled(True)
         self.resume_btn.setEnabled(False)
         # self.output.append("▶ Batch resumed")
@@ -522,102 +854,212 @@ class OCRGui(QWidget):
 
 
     def stop_batch(self):
-        self.batch_timer.stop()
-        self.batch_running = False
+        if self.batch_worker is not None:
+            self.batch_worker.pipeline.stop()
         self.batch_paused = False
 
-        self.run_batch_btn.setEnabled(True)
         self.pause_btn.setEnabled(False)
         self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(False)
 
-        # self.output.append("⛔ Batch stopped")
-        self.log("⛔ Batch stopped")
 
+    def on_batch_result(self, row, img):
+        eval_data = row["eval"]
+
+        # Raw results stay around so rule changes can re-score the batch
+        self.batch_raw.append({
+            "path": row["path"],
+            "file_name": row["file_name"],
+            "records": row["records"],
+            "duplicate": eval_data["duplicate"],
+            **row["timing"]
+        })
+        self.batch_results.append(self.batch_row(self.batch_raw[-1], eval_data))
+        self.results_view.add(
+            row["path"], row["file_name"], eval_data["final_result"],
+            self.batch_detail(self.batch_results[-1])
+        )
 
-    def run_batch_step(self):
-        if not self.batch_running or self.batch_paused:
-            return
+        # Per-image lines go to the log file; the results table shows them
+        self.log(
+            f"{row['file_name']} | chars={eval_data['detected_count']} | "
+            f"result={eval_data['final_result']}",
+            ui=False
+        )
 
-        # ✅ FINAL completion check (ONLY place)
-        if self.batch_index >= len(self.folder_images):
-            self.batch_timer.stop()
-            self.batch_running = False
+        if self.watch_csv is not None:
+            f, writer = self.watch_csv
+            writer.writerow(self.batch_results[-1])
+            f.flush()
+        if self.watch_parquet is not None:
+            self.watch_parquet.append(self.batch_results[-1])
+
+        # A row the user picked stays on screen
+        if img is not None and not self.results_view.has_selection():
+            self.show_image(
+                self.engine.draw_records(img.copy(), row["records"], self.regex.text().strip())
+            )
 
-            self.run_batch_btn.setEnabled(True)
-            self.pause_btn.setEnabled(False)
-            self.resume_btn.setEnabled(False)
-            self.stop_btn.setEnabled(False)
+    def on_batch_finished(self):
+        pipeline = self.batch_worker.pipeline
+        stats = pipeline.stats
 
+        self.batch_running = False
+        self.batch_paused = False
+        self.run_batch_btn.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.resume_btn.setEnabled(False)
+        self.stop_btn.setEnabled(False)
+        self.results_view.flush()
+
+        if pipeline.error is not None:
+            self.log(f"❌ Batch failed: {pipeline.error}")
+        elif pipeline.stopped:
+            # self.output.append("⛔ Batch stopped")
+            self.log("⛔ Batch stopped")
+        else:
             self.log("✅ Batch completed")
+        self.log(
+            f"Pipeline: {stats['batches']} engine batches, "
+            f"{stats['infer_s']:.1f} s inference, "
+            f"{stats['starved_s']:.1f} s waiting on decode"
+        )
+        self.log(f"Decode: {pipeline.decoder.summary()}")
+        if pipeline.cache is not None:
+            self.log(
+                f"Cache: {stats['hits']} hits, "
+                f"{stats['misses']} misses, "
+                f"{stats['duplicates']} identical files skipped"
+            )
+
+        if self.watch_csv is not None:
+            self.watch_csv[0].close()
+            self.watch_csv = None
+            if self.watch_parquet is not None:
+                self.watch_parquet.close()
+                self.watch_parquet = None
+            self.batch_results.clear()
+        elif not pipeline.stopped:
             self.export_batch_csv()
             self.batch_results.clear()
-            return
-
-        batch_paths = self.folder_images[
-            self.batch_index : self.batch_index + self.BATCH_SIZE
-        ]
 
-        images = []
-        valid_paths = []
-
-        for p in batch_paths:
-            img = cv2.imread(p)
-            if img is None:
-                self.log(f"⚠️ Failed to read image: {os.path.basename(p)}")
-                continue
-
-            if self.enable_pre.isChecked():
-                img = self.engine.preprocess(
-                    img,
-                    self.brightness[1].value(),
-                    self.contrast[1].value() / 100,
-                    self.gamma[1].value() / 100,
-                    self.rotate[1].value(),
-                    self.use_clahe.isChecked()
-                )
-
-            images.append(img)
-            valid_paths.append(p)
+    def open_watch_csv(self):
+        # Watch runs don't end on their own; rows go to disk as they arrive
+        os.makedirs("exports", exist_ok=True)
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join("exports", f"watch_result_{ts}.csv")
+
+        f = open(path, "w", newline="", encoding="utf-8")
+        writer = csv.DictWriter(f, fieldnames=BATCH_CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        self.watch_csv = (f, writer)
+        self.log(f"📁 Streaming results to {path}")
+
+        if self.export_parquet.isChecked():
+            # Record batches land on disk every chunk rows; readable once the watch stops
+            path = os.path.splitext(path)[0] + ".parquet"
+            self.watch_parquet = parquet_export.ParquetRowWriter(
+                path, parquet_export.OCR_BATCH_COLUMNS, chunk=256
+            )
+            self.log(f"📁 Streaming results to {path}")
 
-        if not images:
-            self.batch_index += self.BATCH_SIZE
+    def rules_changed(self):
+        if self.batch_running:
+            return
+        try:
+            if self.single_records is not None:
+                self.rescore_single()
+            elif self.batch_raw:
+                self.rescore_batch()
+        except re.error as e:
+            self.log(f"❌ Invalid regex: {e}")
+
+    def rescore_batch(self):
+        # In memory only; editingFinished also fires on Enter / focus-out
+        # with nothing changed, so unchanged rules are a no-op
+        if not self.batch_raw or self.batch_running:
+            return
+        key = self.rules_key()
+        if key == self.scored_rules:
             return
 
-        # Run OCR
-        results = self.engine.run_batch(images)
+        t0 = time.perf_counter()
+        self.batch_results = self.score_batch(self.validation_rules())
+        self.scored_rules = key
 
+        elapsed = (time.perf_counter() - t0) * 1000
+        ok = sum(r["final_result"] == "OK" for r in self.batch_results)
         self.log(
-            f"Processing images {self.batch_index + 1} → "
-            f"{min(self.batch_index + self.BATCH_SIZE, len(self.folder_images))}"
+            f"🔁 Re-scored {len(self.batch_results)} images in {elapsed:.0f} ms | "
+            f"OK={ok} NOT_OK={len(self.batch_results) - ok} (Export results to save)"
         )
+        self.results_view.replace([
+            (item["path"], item["file_name"], r["final_result"], self.batch_detail(r))
+            for item, r in zip(self.batch_raw, self.batch_results)
+        ])
+
+        # Redraw the selected (or last) overlay from stored boxes; no inference
+        row = self.results_view.selected_row()
+        self.show_batch_item(row if row >= 0 else len(self.batch_raw) - 1)
+
+    def score_batch(self, rules):
+        rows = []
+        for item in self.batch_raw:
+            eval_data = self.evaluate_result(
+                self.engine.records_text(item["records"]), rules
+            )
+            eval_data["duplicate"] = item["duplicate"]
+            if item["duplicate"]:
+                eval_data["final_result"] = "NOT_OK"
+            rows.append(self.batch_row(item, eval_data))
+        return rows
+
+    def export_results(self):
+        # The verdicts on screen, re-scored or not, on request
+        if self.batch_running:
+            return
+        if not self.batch_results and self.batch_raw:
+            try:
+                self.batch_results = self.score_batch(self.validation_rules())
+            except re.error as e:
+                self.log(f"❌ Invalid regex: {e}")
+                return
+        if not self.batch_results:
+            self.log("Nothing to export yet")
+            return
+        self.export_batch_csv()
 
-        for i, res in enumerate(results):
-            texts = self.engine.extract_all_text(res)
-            file_name = os.path.basename(valid_paths[i])
-
-            eval_data = self.evaluate_result(texts)
+    def show_batch_item(self, row):
+        # Annotated overlay of one batch row, rendered on the results view's thread
+        if not 0 <= row < len(self.batch_raw) or self.batch_recipe is None:
+            return
+        item = self.batch_raw[row]
+        engine, recipe, decoder = self.engine, self.batch_recipe, self.batch_decoder
+        regex = self.regex.text().strip()
+        size = (self.image_label.width(), self.image_label.height())
 
-            self.batch_results.append({
-                "file_name": file_name,
-                **eval_data
-            })
+        def render():
+            img = load_batch_image(engine, item["path"], recipe, decoder)
+            return None if img is None else engine.draw_records(img, item["records"], regex)
 
-            self.log(
-                f"{file_name} | chars={eval_data['detected_count']} | "
-                f"result={eval_data['final_result']}"
-            )
+        self.results_view.show_overlay((item["path"], regex, size), render, size)
 
-        # Preview last image of this batch chunk
-        annotated = self.engine.draw_matches(
-            images[-1].copy(),
-            results[-1],
-            self.regex.text().strip()
-        )
-        self.show_image(annotated)
-        self.batch_index += self.BATCH_SIZE
+    def show_overlay(self, pix):
+        self.preview_worker.invalidate()
+        self.image_label.setPixmap(pix)
+        self.upload_card.hide()
 
     # ================= CONFIG =================
+    def preprocess_recipe(self):
+        return {
+            "enable_preprocessing": self.enable_pre.isChecked(),
+            "use_clahe": self.use_clahe.isChecked(),
+            "brightness": self.brightness[1].value(),
+            "contrast": self.contrast[1].value() / 100,
+            "gamma": self.gamma[1].value() / 100,
+            "fine_rotate": self.rotate[1].value()
+        }
+
     def save_preprocess_config(self):
         path, _ = QFileDialog.getSaveFileName(
             self, "Save Config", "config.json", "JSON (*.json)"
@@ -627,12 +1069,7 @@ class OCRGui(QWidget):
 
         cfg = {
             "ocr_model": self.ocr_selector.currentText(),
-            "enable_preprocessing": self.enable_pre.isChecked(),
-            "use_clahe": self.use_clahe.isChecked(),
-            "brightness": self.brightness[1].value(),
-            "contrast": self.contrast[1].value() / 100,
-            "gamma": self.gamma[1].value() / 100,
-            "fine_rotate": self.rotate[1].value()
+            **self.preprocess_recipe()
         }
         regex = self.regex.text().strip()
         if regex:
@@ -663,6 +1100,9 @@ class OCRGui(QWidget):
 
     # ================= DISPLAY =================
     def show_image(self, img):
+        # A direct image replaces whatever preview is still rendering
+        self.preview_worker.invalidate()
+
         rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         h, w, _ = rgb.shape
 
@@ -694,12 +1134,12 @@ class OCRGui(QWidget):
         with open(self.log_file_path, "w", encoding="utf-8") as f:
             f.write(f"OCR LOG STARTED AT {ts}\n")
             f.write("=" * 60 + "\n")
-    def log(self, message):
+    def log(self, message, ui=True):
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         line = f"[{ts}] {message}"
 
         # UI log
-        if hasattr(self, "output"):
+        if ui and hasattr(self, "output"):
             self.output.append(line)
         # self.log.append(line)
 
@@ -707,34 +1147,18 @@ class OCRGui(QWidget):
         with open(self.log_file_path, "a", encoding="utf-8") as f:
             f.write(line + "\n")
 
-    def evaluate_result(self, texts):
-        full_text = " ".join(texts)
-        cleaned = re.sub(r'[^A-Za-z0-9]', '', full_text)
-        detected_count = len(cleaned)
+    def rules_key(self):
+        return self.char_count_input.text().strip(), self.regex.text().strip()
 
-        expected_raw = self.char_count_input.text().strip()
-        regex = self.regex.text().strip()
-
-        expected = int(expected_raw) if expected_raw.isdigit() else None
-
-        # ✅ SAME RULE AS SINGLE
-        not_ok = False
-        if expected is not None:
-            not_ok = detected_count < expected
-
-        regex_ok = True
-        if regex:
-            regex_ok = bool(re.search(regex, full_text))
-
-        final_ok = (not not_ok) and regex_ok
+    def validation_rules(self):
+        # Read the widgets and compile once per batch / re-score, not per image
+        return make_rules(
+            self.char_count_input.text().strip(),
+            self.regex.text().strip()
+        )
 
-        return {
-            "detected_count": detected_count,
-            "expected_count": expected if expected is not None else "",
-            "regex": regex if regex else "",
-            "regex_match": regex_ok if regex else "N/A",
-            "final_result": "OK" if final_ok else "NOT_OK"
-        }
+    def evaluate_result(self, texts, rules=None):
+        return evaluate_texts(texts, rules or self.validation_rules())
 
     def export_batch_csv(self):
         if not self.batch_results:
@@ -744,22 +1168,36 @@ class OCRGui(QWidget):
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         path = os.path.join("exports", f"batch_result_{ts}.csv")
 
-        keys = [
-                "file_name",
-                "expected_count",
-                "regex",
-                "detected_count",
-                "regex_match",
-                "final_result"
-            ]
-
         with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
+            writer = csv.DictWriter(f, fieldnames=BATCH_CSV_FIELDS, extrasaction="ignore")
             writer.writeheader()
             writer.writerows(self.batch_results)
 
         self.log(f"📁 Batch CSV exported: {path}")
 
+        if self.export_parquet.isChecked():
+            path = os.path.splitext(path)[0] + ".parquet"
+            parquet_export.export_rows(path, self.batch_results, parquet_export.OCR_BATCH_COLUMNS)
+            self.log(f"📁 Batch Parquet exported: {path}")
+
+    def batch_row(self, item, eval_data):
+        # CSV columns plus what the Parquet export keeps: raw text, matches, timings
+        records = item["records"]
+        regex = eval_data["regex"]
+        return {
+            "file_name": item["file_name"],
+            **eval_data,
+            "raw_text": self.engine.records_text(records),
+            "matches": self.engine.records_matches(records, regex) if regex else [],
+            "decode_ms": item.get("decode_ms"),
+            "infer_ms": item.get("infer_ms")
+        }
+
+    @staticmethod
+    def batch_detail(row):
+        # Results table text: what the regex extracted, else the raw text
+        return " | ".join(row["matches"] or row["raw_text"])
+
     def validate_char_count(self, texts):
         val = self.char_count_input.text().strip()
         if not val.isdigit():
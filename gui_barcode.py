@@ -1,22 +1,136 @@
 import os
 import cv2
 import json
+import time
 
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QFileDialog,
     QVBoxLayout, QHBoxLayout, QSlider,
     QTextEdit, QLineEdit, QCheckBox, QComboBox,
-    QGroupBox, QScrollArea
+    QGroupBox, QScrollArea, QProgressBar
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 from PyQt5.QtGui import QPixmap, QImage
 
 from ocr_engine import BarcodeEngine
+from expected_store import ExpectedValueIndex
+from seen_store import shared_store
+from results_store import shared_results
+from result_cache import shared_cache, config_digest
+from barcode_batch import BarcodeBatchExecutor, JsonArrayWriter
+from preview_worker import PreviewWorker
+from results_view import ResultsView
+from run_journal import RunJournal
+from folder_scan import FolderScan, known_total
+from image_decode import ImageDecoder, PageStream, image_id
+
+
+# ================= BATCH THREAD =================
+class BarcodeBatchWorker(QThread):
+    result_ready = pyqtSignal(str, dict)
+    progress = pyqtSignal(int, int)
+    log = pyqtSignal(str)
+
+    # Journal fsync interval (images)
+    JOURNAL_CHUNK = 32
+
+    def __init__(self, paths, recipe, json_path, workers=None, seen=None, cache=None,
+                 resumable=True, folder=None, results=None):
+        super().__init__()
+        # A list or a FolderScan still enumerating; consumed lazily either way
+        self.paths = paths
+        self.json_path = json_path
+        self.executor = BarcodeBatchExecutor(recipe, workers=workers, cache=cache)
+        self.lot = recipe.get("lot", "")
+        self.seen = seen
+        self.results = results
+        self.recipe_id = config_digest(recipe)
+
+        # Entries carry verdicts, so every recipe key is part of the run identity
+        self.journal = None
+        if resumable:
+            self.journal = RunJournal.for_run(
+                "barcode",
+                [os.path.join(folder, "*")] if folder else list(paths),
+                json.dumps(
+                    [recipe, getattr(paths, "recursive", False)],
+                    sort_keys=True, default=str
+                ),
+                sync_every=self.JOURNAL_CHUNK
+            )
+
+    def check_duplicate(self, path, entry):
+        if self.seen is None:
+            return
+        entry["duplicate"] = self.seen.check_values(
+            entry["values"], self.lot, f"barcode_batch:{entry['image']}",
+            image_id(path)
+        )
+
+    def run(self):
+        writer = JsonArrayWriter(self.json_path)
+        skipped = [0]
+
+        # Files finished by an interrupted run go straight into the output
+        def replay(path, entry):
+            skipped[0] += 1
+            if skipped[0] == 1:
+                self.log.emit("↩ Resuming: images already in the journal are replayed")
+            writer.append(entry)
+            self.result_ready.emit(path, entry)
+
+        if self.journal is not None:
+            todo = self.journal.unfinished(PageStream(self.paths), replay)
+        else:
+            todo = PageStream(self.paths)
+
+        def on_result(path, entry):
+            self.check_duplicate(path, entry)
+            writer.append(entry)
+            if self.journal is not None:
+                self.journal.append(path, entry)
+            if self.results is not None:
+                self.results.add(
+                    "barcode_batch", entry["image"], entry["status"], entry["values"],
+                    lot=self.lot, recipe=self.recipe_id,
+                    engine=self.executor.engine.engine_id,
+                    duplicate=entry.get("duplicate", False), payload={"path": path, **entry}
+                )
+            self.result_ready.emit(path, entry)
+
+        completed = False
+        try:
+            self.executor.run(
+                todo,
+                on_result=on_result,
+                on_progress=lambda n, _: self.progress.emit(
+                    skipped[0] + n, known_total(self.paths)
+                ),
+                on_error=lambda path, e: self.log.emit(
+                    f"⚠️ {os.path.basename(path)}: {e}"
+                )
+            )
+            completed = not self.executor.stopped
+        finally:
+            writer.close()
+            if self.seen is not None:
+                self.seen.flush()
+            if self.results is not None:
+                self.results.flush()
+            if self.journal is not None:
+                # Only a run that reached the end retires its journal
+                if completed:
+                    self.journal.finish()
+                else:
+                    self.journal.close()
 
 
 class BarcodeGui(QWidget):
     back_to_selection = pyqtSignal()
 
+    # Seconds between annotated previews while a batch is streaming
+    PREVIEW_INTERVAL = 0.25
+
     def __init__(self):
         super().__init__()
 
@@ -25,13 +139,23 @@ class BarcodeGui(QWidget):
         self.original_image = None
         self.single_image = None
         self.folder_images = []
+        self.expected_index = None
+        self.expected_index_path = None
 
         # Batch state
-        self.batch_index = 0
         self.batch_running = False
         self.batch_paused = False
         self.batch_results = []
-        self.batch_timer = None
+        self.batch_paths = []
+        self.batch_recipe = None
+        self.batch_worker = None
+        self.last_preview = 0.0
+        self.preview_worker = PreviewWorker()
+
+        # Folder enumeration progress
+        self.scan_reported = 0
+        self.scan_timer = QTimer()
+        self.scan_timer.timeout.connect(self.update_scan_status)
 
         self._apply_styles()
         self._build_ui()
@@ -81,8 +205,12 @@ class BarcodeGui(QWidget):
         self.image_label.setMinimumSize(720, 520)
         self.image_label.setStyleSheet("border:2px dashed #c7d2fe;")
 
+        # Batch rows: one table row per image, thumbnails on demand
+        self.results_view = ResultsView()
+
         left.addWidget(back_btn, alignment=Qt.AlignLeft)
-        left.addWidget(self.image_label)
+        left.addWidget(self.image_label, 3)
+        left.addWidget(self.results_view, 2)
 
         # ===== RIGHT =====
         right_scroll = QScrollArea()
@@ -131,9 +259,21 @@ class BarcodeGui(QWidget):
         ml = QVBoxLayout(match_group)
         self.expected_input = QLineEdit()
         self.expected_input.setPlaceholderText("Expected barcode value")
+        self.symbols_input = QLineEdit()
+        self.symbols_input.setPlaceholderText("Symbologies (e.g. CODE128, QRCODE)")
+        self.load_expected_btn = QPushButton("Load Expected List")
+        self.lot_input = QLineEdit()
+        self.lot_input.setPlaceholderText("Lot (duplicate check, optional)")
         ml.addWidget(self.expected_input)
+        ml.addWidget(self.load_expected_btn)
+        ml.addWidget(self.symbols_input)
+        ml.addWidget(self.lot_input)
 
         # Controls
+        self.use_cache = QCheckBox("Reuse cached results")
+        self.use_cache.setChecked(True)
+        self.scan_subfolders = QCheckBox("Include subfolders")
+
         self.run_single_btn = QPushButton("Run (Single)")
         self.run_batch_btn = QPushButton("Run (Folder)")
         self.pause_btn = QPushButton("Pause")
@@ -144,18 +284,25 @@ class BarcodeGui(QWidget):
         self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(False)
 
+        self.progress = QProgressBar()
+        self.progress.setValue(0)
+
         self.output = QTextEdit()
         self.output.setReadOnly(True)
         self.output.setFixedHeight(160)
+        self.output.document().setMaximumBlockCount(2000)
 
         right.addWidget(upload_group)
         right.addWidget(preprocess_group)
         right.addWidget(match_group)
+        right.addWidget(self.use_cache)
+        right.addWidget(self.scan_subfolders)
         right.addWidget(self.run_single_btn)
         right.addWidget(self.run_batch_btn)
         right.addWidget(self.pause_btn)
         right.addWidget(self.resume_btn)
         right.addWidget(self.stop_btn)
+        right.addWidget(self.progress)
         right.addWidget(self.output)
 
         right_scroll.setWidget(right_widget)
@@ -186,12 +333,22 @@ class BarcodeGui(QWidget):
         self.pause_btn.clicked.connect(self.pause_batch)
         self.resume_btn.clicked.connect(self.resume_batch)
         self.stop_btn.clicked.connect(self.stop_batch)
+        self.symbols_input.editingFinished.connect(self.apply_symbols)
+        self.load_expected_btn.clicked.connect(self.load_expected_list)
+        self.expected_input.textChanged.connect(self.clear_expected_list)
 
         for _, s in [self.brightness, self.contrast, self.gamma, self.rotate]:
             s.valueChanged.connect(self.update_preview)
 
         self.enable_pre.stateChanged.connect(self.update_preview)
         self.rotate_preset.currentIndexChanged.connect(self.update_preview)
+        self.preview_worker.rendered.connect(self.on_preview_rendered)
+        self.preview_worker.failed.connect(self.output.append)
+        self.results_view.row_selected.connect(self.show_batch_item)
+        self.results_view.overlay_ready.connect(self.show_overlay)
+        self.results_view.overlay_failed.connect(
+            lambda msg: self.output.append(f"Overlay failed: {msg}")
+        )
 
     # ---------------- LOGIC ----------------
     def get_rotation_angle(self):
@@ -199,12 +356,11 @@ class BarcodeGui(QWidget):
         fine = self.rotate[1].value()
         return (preset + fine) % 360
 
-    def preprocess(self, img):
+    def preprocess_args(self):
+        # Widget values for engine.preprocess; None when preprocessing is off
         if not self.enable_pre.isChecked():
-            return img
-
-        return self.engine.preprocess(
-            img,
+            return None
+        return (
             self.brightness[1].value(),
             self.contrast[1].value() / 100.0,
             self.gamma[1].value() / 100.0,
@@ -212,11 +368,60 @@ class BarcodeGui(QWidget):
             self.use_clahe.isChecked()
         )
 
+    def preprocess(self, img, args=None):
+        args = args or self.preprocess_args()
+        if args is None:
+            return img
+        return self.engine.preprocess(img, *args)
+
+    def apply_symbols(self):
+        try:
+            self.engine.set_symbols(self.symbols_input.text().strip())
+        except ValueError as e:
+            self.output.append(str(e))
+
+    def load_expected_list(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Expected Values", "", "Values (*.csv *.json *.txt)"
+        )
+        if not path:
+            return
+
+        try:
+            self.expected_index = ExpectedValueIndex.load(path)
+        except (OSError, ValueError) as e:
+            self.output.append(f"Expected list not loaded: {e}")
+            return
+
+        self.expected_index_path = path
+        self.output.append(
+            f"Expected list loaded: {len(self.expected_index)} values"
+        )
+
+    def clear_expected_list(self):
+        # Typing a value overrides a loaded list
+        self.expected_index = None
+        self.expected_index_path = None
+
+    def current_expected(self):
+        if self.expected_index is not None:
+            return self.expected_index
+        return self.expected_input.text().strip()
+
     def update_preview(self):
         if self.original_image is None:
             return
-        img = self.preprocess(self.original_image.copy())
-        self.show_image(img)
+        # Widgets are read here; the worker only sees plain values
+        img = self.original_image
+        args = self.preprocess_args()
+        self.preview_worker.submit(
+            lambda: self.preprocess(img, args) if args else img,
+            (self.image_label.width(), self.image_label.height())
+        )
+
+    def on_preview_rendered(self, gen, qimg, img, tag):
+        if self.preview_worker.is_current(gen):
+            self.image_label.setPixmap(QPixmap.fromImage(qimg))
 
     def load_image(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Image")
@@ -228,12 +433,31 @@ class BarcodeGui(QWidget):
     def load_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
         if folder:
-            self.folder_images = [
-                os.path.join(folder, f)
-                for f in sorted(os.listdir(folder))
-                if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".tiff"))
-            ]
-            self.output.append(f"Loaded {len(self.folder_images)} images")
+            # Enumerate in the background; a batch can start on the first files
+            if isinstance(self.folder_images, FolderScan):
+                self.folder_images.stop()
+            self.folder_images = FolderScan(
+                folder, recursive=self.scan_subfolders.isChecked()
+            ).start()
+            self.scan_reported = 0
+            self.scan_timer.start(500)
+            self.output.append(f"Scanning {folder} …")
+
+    def update_scan_status(self):
+        scan = self.folder_images
+        if not isinstance(scan, FolderScan):
+            self.scan_timer.stop()
+            return
+
+        if scan.done:
+            self.scan_timer.stop()
+            self.output.append(f"Loaded {scan.found} images")
+            if not scan.found:
+                self.folder_images = []
+        elif scan.found - self.scan_reported >= 1000:
+            # Approximate count while the walk continues
+            self.scan_reported = scan.found
+            self.output.append(f"… {scan.found} images found so far")
 
     # ---------------- SINGLE ----------------
     def run_single(self):
@@ -241,20 +465,12 @@ class BarcodeGui(QWidget):
             return
 
         img = self.preprocess(self.original_image.copy())
-        result = self.engine.run_batch([img])[0]
-
-        matches, values = self.engine.extract_matches(
-            result,
-            self.expected_input.text().strip()
-        )
-
-        if not values:
-            status = "NO BARCODE"
-        elif matches:
-            status = "MATCH"
-        else:
-            status = "NOT MATCH"
+        result, regions = self.engine.decode(img)
+        status, values = self.engine.verdict(result, self.current_expected())
 
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        img = self.engine.draw_regions(img, regions)
         img = self.draw_status_text(img, status)
 
         self.output.setText(f"Detected: {values}\n{status}")
@@ -262,89 +478,178 @@ class BarcodeGui(QWidget):
 
 
     # ---------------- BATCH ----------------
+    def current_recipe(self):
+        return {
+            "enable_preprocessing": self.enable_pre.isChecked(),
+            "use_clahe": self.use_clahe.isChecked(),
+            "brightness": self.brightness[1].value(),
+            "contrast": self.contrast[1].value() / 100.0,
+            "gamma": self.gamma[1].value() / 100.0,
+            "fine_rotate": self.rotate[1].value(),
+            "rotate_preset": int(self.rotate_preset.currentText().replace("°", "")),
+            "expected_value": self.expected_input.text().strip(),
+            "expected_index_path": self.expected_index_path,
+            "barcode_symbols": self.symbols_input.text().strip() or None,
+            "barcode_localize": self.engine.use_localization,
+            "barcode_grayscale": self.engine.grayscale,
+            "barcode_ladder": self.engine.ladder,
+            "barcode_budget_ms": self.engine.budget_ms,
+            "lot": self.lot_input.text().strip()
+        }
+
     def run_batch(self):
-        if not self.folder_images:
+        if not self.folder_images or self.batch_running:
             return
 
-        self.batch_index = 0
         self.batch_results.clear()
+        self.batch_paths.clear()
+        self.results_view.clear()
         self.batch_running = True
+        self.batch_paused = False
+        self.last_preview = 0.0
 
+        # Grows while the folder scan is still running
+        self.progress.setRange(0, max(1, known_total(self.folder_images)))
+        self.progress.setValue(0)
+
+        self.run_batch_btn.setEnabled(False)
         self.pause_btn.setEnabled(True)
+        self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
 
-        self.batch_timer = QTimer(self)
-        self.batch_timer.timeout.connect(self.run_batch_step)
-        self.batch_timer.start(400)
-
-    def run_batch_step(self):
-        if self.batch_index >= len(self.folder_images):
-            self.batch_timer.stop()
-            self.batch_running = False
+        recipe = self.current_recipe()
+        self.batch_recipe = recipe
+        self.batch_worker = BarcodeBatchWorker(
+            self.folder_images,
+            recipe,
+            "barcode_results.json",
+            seen=shared_store() if recipe["lot"] else None,
+            cache=shared_cache() if self.use_cache.isChecked() else None,
+            folder=getattr(self.folder_images, "root", None),
+            results=shared_results()
+        )
+        self.batch_worker.result_ready.connect(self.on_batch_result)
+        self.batch_worker.progress.connect(self.on_batch_progress)
+        self.batch_worker.log.connect(self.output.append)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+
+        self.output.append(
+            f"▶ Batch started on {self.batch_worker.executor.workers} workers"
+        )
 
-            with open("barcode_results.json", "w", encoding="utf-8") as f:
-                json.dump(self.batch_results, f, indent=4)
+    def on_batch_result(self, path, entry):
+        self.batch_results.append(entry)
+        self.batch_paths.append(path)
+        dup = " [DUPLICATE]" if entry.get("duplicate") else ""
+        # The table replaces the per-image log lines
+        self.results_view.add(
+            path, entry["image"], entry["status"], "; ".join(entry["values"]) + dup
+        )
 
-            self.output.append(" Batch completed")
+        # Annotated preview at a bounded rate; the pool is far faster than repaint.
+        # A row the user picked stays on screen
+        now = time.monotonic()
+        if now - self.last_preview < self.PREVIEW_INTERVAL or self.results_view.has_selection():
             return
+        self.last_preview = now
 
-        path = self.folder_images[self.batch_index]
-        img = cv2.imread(path)
+        img = ImageDecoder().read(path)
+        if img is not None:
+            self.show_image(self.draw_status_text(img, entry["status"]))
 
-        if img is None:
-            self.batch_index += 1
+    def show_batch_item(self, row):
+        # Annotated overlay of one batch row, rendered on the results view's thread
+        if not 0 <= row < len(self.batch_results):
             return
+        path, entry = self.batch_paths[row], self.batch_results[row]
+        recipe = self.batch_recipe
+        args = None
+        if recipe and recipe["enable_preprocessing"]:
+            args = (
+                recipe["brightness"], recipe["contrast"], recipe["gamma"],
+                (recipe["rotate_preset"] + recipe["fine_rotate"]) % 360, recipe["use_clahe"]
+            )
+        engine = self.engine
+        size = (self.image_label.width(), self.image_label.height())
+
+        def render():
+            img = ImageDecoder().read(path)
+            if img is None:
+                return None
+            if args is not None:
+                img = engine.preprocess(img, *args)
+                if img.ndim == 2:
+                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+            return self.draw_status_text(img, entry["status"])
+
+        self.results_view.show_overlay((path, size), render, size)
+
+    def show_overlay(self, pix):
+        self.preview_worker.invalidate()
+        self.image_label.setPixmap(pix)
 
-        img = self.preprocess(img)
-        result = self.engine.run_batch([img])[0]
-
-        matches, values = self.engine.extract_matches(
-            result,
-            self.expected_input.text().strip()
-        )
-
-        if not values:
-            status = "NO BARCODE"
-        elif matches:
-            status = "MATCH"
-        else:
-            status = "NOT MATCH"
-
-        img = self.draw_status_text(img, status)
-
-        self.output.append(f"{os.path.basename(path)} → {status}")
+    def on_batch_progress(self, done, total):
+        # total counts files found so far; TIFF pages can push done past it
+        total = max(total, done)
+        if total > self.progress.maximum():
+            self.progress.setMaximum(total)
+        self.progress.setValue(done)
+
+    def on_batch_finished(self):
+        executor = self.batch_worker.executor
+        stopped = executor.stopped
+        self.log_ladder_stats(executor.ladder_stats)
+        if executor.cache is not None:
+            self.output.append(
+                f"Cache: {executor.cache_hits} hits, {executor.cache_misses} misses, "
+                f"{executor.run_duplicates} identical files skipped"
+            )
+        self.batch_worker = None
+        self.batch_running = False
 
-        self.batch_results.append({
-            "image": os.path.basename(path),
-            "values": values,
-            "status": status
-        })
+        self.run_batch_btn.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.resume_btn.setEnabled(False)
+        self.stop_btn.setEnabled(False)
+        self.results_view.flush()
 
-        self.show_image(img)
-        self.batch_index += 1
+        self.output.append("⛔ Batch stopped" if stopped else " Batch completed")
 
+    def log_ladder_stats(self, stats):
+        total = sum(stats.values())
+        rows = [
+            f"{rung}={hits} ({hits / total:.0%})"
+            for rung, hits in sorted(stats.items(), key=lambda kv: -kv[1])
+            if hits
+        ]
+        if rows:
+            self.output.append("Decode ladder: " + ", ".join(rows))
 
     # ---------------- CONTROLS ----------------
     def pause_batch(self):
-        if self.batch_timer:
-            self.batch_timer.stop()
+        if self.batch_worker:
+            self.batch_worker.executor.pause()
+            self.batch_paused = True
             self.pause_btn.setEnabled(False)
             self.resume_btn.setEnabled(True)
+            self.output.append("⏸ Batch paused")
 
     def resume_batch(self):
-        if self.batch_timer:
-            self.batch_timer.start(400)
+        if self.batch_worker:
+            self.batch_worker.executor.resume()
+            self.batch_paused = False
             self.pause_btn.setEnabled(True)
             self.resume_btn.setEnabled(False)
+            self.output.append("▶ Batch resumed")
 
     def stop_batch(self):
-        if self.batch_timer:
-            self.batch_timer.stop()
-        self.batch_running = False
+        if self.batch_worker:
+            self.batch_worker.executor.stop()
         self.pause_btn.setEnabled(False)
         self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(False)
-        self.output.append("⛔ Batch stopped")
+
     def draw_status_text(self, img, status):
         color_map = {
             "MATCH": (0, 255, 0),
@@ -365,6 +670,11 @@ class BarcodeGui(QWidget):
         return img
     # ---------------- DISPLAY ----------------
     def show_image(self, img):
+        # A direct image replaces whatever preview is still rendering
+        self.preview_worker.invalidate()
+
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
         rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         h, w, _ = rgb.shape
         qimg = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
@@ -12,8 +12,16 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from camera.mv_camera import MVCamera
 from ocr_engine import DoctrEngine, EasyOCREngine, PPOCREngine
 import os, csv
+import time
 from datetime import datetime
 
+from seen_store import shared_store, DEFAULT_PATH
+from results_store import shared_results, DEFAULT_PATH as RESULTS_PATH
+from result_cache import config_digest
+import parquet_export
+from plc_publisher import publisher_from_config
+from part_voting import PartVoter, SceneChangeDetector, PartPresence, PartCounter
+
 # ==================================================
 # CAMERA THREAD
 # ==================================================
@@ -42,19 +50,93 @@ class CameraWorker(QThread):
 # ==================================================
 # OCR THREAD
 # ==================================================
-class OCRWorker(QThread):
-    text_ready = pyqtSignal(list)
+def count_chars(texts):
+    # Same rule as batch / single: single letters are noise, then alphanumerics
+    tokens = [
+        t for t in " ".join(texts).split()
+        if not (len(t) == 1 and t.isalpha())
+    ]
+    return len(re.sub(r'[^A-Za-z0-9]', '', "".join(tokens)))
+
 
-    def __init__(self, engine, cfg):
+class OCRWorker(QThread):
+    """
+    OCR + frame verdict off the GUI thread
+    - rules: {"regex": str, "char_count": int or None}, swapped by set_rules
+    - the verdict, duplicate check included, is made here so it can go to
+      the PLC straight from inference; the GUI only displays it
+    - the PLC gets one verdict per part, as on the barcode page: K of N
+      frames must agree on serial and OK / NOT_OK, and a part that leaves
+      the view without that goes out as NO_READ (UNDECIDED if it was read)
+    """
+
+    # texts, OCR milliseconds (preprocess + inference), frame verdict
+    text_ready = pyqtSignal(list, float, dict)
+
+    def __init__(self, engine, cfg, rules=None, seen=None, lot="", publisher=None):
         super().__init__()
         self.engine = engine
         self.cfg = cfg
         self.frame = None
         self.running = True
 
+        self.rules = rules or {"regex": "", "char_count": None}
+        self.seen = seen
+        self.lot = lot
+        self.publisher = publisher
+        self.part_ids = PartCounter()
+
+        # OCR frames are slower than barcode frames, so a shorter window
+        window, agree = cfg.get("vote_window", 5), cfg.get("vote_agree", 3)
+        threshold = cfg.get("scene_change_threshold", 12.0)
+        self.voter = PartVoter(window, agree)
+        self.scene = SceneChangeDetector(threshold)
+        self.presence = PartPresence(
+            threshold, settle=window, min_frames=agree,
+            max_frames=cfg.get("part_max_frames")
+        )
+
     def update_frame(self, frame):
         self.frame = frame.copy()
 
+    def set_rules(self, rules):
+        # Single attribute swap, picked up on the next frame
+        self.rules = rules
+
+    def evaluate(self, texts):
+        rules = self.rules
+
+        regex_ok, serial = True, None
+        if rules["regex"]:
+            m = re.search(rules["regex"], " ".join(texts))
+            regex_ok = bool(m)
+            serial = m.group(0) if m else None
+
+        # The part verdict decides the duplicate flag; until then a
+        # read-only lookup (recorded once the PLC has the verdict)
+        part = self.voter.verdict
+        if serial is None:
+            duplicate = False
+        elif part is not None and part["value"] == serial:
+            duplicate = part["duplicate"]
+        else:
+            duplicate = bool(self.seen is not None and self.seen.seen(serial, self.lot))
+
+        expected = rules["char_count"]
+        actual = count_chars(texts)
+        count_ok = expected is None or actual >= expected
+
+        return {
+            "serial": serial,
+            "regex_ok": regex_ok,
+            "count_ok": count_ok,
+            "actual": actual if expected is not None else "",
+            "expected": expected if expected is not None else "",
+            "duplicate": duplicate,
+            "final_ok": regex_ok and count_ok and not duplicate,
+            "part": None
+        }
+
     def run(self):
         while self.running:
             if self.frame is None:
@@ -62,6 +144,23 @@ class OCRWorker(QThread):
 
             img = self.frame
             self.frame = None
+            raw = img
+            part = None
+
+            # ---------- DEBOUNCE ----------
+            # A decided part holds its verdict until the scene changes
+            if self.voter.locked and self.scene.changed(raw):
+                self.voter.reset()
+                self.scene.clear()
+                self.presence.decided()
+
+            # ---------- PRESENCE ----------
+            # Parts are told apart by serial, so without a regex there are none
+            left = not self.voter.locked and self.presence.update(raw)
+            if left and self.rules["regex"]:
+                part = self.finish(self.voter.no_read("NO_READ"), None)
+
+            t0 = time.perf_counter()
 
             if self.cfg.get("enable_preprocessing", True):
                 total_rot = self.cfg.get("rotate_preset", 0) + self.cfg.get("fine_rotate", 0)
@@ -76,7 +175,38 @@ class OCRWorker(QThread):
 
             result = self.engine.run_batch([img])[0]
             texts = self.engine.extract_all_text(result)
-            self.text_ready.emit(texts)
+            ocr_ms = (time.perf_counter() - t0) * 1000
+
+            verdict = self.evaluate(texts)
+
+            # ---------- VOTE ----------
+            # Frames vote on (OK / NOT_OK, serial): one frame failing the
+            # char count no longer decides the part
+            if not self.voter.locked:
+                status = "OK" if verdict["regex_ok"] and verdict["count_ok"] else "NOT_OK"
+                voted = self.voter.add(status, verdict["serial"])
+                if voted:
+                    self.scene.set_reference(raw)
+                    part = self.finish(voted, ocr_ms)
+                    verdict["duplicate"] = voted["duplicate"]
+                    verdict["final_ok"] = verdict["final_ok"] and not voted["duplicate"]
+
+            verdict["part"] = part
+            self.text_ready.emit(texts, ocr_ms, verdict)
+
+    def finish(self, part, ocr_ms):
+        # Read-only lookup first; the SQLite write happens after the PLC has it
+        value = part["value"]
+        part["duplicate"] = bool(self.seen is not None and value and self.seen.seen(value, self.lot))
+        part["part"] = self.part_ids.next()
+        if self.publisher:
+            self.publisher.publish(
+                part["part"], part["status"], {"serial": value} if value else None,
+                infer_ms=ocr_ms, duplicate=part["duplicate"]
+            )
+        if self.seen is not None and value:
+            self.seen.check_and_add(value, self.lot, "ocr_live")
+        return part
 
     def stop(self):
         self.running = False
@@ -111,6 +241,20 @@ class OCRLiveGui(QWidget):
         self.frame_counter = 0
         self.live_regex = ""
 
+        # Duplicate-serial check (regex match), enabled by "lot" in the JSON
+        self.seen = None
+        self.lot = ""
+
+        # Every frame's verdict, queryable with results_store.py
+        self.results = None
+        self.recipe_id = ""
+
+        # Frames streamed to Parquet while the camera runs ("export_parquet")
+        self.live_parquet = None
+
+        # Verdicts pushed to the line PLC / MES ("plc" in the recipe)
+        self.publisher = None
+
     # ==================================================
     # UI
     # ==================================================
@@ -198,6 +342,7 @@ class OCRLiveGui(QWidget):
         self.load_camera_cfg_btn.clicked.connect(self.load_camera_cfg)
         self.connect_camera_btn.clicked.connect(self.start_camera)
         self.stop_camera_btn.clicked.connect(self.stop_camera)
+        self.char_count_input.textChanged.connect(self.push_live_rules)
 
     # ==================================================
     # CONFIG LOAD
@@ -222,6 +367,14 @@ class OCRLiveGui(QWidget):
         # ✅ load regex from JSON (if any)
         self.live_regex = self.preprocess_cfg.get("regex", "").strip()
 
+        self.lot = self.preprocess_cfg.get("lot", "")
+        self.seen = (
+            shared_store(self.preprocess_cfg.get("seen_store", DEFAULT_PATH))
+            if self.lot and self.live_regex else None
+        )
+        self.results = shared_results(self.preprocess_cfg.get("results_store", RESULTS_PATH))
+        self.recipe_id = config_digest(self.preprocess_cfg)
+
         self.log_console.append(f"OCR model loaded: {model}")
 
 
@@ -251,9 +404,22 @@ class OCRLiveGui(QWidget):
         self.camera_worker.log.connect(self.log_console.append)
         self.camera_worker.start()
 
-        self.ocr_worker = OCRWorker(self.ocr_engine, self.preprocess_cfg)
+        # Parts are voted on their serial, so publishing needs the recipe regex
+        self.publisher = None
+        if self.preprocess_cfg.get("plc") and not self.live_regex:
+            self.log_console.append("PLC publisher not started: the recipe has no regex")
+        elif self.live_regex:
+            self.publisher = publisher_from_config(
+                self.preprocess_cfg, self.log_console.append
+            )
+
+        self.ocr_worker = OCRWorker(
+            self.ocr_engine, self.preprocess_cfg, self.live_rules(),
+            seen=self.seen, lot=self.lot, publisher=self.publisher
+        )
         self.ocr_worker.text_ready.connect(self.handle_ocr_result)
         self.ocr_worker.start()
+        self.open_live_parquet()
 
         self.connect_camera_btn.setEnabled(False)
         self.stop_camera_btn.setEnabled(True)
@@ -269,6 +435,21 @@ class OCRLiveGui(QWidget):
             self.ocr_worker.stop()
             self.ocr_worker = None
 
+        if self.live_parquet is not None:
+            self.live_parquet.close()
+            self.log_console.append(f"📁 Live Parquet saved: {self.live_parquet.path}")
+            self.live_parquet = None
+
+        if self.publisher:
+            self.publisher.close()
+            self.log_console.append(self.publisher.summary())
+            self.publisher = None
+
+        if self.seen:
+            self.seen.flush()
+        if self.results:
+            self.results.flush()
+
         self.connect_camera_btn.setEnabled(True)
         self.stop_camera_btn.setEnabled(False)
         self.log_console.append("Camera stopped")
@@ -276,40 +457,30 @@ class OCRLiveGui(QWidget):
     # ==================================================
     # OCR RESULT HANDLING
     # ==================================================
-    def handle_ocr_result(self, texts):
+    def handle_ocr_result(self, texts, ocr_ms, verdict):
         self.frame_counter += 1
 
         self.ocr_output.clear()
         self.ocr_output.append("\n".join(texts))
 
-        full_text = " ".join(texts)
-
-        # ---------- REGEX ----------
+        # Evaluated (and sent to the PLC) by the OCR worker
         regex = self.live_regex
-        regex_ok = True
-        if regex:
-            regex_ok = bool(re.search(regex, full_text))
-
-        # ---------- COUNT ----------
-        status = self.validate_char_count(texts)
-        if status:
-            count_ok, actual, expected = status
-        else:
-            count_ok = True
-            actual = ""
-            expected = ""
-
-        final_ok = regex_ok and count_ok
+        regex_ok = verdict["regex_ok"]
+        serial = verdict["serial"]
+        duplicate = verdict["duplicate"]
+        actual, expected = verdict["actual"], verdict["expected"]
+        counted = expected != ""
+        final_ok = verdict["final_ok"]
 
         # ---------- UI ----------
         if final_ok:
             self.count_status_label.setText(
-                f"OK | chars={actual}/{expected}" if status else "OK"
+                f"OK | chars={actual}/{expected}" if counted else "OK"
             )
             self.count_status_label.setStyleSheet("color: green; font-weight:600;")
         else:
             self.count_status_label.setText(
-                f"NOT OK | chars={actual}/{expected}" if status else "NOT OK"
+                f"NOT OK | chars={actual}/{expected}" if counted else "NOT OK"
             )
             self.count_status_label.setStyleSheet("color: red; font-weight:600;")
 
@@ -318,8 +489,16 @@ class OCRLiveGui(QWidget):
             f"Frame {self.frame_counter} | "
             f"chars={actual} | "
             f"regex={'OK' if regex_ok else 'FAIL'} | "
+            f"{'DUPLICATE | ' if duplicate else ''}"
             f"result={'OK' if final_ok else 'NOT_OK'}"
         )
+        part = verdict["part"]
+        if part:
+            self.log(
+                f"{part['part']} → {part['status']}"
+                f"{' DUPLICATE' if part['duplicate'] else ''}"
+                f" ({part['votes']}/{part['frames']} frames)"
+            )
 
         # ---------- CSV (ALL FRAMES) ----------
         self.live_results.append({
@@ -329,35 +508,35 @@ class OCRLiveGui(QWidget):
             "expected_count": expected,
             "regex": regex,
             "regex_match": regex_ok,
-            "final_result": "OK" if final_ok else "NOT_OK"
+            "duplicate": duplicate,
+            "final_result": "OK" if final_ok else "NOT_OK",
+            "ocr_ms": round(ocr_ms, 1) if ocr_ms is not None else "",
+            "raw_text": texts
         })
+        if self.live_parquet is not None:
+            row = self.live_results[-1]
+            self.live_parquet.append({**row, "ts": row["timestamp"]})
+        if self.results is not None:
+            self.results.add(
+                "ocr_live", f"frame {self.frame_counter}", self.live_results[-1]["final_result"],
+                [serial] if serial else [],
+                lot=self.lot, recipe=self.recipe_id, engine=self.ocr_engine.engine_id,
+                duplicate=duplicate, payload=self.live_results[-1]
+            )
 
     # ==================================================
     # COUNT LOGIC
     # ==================================================
-    def validate_char_count(self, texts):
+    def live_rules(self):
         val = self.char_count_input.text().strip()
-        if not val.isdigit():
-            return None
-
-        expected = int(val)
-
-        joined = " ".join(texts)
-
-        tokens = [
-            t for t in joined.split()
-            if not (len(t) == 1 and t.isalpha())
-        ]
-
-        cleaned = re.sub(r'[^A-Za-z0-9]', '', "".join(tokens))
-        actual = len(cleaned)
-
-        # ✅ SAME RULE AS BATCH / SINGLE
-        not_ok = actual < expected
-
-        return (not not_ok), actual, expected
-
+        return {
+            "regex": self.live_regex,
+            "char_count": int(val) if val.isdigit() else None
+        }
 
+    def push_live_rules(self):
+        if self.ocr_worker:
+            self.ocr_worker.set_rules(self.live_rules())
 
     # ==================================================
     # DISPLAY FRAME
@@ -398,6 +577,21 @@ class OCRLiveGui(QWidget):
         with open(self.log_file_path, "a", encoding="utf-8") as f:
             f.write(line + "\n")
     
+    def open_live_parquet(self):
+        if not self.preprocess_cfg.get("export_parquet", False):
+            return
+        if not parquet_export.available():
+            self.log_console.append("⚠️ export_parquet is set but pyarrow is not installed")
+            return
+
+        os.makedirs("exports", exist_ok=True)
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.live_parquet = parquet_export.ParquetRowWriter(
+            os.path.join("exports", f"live_ocr_{ts}.parquet"),
+            parquet_export.OCR_LIVE_COLUMNS,
+            chunk=512
+        )
+
     def export_live_csv(self):
         if not self.live_results:
             return
@@ -406,10 +600,11 @@ class OCRLiveGui(QWidget):
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         path = os.path.join("exports", f"live_ocr_{ts}.csv")
 
-        keys = self.live_results[0].keys()
+        # Raw text lists go to the Parquet export, not the CSV
+        keys = [k for k in self.live_results[0] if k != "raw_text"]
 
         with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
+            writer = csv.DictWriter(f, fieldnames=keys, extrasaction="ignore")
             writer.writeheader()
             writer.writerows(self.live_results)
 
@@ -0,0 +1,270 @@
+import os
+import time
+import threading
+
+import cv2
+
+from result_cache import file_digest
+
+
+# Files the batch / watch / scan tools pick up; kept here, away from the
+# OCR engines, so listing helpers stay light
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+MULTIPAGE_EXTS = (".tif", ".tiff")
+PAGE_SEP = "#"
+
+# Scale factor -> (color flag, grayscale flag)
+REDUCED_FLAGS = {
+    1: (cv2.IMREAD_COLOR, cv2.IMREAD_GRAYSCALE),
+    2: (cv2.IMREAD_REDUCED_COLOR_2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+    4: (cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    8: (cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+}
+
+# Calibration shared by every decoder in the process (pool workers each
+# own one): (folder, ext) -> full-resolution long side, ext -> plain
+# imread seconds per pixel, and the calibrations still running
+_sizes = {}
+_rates = {}
+_calibrating = {}
+_calibration_lock = threading.Lock()
+
+
+# ==================================================
+# PAGES
+# ==================================================
+def split_page(path):
+    """
+    "scan.tif#3" -> ("scan.tif", 3); any other path -> (path, None)
+    """
+    head, sep, tail = path.rpartition(PAGE_SEP)
+    if sep and tail.isdigit() and head.lower().endswith(MULTIPAGE_EXTS):
+        return head, int(tail)
+    return path, None
+
+
+def page_count(path):
+    # Header-only count; OpenCV without imcount treats every TIFF as one page
+    if not path.lower().endswith(MULTIPAGE_EXTS) or not hasattr(cv2, "imcount"):
+        return 1
+    try:
+        return max(1, cv2.imcount(path))
+    except cv2.error:
+        return 1
+
+
+def page_ids(path):
+    """
+    Items for one file: [path], or one "path#<page>" per page of a multi-page TIFF
+    """
+    n = page_count(path)
+    if n == 1:
+        return [path]
+    return [f"{path}{PAGE_SEP}{i}" for i in range(n)]
+
+
+def content_digest(path):
+    # Cache identity of a file or of one page of it
+    file, page = split_page(path)
+    digest = file_digest(file)
+    return digest if page is None else f"{digest}{PAGE_SEP}{page}"
+
+
+def image_id(path):
+    # content_digest for the seen store; None when the file is gone
+    # (packed benchmark input names files that may not exist here)
+    try:
+        return content_digest(path)
+    except OSError:
+        return None
+
+
+class PageStream:
+    """
+    Paths with multi-page TIFFs expanded to one item per page, lazily
+    - stop() is passed on to the source (FolderWatcher, FolderScan)
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def stop(self):
+        if hasattr(self.paths, "stop"):
+            self.paths.stop()
+
+    def __iter__(self):
+        for path in self.paths:
+            yield from page_ids(path)
+
+
+# ==================================================
+# DECODER
+# ==================================================
+class ImageDecoder:
+    """
+    cv2.imread with the cheapest flags that still serve the engine
+    - grayscale: decode straight to one channel; color_out converts back
+      for engines that want BGR
+    - max_side: decode at 1/2, 1/4 or 1/8 while the long side stays
+      >= max_side. JPEG scales inside the DCT; other formats are decoded
+      full and shrunk by OpenCV (less memory downstream, no decode saving)
+    - the full size is learned per folder + file type (one camera, one
+      resolution), once per process; a smaller file that lands under
+      max_side is decoded again
+    - with max_side, the first file of each kind is read plainly first,
+      which also times the baseline stats["saved_s"] is estimated from;
+      that read is used as is when the file needs no reduction
+    - page ids ("scan.tif#2") read one page of a multi-page TIFF
+    """
+
+    def __init__(self, max_side=None, grayscale=False, color_out=True):
+        self.max_side = max_side or None
+        self.grayscale = grayscale
+        self.color_out = color_out
+
+        self.lock = threading.Lock()
+        self.stats = {"images": 0, "reduced": 0, "redecoded": 0, "decode_s": 0.0, "saved_s": 0.0}
+
+    @classmethod
+    def for_engine(cls, engine, recipe):
+        """
+        Decoder for an OCR engine + preprocess recipe; full decode unless
+        the recipe asks (it changes what the engine sees)
+        - "decode_max_side": long side to keep, "engine" for the engine's
+          DECODE_SIDE; absent / 0 = full
+        - "decode_grayscale": decode to one channel (default off)
+        """
+        max_side = recipe.get("decode_max_side")
+        if max_side == "engine":
+            max_side = engine.DECODE_SIDE
+        return cls(max_side, recipe.get("decode_grayscale", False))
+
+    def describe(self):
+        # Part of the cache identity when it can change engine output
+        if not self.max_side and not self.grayscale:
+            return None
+        return {"max_side": self.max_side, "grayscale": self.grayscale}
+
+    def summary(self):
+        s = self.stats
+        return (
+            f"decode {s['decode_s']:.1f} s for {s['images']} images, "
+            f"{s['reduced']} reduced, ~{s['saved_s']:.1f} s saved"
+        )
+
+    # ---------------- READ ----------------
+    def _factor(self, full_side):
+        f = 1
+        if self.max_side and full_side:
+            while f < 8 and full_side / (f * 2) >= self.max_side:
+                f *= 2
+        return f
+
+    def _imread(self, file, page, factor, grayscale):
+        if page is None:
+            return cv2.imread(file, REDUCED_FLAGS[factor][grayscale])
+
+        flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        try:
+            ok, mats = cv2.imreadmulti(file, start=page, count=1, flags=flag)
+        except TypeError:
+            # OpenCV < 4.5.3: no page range, read them all
+            ok, mats = cv2.imreadmulti(file, flags=flag)
+            mats = mats[page:page + 1] if ok else mats
+        if not ok or not mats:
+            return None
+        img = mats[0]
+        if factor > 1:
+            h, w = img.shape[:2]
+            img = cv2.resize(
+                img, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_AREA
+            )
+        return img
+
+    def _calibrate(self, file, page, ext):
+        # Plain full-color read: learns the frame size and the baseline rate;
+        # its time counts against the savings
+        t0 = time.perf_counter()
+        img = self._imread(file, page, 1, False)
+        if img is not None:
+            h, w = img.shape[:2]
+            with _calibration_lock:
+                _rates.setdefault(ext, (time.perf_counter() - t0) / max(h * w, 1))
+        return img
+
+    def _full_side(self, file, page, key, ext):
+        """
+        -> (full long side, plain read or None); one thread calibrates a
+        kind of file while the others wait for its result
+        """
+        while True:
+            with _calibration_lock:
+                full = _sizes.get(key)
+                if full is not None:
+                    return full, None
+                pending = _calibrating.get(key)
+                if pending is None:
+                    pending = _calibrating[key] = threading.Event()
+                    break
+            pending.wait()
+
+        img = None
+        try:
+            img = self._calibrate(file, page, ext)
+        finally:
+            with _calibration_lock:
+                if img is not None:
+                    _sizes[key] = max(img.shape[:2])
+                del _calibrating[key]
+            pending.set()
+        return (None, None) if img is None else (max(img.shape[:2]), img)
+
+    def read(self, path):
+        """
+        Decoded image (BGR unless color_out is off), or None if unreadable
+        """
+        file, page = split_page(path)
+        key = (os.path.dirname(file), os.path.splitext(file)[1].lower())
+
+        t0 = time.perf_counter()
+        img = None
+        if self.max_side:
+            full, plain = self._full_side(file, page, key, key[1])
+            if full is None:
+                return None
+            if self._factor(full) == 1 and not self.grayscale:
+                img = plain
+        else:
+            full = None
+
+        factor = self._factor(full)
+        if img is None:
+            img = self._imread(file, page, factor, self.grayscale)
+        redecoded = False
+        if img is not None and factor > 1 and max(img.shape[:2]) < self.max_side:
+            # Smaller than this folder's usual frame: too little left, go again
+            factor_small = self._factor(max(img.shape[:2]) * factor)
+            img = self._imread(file, page, factor_small, self.grayscale)
+            factor, redecoded = factor_small, True
+        elapsed = time.perf_counter() - t0
+        if img is None:
+            return None
+
+        h, w = img.shape[:2]
+        with _calibration_lock:
+            if self.max_side:
+                _sizes[key] = max(h, w) * factor
+            rate = _rates.get(key[1])
+
+        with self.lock:
+            s = self.stats
+            s["images"] += 1
+            s["decode_s"] += elapsed
+            s["reduced"] += factor > 1
+            s["redecoded"] += redecoded
+            if rate is not None:
+                s["saved_s"] += rate * h * w * factor * factor - elapsed
+
+        if self.color_out and img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
@@ -0,0 +1,255 @@
+"""
+Client and load generator for inference_server.py
+
+    python inference_client.py send http://127.0.0.1:8765 ocr IMG_0001.jpg --config cfg.json
+    python inference_client.py load http://127.0.0.1:8765 ocr labels/ --concurrency 16 --duration 30
+    (load-test a server started without --record, so nothing is recorded)
+    python inference_client.py metrics http://127.0.0.1:8765
+
+    from inference_client import InferenceClient
+    client = InferenceClient("http://inference-box:8765")
+    status, body = client.ocr("IMG_0001.jpg", recipe)
+
+Standard library only, so line PCs need no extra install. Images go up as
+the raw file body (no base64); one keep-alive connection per thread.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+
+# image_decode.IMAGE_EXTS; that module needs OpenCV, this client only the stdlib
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class InferenceClient:
+    """
+    - ocr() / barcode(): image is a path or the encoded file bytes;
+      returns (HTTP status, decoded JSON body)
+    - retries: 429 answers are retried after Retry-After, this many times
+    - safe to share between threads (connections are per thread)
+    """
+
+    def __init__(self, url, timeout=30.0, retries=0):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.retries = retries
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.local.conn = conn
+        return conn
+
+    def _request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+                return resp.status, resp.getheader("Retry-After"), json.loads(data or b"{}")
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed the idle keep-alive connection; reconnect once
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+
+    def infer(self, mode, image, recipe=None, source=None):
+        if isinstance(image, str):
+            if source is None:
+                source = os.path.basename(image)
+            with open(image, "rb") as f:
+                image = f.read()
+
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "X-Recipe": json.dumps(recipe or {}, separators=(",", ":"))
+        }
+        if source:
+            headers["X-Source"] = source
+
+        for attempt in range(self.retries + 1):
+            status, retry_after, body = self._request("POST", f"/{mode}", image, headers)
+            if status != 429 or attempt == self.retries:
+                return status, body
+            time.sleep(float(retry_after or 1))
+
+    def ocr(self, image, recipe=None, source=None):
+        return self.infer("ocr", image, recipe, source)
+
+    def barcode(self, image, recipe=None, source=None):
+        return self.infer("barcode", image, recipe, source)
+
+    def metrics(self):
+        return self._request("GET", "/metrics")[2]
+
+
+# ==================================================
+# LOAD TEST
+# ==================================================
+def load_test(client, mode, images, recipe, concurrency=8, duration=10.0, requests=None,
+              backoff=0.01):
+    """
+    concurrency threads send images round-robin until duration (or
+    requests in total) is up; a 429 waits `backoff` seconds, not Retry-After,
+    so the server stays saturated
+    """
+    lock = threading.Lock()
+    stats = {"sent": 0, "ok": 0, "busy": 0, "errors": 0}
+    latencies = []
+    batches = []
+    stop_at = time.perf_counter() + duration
+    counter = [0]
+
+    def next_index():
+        with lock:
+            if requests is not None and counter[0] >= requests:
+                return None
+            counter[0] += 1
+            return counter[0] - 1
+
+    def worker():
+        while time.perf_counter() < stop_at:
+            i = next_index()
+            if i is None:
+                return
+            name, data = images[i % len(images)]
+            t0 = time.perf_counter()
+            try:
+                status, body = client.infer(mode, data, recipe, name)
+            except OSError:
+                status, body = None, {}
+            ms = (time.perf_counter() - t0) * 1000
+
+            with lock:
+                stats["sent"] += 1
+                if status == 200:
+                    stats["ok"] += 1
+                    latencies.append(ms)
+                    batches.extend(r.get("batch", 1) for r in body["results"])
+                elif status == 429:
+                    stats["busy"] += 1
+                else:
+                    stats["errors"] += 1
+            if status == 429:
+                time.sleep(backoff)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    return {
+        **stats,
+        "seconds": round(elapsed, 2),
+        "images_per_s": round(stats["ok"] / max(elapsed, 1e-9), 1),
+        "latency_ms": {
+            f"p{p}": percentile(latencies, p) and round(percentile(latencies, p), 1)
+            for p in (50, 95, 99)
+        },
+        "mean_batch": round(sum(batches) / len(batches), 2) if batches else None
+    }
+
+
+def read_images(source):
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, f) for f in sorted(os.listdir(source))
+            if f.lower().endswith(IMAGE_EXTS)
+        ]
+    else:
+        paths = [source]
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+# ================= ENTRY POINT =================
+def build_parser():
+    p = argparse.ArgumentParser(description="inference_server.py client / load test")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    send = sub.add_parser("send", help="send one image, print the JSON answer")
+    load = sub.add_parser("load", help="load test with a folder of images")
+    for s in (send, load):
+        s.add_argument("url", help="e.g. http://127.0.0.1:8765")
+        s.add_argument("mode", choices=["ocr", "barcode"])
+        s.add_argument("source", help="image file (send) or folder (load)")
+        s.add_argument("--config", help="recipe JSON (config_filesss/*.json)")
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--duration", type=float, default=10.0, help="seconds")
+    load.add_argument("--requests", type=int, help="stop after this many requests")
+
+    metrics = sub.add_parser("metrics", help="print the server's /metrics")
+    metrics.add_argument("url")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "metrics":
+        print(json.dumps(InferenceClient(args.url).metrics(), indent=2))
+        return 0
+
+    recipe = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            recipe = json.load(f)
+
+    if args.command == "send":
+        client = InferenceClient(args.url, retries=3)
+        status, body = client.infer(args.mode, args.source, recipe)
+        print(json.dumps(body, indent=2, ensure_ascii=False))
+        return 0 if status == 200 else 1
+
+    images = read_images(args.source)
+    if not images:
+        print(f"No images in {args.source}", file=sys.stderr)
+        return 1
+
+    client = InferenceClient(args.url)
+    before = client.metrics()
+    result = load_test(
+        client, args.mode, images, recipe,
+        concurrency=args.concurrency, duration=args.duration, requests=args.requests
+    )
+    print(json.dumps(result, indent=2))
+
+    after = client.metrics()
+    for name, lane in after["lanes"].items():
+        done = lane["images"] - before["lanes"].get(name, {}).get("images", 0)
+        if done:
+            print(
+                f"{name}: {done} images, mean batch {lane['mean_batch']}, "
+                f"queue wait {lane['queue_wait_ms']}, batch infer {lane['batch_infer_ms']}",
+                file=sys.stderr
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
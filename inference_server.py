@@ -0,0 +1,594 @@
+"""
+Headless inference service: line PCs share one inference box
+
+    python inference_server.py --port 8765 --preload EasyOCR --record
+    python inference_client.py send http://127.0.0.1:8765 ocr IMG_0001.jpg --config cfg.json
+    python inference_client.py load http://127.0.0.1:8765 ocr labels/ --concurrency 16
+
+Nothing is written to the results / seen stores unless the server runs
+with --record (or --results-db): a load test against a server started
+without it leaves the production stores alone.
+
+POST /ocr, POST /barcode
+- the image file as the body, recipe JSON (config_filesss/*.json) in the
+  X-Recipe header; or a JSON body {"image": <base64>, "recipe": {...}},
+  "images": [...] for several. Optional "source" / X-Source names the part
+  in the results store; with --record, "lot" in the recipe turns on the
+  duplicate check, and only a named request can re-send an image without
+  it counting as a duplicate
+- 200 {"results": [...]}: OCR results carry records, raw_text, matches and
+  the batch-mode evaluation fields; barcode results the
+  barcode_results.json entry
+- 429 + Retry-After when the engine's queue is full, 400 bad input,
+  504 when inference doesn't finish within --timeout
+
+GET /metrics (latency / batch / throughput per engine lane), GET /health
+
+Concurrent requests for one engine are coalesced into engine batches: a
+batch runs when it is full (--max-batch) or when its oldest image has
+waited --max-wait-ms. Decoding and preprocessing run on the request
+threads; each OCR engine has one inference thread. Barcode decoding has
+no batch call to gain from, so the barcode lane is a pool of
+--barcode-workers threads taking one image each.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import base64
+import argparse
+import threading
+from contextlib import nullcontext
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+
+class Busy(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+# ==================================================
+# METRICS
+# ==================================================
+def percentiles(values, points=(50, 95, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    values = sorted(values)
+    n = len(values)
+    return {f"p{p}": round(values[min(n - 1, int(n * p / 100))], 2) for p in points}
+
+
+class LaneMetrics:
+    """
+    Counters plus rolling windows (last WINDOW samples / THROUGHPUT_S seconds)
+    """
+    WINDOW = 4096
+    THROUGHPUT_S = 60.0
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "images": 0, "rejected": 0, "errors": 0, "timeouts": 0,
+                       "batches": 0}
+        self.latency_ms = deque(maxlen=self.WINDOW)
+        self.wait_ms = deque(maxlen=self.WINDOW)
+        self.infer_ms = deque(maxlen=self.WINDOW)
+        self.batch_sizes = deque(maxlen=self.WINDOW)
+        self.completed = deque()
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+    def batch(self, size, wait_ms, infer_ms):
+        now = time.monotonic()
+        with self.lock:
+            self.counts["batches"] += 1
+            self.batch_sizes.append(size)
+            self.wait_ms.extend(wait_ms)
+            self.infer_ms.append(infer_ms)
+            self.completed.extend([now] * size)
+
+    def request(self, images, latency_ms):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["images"] += images
+            self.latency_ms.append(latency_ms)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.completed and now - self.completed[0] > self.THROUGHPUT_S:
+                self.completed.popleft()
+            sizes = list(self.batch_sizes)
+            return {
+                **self.counts,
+                "mean_batch": round(sum(sizes) / len(sizes), 2) if sizes else None,
+                "images_per_s": round(
+                    len(self.completed) / max(min(self.THROUGHPUT_S, now - self.started), 1.0), 2
+                ),
+                "latency_ms": percentiles(self.latency_ms),
+                "queue_wait_ms": percentiles(self.wait_ms),
+                "batch_infer_ms": percentiles(self.infer_ms),
+            }
+
+
+# ==================================================
+# MICRO-BATCHING
+# ==================================================
+class Job:
+    __slots__ = ("img", "recipe", "queued", "done", "result", "error", "batch")
+
+    def __init__(self, img, recipe):
+        self.img = img
+        self.recipe = recipe
+        self.queued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.batch = 0
+
+
+class MicroBatcher:
+    """
+    One engine lane: a bounded queue and the thread that drains it
+    - run_batch(jobs) -> one result per job, called with up to max_batch
+      jobs; it waits at most max_wait_ms after the oldest for more to join
+    - submit() takes all of a request's jobs or none (Busy)
+    - workers > 1 drains the queue with that many threads (barcode lane)
+    """
+
+    def __init__(self, name, run_batch, max_batch=8, max_wait_ms=10, max_queue=64,
+                 workers=1):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max(1, max_queue)
+        self.q = queue.Queue()
+        self.lock = threading.Lock()
+        self.metrics = LaneMetrics()
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"lane-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, jobs):
+        with self.lock:
+            if self.q.qsize() + len(jobs) > self.max_queue:
+                self.metrics.count("rejected")
+                raise Busy(f"{self.name}: {self.q.qsize()} images queued")
+            for job in jobs:
+                self.q.put(job)
+
+    def _collect(self):
+        batch = [self.q.get()]
+        deadline = batch[0].queued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.q.get(timeout=remaining) if remaining > 0 else self.q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            t0 = time.perf_counter()
+            try:
+                results = self.run_batch(batch)
+                for job, result in zip(batch, results):
+                    job.result = result
+            except Exception as e:
+                self.metrics.count("errors", len(batch))
+                for job in batch:
+                    job.error = e
+            infer_ms = (time.perf_counter() - t0) * 1000
+
+            self.metrics.batch(
+                len(batch), [(t0 - job.queued) * 1000 for job in batch], infer_ms
+            )
+            for job in batch:
+                job.batch = len(batch)
+                job.done.set()
+
+
+# ==================================================
+# ENGINES
+# ==================================================
+class InferenceService:
+    """
+    Engine lanes + per-request evaluation, independent of HTTP
+    - OCR: one lane per engine class; the recipe's "ocr_model" picks it
+    - barcode: one lane of barcode_workers threads, one image per call;
+      engines are configured per recipe (symbologies, ladder) and kept for
+      the last few recipes, one per worker thread
+    - results: a ResultsStore; each image is recorded as ocr_api / barcode_api
+    """
+    BARCODE_ENGINES = 8
+
+    def __init__(self, default_engine="EasyOCR", max_batch=8, max_wait_ms=10, max_queue=64,
+                 timeout=30.0, results=None, seen=None, barcode_workers=None):
+        self.default_engine = default_engine
+        self.barcode_workers = barcode_workers or os.cpu_count() or 1
+        self.lane_args = {"max_batch": max_batch, "max_wait_ms": max_wait_ms,
+                          "max_queue": max_queue}
+        self.timeout = timeout
+        self.results = results
+        self.seen = seen
+        self.lanes = {}
+        self.lock = threading.Lock()
+        self.lane_init = {}  # lane name -> lock held while its engine loads
+        self.barcode_engines = OrderedDict()
+        self.started = time.monotonic()
+
+    # ---------------- LANES ----------------
+    def ocr_lane(self, recipe):
+        from ocr_batch import OCR_ENGINES
+        model = recipe.get("ocr_model") or self.default_engine
+        cls = OCR_ENGINES.get(model)
+        if cls is None:
+            raise BadRequest(f"unknown OCR engine '{model}'")
+
+        name = f"ocr:{cls.__name__}"
+        with self.lock:
+            lane = self.lanes.get(name)
+            if lane is not None:
+                return lane
+            init = self.lane_init.setdefault(name, threading.Lock())
+
+        # First request for an engine loads its model (can take tens of
+        # seconds); only requests for that engine wait, not barcode or /metrics
+        with init:
+            with self.lock:
+                lane = self.lanes.get(name)
+            if lane is not None:
+                return lane
+
+            engine = cls()
+
+            def run_batch(jobs):
+                outputs = engine.run_batch([job.img for job in jobs])
+                return [
+                    engine.to_records(out, job.img.shape)
+                    for out, job in zip(outputs, jobs)
+                ]
+
+            lane = MicroBatcher(name, run_batch, **self.lane_args)
+            lane.engine = engine
+            with self.lock:
+                self.lanes[name] = lane
+        return lane
+
+    def barcode_engine(self, recipe, engines=None):
+        """
+        BarcodeEngine configured for the recipe's barcode_* keys, from an
+        LRU of BARCODE_ENGINES; engines is a lane thread's own LRU, None
+        the shared one used on request threads
+        """
+        from ocr_engine import BarcodeEngine
+        from result_cache import config_digest
+        key = config_digest({k: v for k, v in recipe.items() if k.startswith("barcode_")})
+        with self.lock if engines is None else nullcontext():
+            if engines is None:
+                engines = self.barcode_engines
+            engine = engines.get(key)
+            if engine is None:
+                engine = BarcodeEngine()
+                engine.configure(recipe)
+                engines[key] = engine
+                while len(engines) > self.BARCODE_ENGINES:
+                    engines.popitem(last=False)
+            else:
+                engines.move_to_end(key)
+        return engine
+
+    def barcode_lane(self):
+        with self.lock:
+            lane = self.lanes.get("barcode")
+            if lane is None:
+                # decode() keeps per-engine state; each worker has its own engines
+                local = threading.local()
+
+                def run_batch(jobs):
+                    if not hasattr(local, "engines"):
+                        local.engines = OrderedDict()
+                    out = []
+                    for job in jobs:
+                        engine = self.barcode_engine(job.recipe, local.engines)
+                        out.append(engine.raw_values(engine.decode(job.img)[0]))
+                    return out
+
+                lane = MicroBatcher(
+                    "barcode", run_batch, max_batch=1, max_wait_ms=0,
+                    max_queue=self.lane_args["max_queue"], workers=self.barcode_workers
+                )
+                self.lanes["barcode"] = lane
+        return lane
+
+    # ---------------- REQUESTS ----------------
+    def decode(self, data, grayscale=False):
+        img = cv2.imdecode(
+            np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        )
+        if img is None:
+            raise BadRequest("image could not be decoded")
+        return img
+
+    def wait(self, lane, jobs):
+        deadline = time.perf_counter() + self.timeout
+        for job in jobs:
+            if not job.done.wait(max(0.0, deadline - time.perf_counter())):
+                lane.metrics.count("timeouts")
+                raise TimeoutError(f"{lane.name}: no result within {self.timeout:.0f} s")
+            if job.error is not None:
+                raise job.error
+
+    def ocr(self, images, recipe, source="", named=False):
+        from ocr_batch import make_rules, evaluate_texts, check_duplicate
+        from result_cache import config_digest, data_digest
+
+        lane = self.ocr_lane(recipe)
+        engine = lane.engine
+        rules = make_rules(recipe.get("expected_char_count"), recipe.get("regex", ""))
+        jobs = [Job(engine.apply_recipe(self.decode(data), recipe), recipe) for data in images]
+        lane.submit(jobs)
+        self.wait(lane, jobs)
+
+        lot = recipe.get("lot", "")
+        recipe_id = config_digest(recipe)
+        # Re-sending an image only passes the duplicate check when the
+        # caller names it; unnamed requests share the client address
+        image_ids = [data_digest(data) if named and lot else None for data in images]
+        out = []
+        for i, job in enumerate(jobs):
+            records = job.result
+            texts = engine.records_text(records)
+            matches = engine.records_matches(records, rules["regex"]) if rules["regex"] else []
+            eval_data = evaluate_texts(texts, rules)
+            name = source if len(jobs) == 1 else f"{source}#{i}"
+            check_duplicate(self.seen if lot else None, texts, eval_data, rules, lot,
+                            f"ocr_api:{name}", image=image_ids[i])
+            if self.results is not None:
+                self.results.add(
+                    "ocr_api", name, eval_data["final_result"], matches,
+                    lot=lot, recipe=recipe_id, engine=engine.engine_id,
+                    duplicate=eval_data["duplicate"], payload={"raw_text": texts, **eval_data}
+                )
+            out.append({
+                "records": records, "raw_text": texts, "matches": matches, **eval_data,
+                "batch": job.batch
+            })
+        return lane, out
+
+    def barcode(self, images, recipe, source="", named=False):
+        from barcode_batch import load_expected
+        from result_cache import config_digest, data_digest
+
+        lane = self.barcode_lane()
+        engine = self.barcode_engine(recipe)
+        grayscale = recipe.get("barcode_grayscale", True)
+        jobs = [
+            Job(engine.apply_recipe(self.decode(data, grayscale), recipe), recipe)
+            for data in images
+        ]
+        lane.submit(jobs)
+        self.wait(lane, jobs)
+
+        try:
+            expected = load_expected(recipe)
+        except (OSError, ValueError) as e:
+            raise BadRequest(f"expected list: {e}")
+        lot = recipe.get("lot", "")
+        recipe_id = config_digest(recipe)
+        # Re-sending an image only passes the duplicate check when the
+        # caller names it; unnamed requests share the client address
+        image_ids = [data_digest(data) if named and lot else None for data in images]
+        out = []
+        for i, job in enumerate(jobs):
+            status, values = engine.verdict_values(job.result, expected)
+            name = source if len(jobs) == 1 else f"{source}#{i}"
+            entry = {"image": name, "values": values, "status": status, "duplicate": False}
+            if self.seen is not None and lot:
+                entry["duplicate"] = self.seen.check_values(
+                    values, lot, f"barcode_api:{name}", image_ids[i]
+                )
+            if self.results is not None:
+                self.results.add(
+                    "barcode_api", name, status, values, lot=lot, recipe=recipe_id,
+                    engine=engine.engine_id, duplicate=entry["duplicate"], payload=entry
+                )
+            out.append({**entry, "batch": job.batch})
+        return lane, out
+
+    def metrics(self):
+        with self.lock:
+            lanes = dict(self.lanes)
+        return {
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "lanes": {
+                name: {**lane.metrics.snapshot(), "queued": lane.q.qsize()}
+                for name, lane in lanes.items()
+            }
+        }
+
+
+# ==================================================
+# HTTP
+# ==================================================
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive: a line PC reuses one connection
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; Nagle + delayed ACK would add ~40 ms
+    disable_nagle_algorithm = True
+    service = None
+    max_body = 64 * 1024 * 1024
+
+    def log_message(self, fmt, *args):
+        # Per-request lines would swamp the console; /metrics has the numbers
+        pass
+
+    def send_json(self, code, body, headers=()):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"ok": True})
+        elif self.path == "/metrics":
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def read_request(self):
+        """
+        -> (images as bytes, recipe, source)
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= self.max_body:
+            raise BadRequest("missing or oversized body")
+        body = self.rfile.read(length)
+
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                req = json.loads(body)
+                images = req.get("images") or [req["image"]]
+                images = [base64.b64decode(b) for b in images]
+            except (ValueError, KeyError, TypeError) as e:
+                raise BadRequest(f"bad JSON request: {e}")
+            recipe = req.get("recipe") or {}
+            source = req.get("source") or ""
+        else:
+            images = [body]
+            try:
+                recipe = json.loads(self.headers.get("X-Recipe") or "{}")
+            except ValueError as e:
+                raise BadRequest(f"bad X-Recipe header: {e}")
+            source = self.headers.get("X-Source") or ""
+
+        if not isinstance(recipe, dict):
+            raise BadRequest("recipe must be a JSON object")
+        return images, recipe, source
+
+    def do_POST(self):
+        t0 = time.perf_counter()
+        mode = self.path.strip("/")
+        if mode not in ("ocr", "barcode"):
+            self.send_json(404, {"error": "not found"})
+            return
+
+        lane = None
+        try:
+            images, recipe, source = self.read_request()
+            run = self.service.ocr if mode == "ocr" else self.service.barcode
+            lane, results = run(images, recipe, source or self.client_address[0], bool(source))
+        except BadRequest as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Busy as e:
+            self.send_json(429, {"error": "busy", "detail": str(e)}, [("Retry-After", "1")])
+            return
+        except TimeoutError as e:
+            self.send_json(504, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        ms = (time.perf_counter() - t0) * 1000
+        lane.metrics.request(len(results), ms)
+        self.send_json(200, {"results": results, "ms": round(ms, 2)})
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog; the default 5 resets connections under a burst
+    request_queue_size = 128
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    return Server((host, port), handler)
+
+
+# ================= ENTRY POINT =================
+def build_parser():
+    p = argparse.ArgumentParser(description="HTTP OCR / barcode inference service")
+    p.add_argument("--host", default="127.0.0.1",
+                   help="bind address; 0.0.0.0 serves the line network")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--engine", default="EasyOCR",
+                   help="OCR engine when the recipe names none ('Model - 1', Doctr, ...)")
+    p.add_argument("--preload", action="append", default=[],
+                   help="load this OCR engine at start (repeatable)")
+    p.add_argument("--max-batch", type=int, default=8, help="images per engine call")
+    p.add_argument("--max-wait-ms", type=float, default=10,
+                   help="longest an image waits for a batch to fill")
+    p.add_argument("--max-queue", type=int, default=64,
+                   help="queued images per engine before requests get 429")
+    p.add_argument("--timeout", type=float, default=30, help="seconds before a 504")
+    p.add_argument("--barcode-workers", type=int, default=None,
+                   help="barcode decode threads (default: CPU count)")
+    p.add_argument("--record", action="store_true",
+                   help="record requests in the results store and lot values in the "
+                        "seen store (duplicate check); off for load tests")
+    p.add_argument("--results-db", default=None,
+                   help="results store (default results/results.db); implies --record")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    results = seen = None
+    if args.record or args.results_db:
+        from results_store import shared_results, DEFAULT_PATH
+        from seen_store import shared_store
+        results = shared_results(args.results_db or DEFAULT_PATH)
+        seen = shared_store()
+    else:
+        print("ℹ Not recording (no --record): results and seen stores untouched",
+              file=sys.stderr)
+
+    service = InferenceService(
+        args.engine, args.max_batch, args.max_wait_ms, args.max_queue, args.timeout,
+        results=results, seen=seen, barcode_workers=args.barcode_workers
+    )
+    for model in args.preload:
+        lane = service.ocr_lane({"ocr_model": model})
+        print(f"✅ {lane.name} loaded", file=sys.stderr)
+
+    server = make_server(service, args.host, args.port)
+    print(
+        f"🌐 Serving on http://{args.host}:{args.port} "
+        f"(batch ≤ {args.max_batch}, wait ≤ {args.max_wait_ms:g} ms, queue ≤ {args.max_queue})",
+        file=sys.stderr
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,509 @@
+import os
+import re
+import glob
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ocr_engine import DoctrEngine, EasyOCREngine, PPOCREngine
+from result_cache import config_digest, cache_key
+from image_decode import IMAGE_EXTS, ImageDecoder, content_digest, image_id
+
+
+# Selector labels (GUI) and model names (older configs) -> engine class
+OCR_ENGINES = {
+    "Model - 1": DoctrEngine,
+    "Model - 2": EasyOCREngine,
+    "Model - 3": PPOCREngine,
+    "Doctr": DoctrEngine,
+    "EasyOCR": EasyOCREngine,
+    "PaddleOCR": PPOCREngine
+}
+
+# Column order of exports/batch_result_*.csv
+BATCH_CSV_FIELDS = [
+    "file_name",
+    "expected_count",
+    "regex",
+    "detected_count",
+    "regex_match",
+    "duplicate",
+    "final_result"
+]
+
+NON_ALNUM = re.compile(r'[^A-Za-z0-9]')
+
+
+# ==================================================
+# RULES
+# ==================================================
+def make_rules(expected=None, regex=""):
+    """
+    Validation rules compiled once per batch
+    - expected: minimum alphanumeric character count (int, digit string or None)
+    """
+    if isinstance(expected, str):
+        expected = int(expected) if expected.strip().isdigit() else None
+    regex = (regex or "").strip()
+    return {
+        "expected": expected,
+        "regex": regex,
+        "pattern": re.compile(regex) if regex else None
+    }
+
+
+def evaluate_texts(texts, rules):
+    full_text = " ".join(texts)
+    detected_count = len(NON_ALNUM.sub('', full_text))
+
+    regex = rules["regex"]
+    expected = rules["expected"]
+
+    not_ok = False
+    if expected is not None:
+        not_ok = detected_count < expected
+
+    regex_ok = True
+    if regex:
+        regex_ok = bool(rules["pattern"].search(full_text))
+
+    final_ok = (not not_ok) and regex_ok
+
+    return {
+        "detected_count": detected_count,
+        "expected_count": expected if expected is not None else "",
+        "regex": regex if regex else "",
+        "regex_match": regex_ok if regex else "N/A",
+        "final_result": "OK" if final_ok else "NOT_OK"
+    }
+
+
+def check_duplicate(store, texts, eval_data, rules, lot, source, path=None, image=None):
+    """
+    Flag a regex match already seen in this lot, on another image
+    - sets eval_data["duplicate"]; a duplicate turns the result NOT_OK
+    - path (file or TIFF page) or image (content digest) lets a re-run
+      of the same image pass
+    """
+    eval_data["duplicate"] = False
+    if store is None or not lot or rules["pattern"] is None:
+        return
+
+    m = rules["pattern"].search(" ".join(texts))
+    if not m:
+        return
+
+    if image is None and path:
+        image = image_id(path)
+    if store.check_values([m.group(0)], lot, source, image):
+        eval_data["duplicate"] = True
+        eval_data["final_result"] = "NOT_OK"
+
+
+# ==================================================
+# INPUT
+# ==================================================
+def list_images(source):
+    """
+    Folder -> sorted image files in it; anything else is treated as a glob
+    """
+    if os.path.isdir(source):
+        return [
+            os.path.join(source, f)
+            for f in sorted(os.listdir(source))
+            if f.lower().endswith(IMAGE_EXTS)
+        ]
+    return sorted(p for p in glob.glob(source) if p.lower().endswith(IMAGE_EXTS))
+
+
+def load_image(engine, path, recipe, decoder=None):
+    """
+    Read + preprocess one file with a saved preprocess recipe
+    - decoder: an ImageDecoder (reduced / grayscale reads, TIFF pages);
+      default is a plain full-resolution read
+    - returns None when the file can't be read
+    """
+    img = (decoder or ImageDecoder()).read(path)
+    if img is None:
+        return None
+    return engine.apply_recipe(img, recipe)
+
+
+# ==================================================
+# PIPELINE
+# ==================================================
+_DONE = object()
+
+
+class ShapeBatcher:
+    """
+    Group images into engine batches by shape
+    - buckets: aspect ratio in sqrt(2) steps x pixel count in powers of two
+    - batch size per bucket from a memory budget on the decoded pixels,
+      capped at max_batch; large frames get small batches, crops big ones
+    - by_shape=False: one bucket of max_batch (the old fixed chunks)
+    """
+
+    def __init__(self, max_batch=16, budget_mb=512, by_shape=True):
+        self.max_batch = max(1, max_batch)
+        self.budget = budget_mb * 1024 * 1024 if budget_mb else None
+        self.by_shape = by_shape
+        self.buckets = {}
+
+    def bucket(self, shape):
+        if not self.by_shape:
+            return None
+        h, w = shape[:2]
+        return (
+            round(math.log2(max(w, 1) / max(h, 1)) * 2),
+            round(math.log2(max(h * w, 1)))
+        )
+
+    def limit(self, shape):
+        if not self.by_shape or self.budget is None:
+            return self.max_batch
+        h, w = shape[:2]
+        channels = shape[2] if len(shape) > 2 else 1
+        return max(1, min(self.max_batch, self.budget // max(h * w * channels, 1)))
+
+    def add(self, item, shape):
+        """
+        Queue an item; returns its bucket's items once the bucket is full
+        """
+        key = self.bucket(shape)
+        items, limit = self.buckets.setdefault(key, ([], self.limit(shape)))
+        items.append(item)
+        if len(items) >= limit:
+            return self.buckets.pop(key)[0]
+        return None
+
+    def take(self, item):
+        # Run the bucket holding item now, full or not
+        for key, (items, _) in self.buckets.items():
+            if any(x is item for x in items):
+                return self.buckets.pop(key)[0]
+        return None
+
+    def drain(self):
+        while self.buckets:
+            _, (items, _) = self.buckets.popitem()
+            yield items
+
+    def clear(self):
+        self.buckets = {}
+
+
+class OCRPipeline:
+    """
+    Three-stage batch OCR
+    - decode: a thread pool hashes, cache-checks, reads and preprocesses files
+    - infer: one thread groups decoded images into engine batches (ShapeBatcher)
+    - results: the thread calling run() gets (path, records, img) in input order
+    - bounded queues between stages, so decoding stays a few batches ahead
+    - pause stops feeding new files and batches; stop abandons the run
+    - paths may be an endless iterable (FolderWatcher); eager=True then runs
+      partial buckets as soon as no decoded file is waiting, and stop() also
+      stops a source that has a stop() method
+    - decoder: ImageDecoder.for_engine by default; a PackedDataset serves
+      pre-decoded images from a memory map
+    """
+
+    def __init__(self, engine, recipe, batch_size=4, workers=2, depth=3, cache=None,
+                 batcher=None, eager=False, decoder=None):
+        self.engine = engine
+        self.recipe = dict(recipe)
+        # Default: fixed-size chunks in folder order
+        self.batcher = batcher or ShapeBatcher(batch_size, by_shape=False)
+        self.batch_size = self.batcher.max_batch
+        self.eager = eager
+        self.source = None
+        self.timing = {"decode_ms": 0.0, "infer_ms": 0.0}
+        self.workers = max(1, workers)
+        self.depth = max(1, depth)
+        self.cache = cache
+
+        # Reduced / grayscale decoding changes the pixels the engine sees
+        self.decoder = decoder or ImageDecoder.for_engine(engine, self.recipe)
+        decode = self.decoder.describe()
+        self.cfg_digest = config_digest(
+            self.recipe if decode is None else {**self.recipe, "decode": decode}
+        )
+
+        self.stats = {
+            "hits": 0, "misses": 0, "duplicates": 0,
+            "batches": 0, "infer_s": 0.0, "starved_s": 0.0
+        }
+
+        self._resume = threading.Event()
+        self._resume.set()
+        self._stop = threading.Event()
+        self.error = None
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def stop(self):
+        self._stop.set()
+        self._resume.set()
+        if hasattr(self.source, "stop"):
+            self.source.stop()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    # ---------------- QUEUE HELPERS ----------------
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _wait_resumed(self):
+        while not self._resume.wait(0.1):
+            pass
+        return not self._stop.is_set()
+
+    # ---------------- STAGE 1: DECODE ----------------
+    def _load(self, path):
+        """
+        (key, cached_records, img, seconds) for one file
+        - a cache hit skips reading the image entirely
+        """
+        t0 = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            try:
+                key = cache_key(content_digest(path), self.cfg_digest, self.engine.engine_id)
+            except OSError:
+                key = None
+        if key is not None:
+            cached = self.cache.get(key)
+            if isinstance(cached, dict) and "records" in cached:
+                return key, cached["records"], None, time.perf_counter() - t0
+        img = load_image(self.engine, path, self.recipe, self.decoder)
+        return key, None, img, time.perf_counter() - t0
+
+    def _feed(self, paths, decode_q):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for path in paths:
+                    if not self._wait_resumed():
+                        break
+                    if not self._put(decode_q, (path, pool.submit(self._load, path))):
+                        break
+            finally:
+                self._put(decode_q, _DONE)
+                if self._stop.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- STAGE 2: INFER ----------------
+    def _infer_bucket(self, items, memo):
+        if not self._wait_resumed():
+            return False
+        t0 = time.perf_counter()
+        try:
+            results = self.engine.run_batch([it["img"] for it in items])
+        except Exception as e:
+            results = None
+            for it in items:
+                it["error"] = e
+        elapsed = time.perf_counter() - t0
+        self.stats["infer_s"] += elapsed
+        self.stats["batches"] += 1
+
+        for it, res in zip(items, results or []):
+            try:
+                it["records"] = self.engine.to_records(res, it["img"].shape)
+                if it["key"] is not None:
+                    self.cache.put(it["key"], {"records": it["records"]})
+            except Exception as e:
+                it["records"], it["error"] = None, e
+        for it in items:
+            it["done"] = True
+            it["infer_s"] = elapsed / len(items)
+        return True
+
+    def _emit_ready(self, pending, result_q, memo):
+        # Input order: stop at the first file whose bucket hasn't run yet
+        while pending:
+            it = pending[0]
+            leader = it["leader"]
+            if leader is not None:
+                if not leader["done"]:
+                    break
+                # Identical file decoded earlier in this run
+                it["records"], it["error"] = leader["records"], leader["error"]
+            elif not it["done"]:
+                break
+            # An emitted leader's records are in the result cache, where a
+            # later identical file finds them; the memo only spans files in
+            # flight, so it stays small in watch mode
+            if memo.get(it["key"]) is it:
+                del memo[it["key"]]
+            if not self._put(result_q, pending.popleft()):
+                return False
+        return True
+
+    def _infer(self, decode_q, result_q):
+        pending = deque()
+        memo = {}  # key -> leader item not yet emitted (cache hit or first decode)
+        batcher = self.batcher
+        batcher.clear()
+
+        # Files held back for a fuller bucket; past this the oldest bucket runs
+        window = batcher.max_batch * self.depth
+
+        try:
+            while True:
+                t0 = time.perf_counter()
+                job = self._get(decode_q)
+                if job is _DONE:
+                    for items in batcher.drain():
+                        if not self._infer_bucket(items, memo):
+                            break
+                    self._emit_ready(pending, result_q, memo)
+                    break
+
+                path, fut = job
+                it = {
+                    "path": path, "key": None, "records": None, "img": None,
+                    "error": None, "done": True, "leader": None,
+                    "decode_s": 0.0, "infer_s": 0.0
+                }
+                try:
+                    it["key"], it["records"], it["img"], it["decode_s"] = fut.result()
+                except Exception as e:
+                    it["error"] = e
+                self.stats["starved_s"] += time.perf_counter() - t0
+
+                key = it["key"]
+                ready = None
+                if it["error"] is not None:
+                    pass
+                elif key is not None and key in memo:
+                    self.stats["duplicates"] += 1
+                    it["leader"], it["img"] = memo[key], None
+                elif it["records"] is not None:
+                    self.stats["hits"] += 1
+                    memo[key] = it
+                elif it["img"] is None:
+                    it["error"] = OSError("image could not be read")
+                else:
+                    if key is not None:
+                        self.stats["misses"] += 1
+                        memo[key] = it
+                    it["done"] = False
+                    ready = batcher.add(it, it["img"].shape)
+                pending.append(it)
+
+                if ready is None and len(pending) > window:
+                    head = pending[0]
+                    ready = batcher.take(head["leader"] or head)
+                if ready and not self._infer_bucket(ready, memo):
+                    break
+                if self.eager and decode_q.empty():
+                    # Nothing else decoded yet: don't hold files for a fuller bucket
+                    for items in batcher.drain():
+                        if not self._infer_bucket(items, memo):
+                            break
+                if not self._emit_ready(pending, result_q, memo):
+                    break
+        except Exception as e:
+            # run() must not report a run cut short here as finished
+            self.error = e
+        finally:
+            self._put(result_q, _DONE)
+
+    # ---------------- STAGE 3: RESULTS ----------------
+    def run(self, paths, on_result, on_progress=None, on_error=None):
+        """
+        on_result(path, records, img): img is the preprocessed image, or
+        None when the records came from the cache
+        - inside on_result, self.timing holds that file's decode_ms and
+          infer_ms (its share of the engine batch)
+        - returns the number of files handled; if the inference stage
+          failed, self.error holds why and the run counts as stopped
+        """
+        total = len(paths) if hasattr(paths, "__len__") else 0
+        done = 0
+        self.source = paths
+        self.error = None
+
+        decode_q = queue.Queue(maxsize=self.workers * self.depth)
+        result_q = queue.Queue(maxsize=self.batch_size)
+
+        feeder = threading.Thread(target=self._feed, args=(paths, decode_q), daemon=True)
+        infer = threading.Thread(target=self._infer, args=(decode_q, result_q), daemon=True)
+        feeder.start()
+        infer.start()
+
+        finished = False
+        try:
+            while True:
+                it = self._get(result_q)
+                if it is _DONE:
+                    finished = not self._stop.is_set() and self.error is None
+                    break
+                done += 1
+                if it["error"] is not None:
+                    if on_error:
+                        on_error(it["path"], it["error"])
+                else:
+                    # Cache hits and identical files did no inference: 0 ms
+                    self.timing = {
+                        "decode_ms": it["decode_s"] * 1000,
+                        "infer_ms": it["infer_s"] * 1000
+                    }
+                    on_result(it["path"], it["records"], it["img"])
+                # Later identical files may still point at it; drop the pixels
+                it["img"] = None
+                if on_progress:
+                    on_progress(done, total)
+        finally:
+            if not finished:
+                self.stop()
+            feeder.join()
+            infer.join()
+            if self.cache is not None:
+                self.cache.flush()
+
+        return done
+
+
+# ==================================================
+# BATCH
+# ==================================================
+def run_ocr_batch(engine, paths, recipe, batch_size=4, workers=4,
+                  on_result=None, on_error=None, cache=None, batcher=None, eager=False):
+    """
+    OCR a list of files in engine batches on an OCRPipeline
+    - on_result(path, records) per readable file, in input order
+    - returns the number of files handled
+    """
+    pipeline = OCRPipeline(
+        engine, recipe, batch_size=batch_size, workers=workers, cache=cache,
+        batcher=batcher, eager=eager
+    )
+    return pipeline.run(
+        paths,
+        on_result=lambda path, records, img: on_result and on_result(path, records),
+        on_error=on_error
+    )
@@ -1,26 +1,20 @@
 import cv2
 import re
-import torch
+import time
 import numpy as np
+from collections import namedtuple
 
-from doctr.models import ocr_predictor
-from doctr.io import DocumentFile
-
-try:
-    import easyocr
-except ImportError:
-    easyocr = None
-
-try:
-    from paddleocr import PaddleOCR
-except ImportError:
-    PaddleOCR = None
+# torch / doctr / easyocr / paddleocr are imported by the engine that needs
+# them: barcode-only processes (barcode_batch pool workers) never load them
 
+from expected_store import ExpectedValueIndex
+from image_decode import ImageDecoder
 
 try:
-    from pyzbar.pyzbar import decode as zbar_decode
+    from pyzbar.pyzbar import decode as zbar_decode, ZBarSymbol
 except ImportError:
     zbar_decode = None
+    ZBarSymbol = None
     
 import re
 
@@ -34,35 +28,159 @@ def clean_text(text: str) -> str:
     return re.sub(r'[^A-Za-z0-9]', '', text)
 
 class BaseOCREngine:
+    # Long side a recipe's "decode_max_side": "engine" reduces batch
+    # decoding to (None = full resolution)
+    DECODE_SIDE = None
+
+    @property
+    def engine_id(self):
+        # Identifies engine output for result caching
+        return type(self).__name__
+
+    # ---------------- RAW RESULTS ----------------
+    # Records are the engine-neutral, JSON-safe form of one result:
+    # [{"text": str, "box": [[x, y] x4], "conf": float}, ...] in pixels.
+    # Keeping them lets validation rules change without re-running OCR.
+    def to_records(self, result, shape):
+        raise NotImplementedError
+
+    def records_text(self, records):
+        return [r["text"] for r in records]
+
+    def _record(self, text, box, conf):
+        pts = np.asarray(box, dtype=np.float32).reshape(-1, 2)
+        return {
+            "text": str(text),
+            "box": [[int(x), int(y)] for x, y in pts],
+            "conf": round(float(conf), 4)
+        }
+
+    def records_matches(self, records, regex):
+        # Same rule as the engines' extract_matches
+        pattern = re.compile(regex, re.IGNORECASE)
+        return [
+            r["text"] for r in records
+            if pattern.fullmatch(r["text"].replace(" ", "").replace("-", ""))
+        ]
+
+    def draw_records(self, img, records, regex):
+        if not regex:
+            return img
+
+        # Group words into lines where the engine reports them
+        groups = {}
+        for i, r in enumerate(records):
+            groups.setdefault(r.get("line", f"r{i}"), []).append(r)
+
+        pattern = re.compile(regex, re.IGNORECASE)
+        for group in groups.values():
+            line_text = " ".join(r["text"] for r in group)
+            if not pattern.search(clean_text(line_text)):
+                continue
+
+            pts_all = []
+            for r in group:
+                pts = np.array(r["box"], dtype=np.int32)
+                cv2.polylines(img, [pts], True, (0, 0, 255), 2)
+                pts_all.append(pts)
+
+            pts_all = np.vstack(pts_all)
+            cv2.putText(
+                img,
+                line_text,
+                (int(pts_all[:, 0].min()), max(int(pts_all[:, 1].min()) - 10, 20)),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (0, 0, 255),
+                2
+            )
+        return img
+
     def preprocess(self, img, brightness, contrast, gamma, rotate_deg, use_clahe):
-        out = img.astype(np.float32)
-        out = out * contrast + brightness
-        out = np.clip(out, 0, 255)
+        out = self.apply_tone(img, brightness, contrast, gamma)
+        out = self.apply_clahe(out, use_clahe)
+        return self.apply_rotate(out, rotate_deg)
+
+    def apply_recipe(self, img, recipe):
+        # preprocess() with the values of a saved recipe (JSON config)
+        if not recipe.get("enable_preprocessing", True):
+            return img
+        rotate = recipe.get("rotate_preset", 0) + recipe.get("fine_rotate", 0)
+        return self.preprocess(
+            img,
+            recipe.get("brightness", 0),
+            recipe.get("contrast", 1.0),
+            recipe.get("gamma", 1.0),
+            rotate % 360,
+            recipe.get("use_clahe", False)
+        )
+
+    # ---------------- PREPROCESS STAGES ----------------
+    @staticmethod
+    def tone_lut(brightness, contrast, gamma):
+        """
+        Brightness / contrast / gamma as a 256-entry lookup table
+        - same arithmetic as the per-pixel float path
+        """
+        lut = np.arange(256, dtype=np.float32)
+        lut = np.clip(lut * contrast + brightness, 0, 255)
+        gamma = max(gamma, 0.01)
+        lut = 255 * ((lut / 255) ** (1 / gamma))
+        return np.clip(lut, 0, 255).astype(np.uint8)
+
+    def apply_tone(self, img, brightness, contrast, gamma):
+        if img.dtype == np.uint8:
+            return cv2.LUT(img, self.tone_lut(brightness, contrast, gamma))
 
+        out = img.astype(np.float32)
+        out = np.clip(out * contrast + brightness, 0, 255)
         gamma = max(gamma, 0.01)
         out = 255 * ((out / 255) ** (1 / gamma))
-        out = np.clip(out, 0, 255).astype(np.uint8)
-
-        if use_clahe:
-            gray = cv2.cvtColor(out, cv2.COLOR_BGR2GRAY)
-            clahe = cv2.createCLAHE(2.0, (8, 8))
-            gray = clahe.apply(gray)
-            out = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-
-        if rotate_deg % 360 != 0:
-            h, w = out.shape[:2]
-            center = (w / 2, h / 2)
-            M = cv2.getRotationMatrix2D(center, rotate_deg, 1.0)
-            cos, sin = abs(M[0, 0]), abs(M[0, 1])
-            new_w = int(h * sin + w * cos)
-            new_h = int(h * cos + w * sin)
-            M[0, 2] += (new_w / 2) - center[0]
-            M[1, 2] += (new_h / 2) - center[1]
-            out = cv2.warpAffine(out, M, (new_w, new_h))
+        return np.clip(out, 0, 255).astype(np.uint8)
+
+    def apply_clahe(self, img, use_clahe):
+        if not use_clahe:
+            return img
+        clahe = cv2.createCLAHE(2.0, (8, 8))
+        if img.ndim == 2:
+            return clahe.apply(img)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = clahe.apply(gray)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    def apply_rotate(self, img, rotate_deg):
+        if rotate_deg % 360 == 0:
+            return img
+        out, _ = self.rotate_bound(img, rotate_deg)
         return out
 
+    def rotate_bound(self, img, rotate_deg, border_value=0):
+        """
+        Rotate without cropping the corners
+        - returns (rotated, M) where M maps source -> rotated coordinates
+        """
+        h, w = img.shape[:2]
+        center = (w / 2, h / 2)
+        M = cv2.getRotationMatrix2D(center, rotate_deg, 1.0)
+        cos, sin = abs(M[0, 0]), abs(M[0, 1])
+        new_w = int(h * sin + w * cos)
+        new_h = int(h * cos + w * sin)
+        M[0, 2] += (new_w / 2) - center[0]
+        M[1, 2] += (new_h / 2) - center[1]
+        out = cv2.warpAffine(img, M, (new_w, new_h), borderValue=border_value)
+        return out, M
+
 class DoctrEngine(BaseOCREngine):
+    # Detection runs at 1024 px; keep 2x that for the recognition crops
+    DECODE_SIDE = 2048
+
     def __init__(self):
+        import torch
+        from doctr.models import ocr_predictor
+        from doctr.io import DocumentFile
+        self.torch = torch
+        self.document_file = DocumentFile
+
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"[INFO] Doctr using device: {self.device}")
 
@@ -77,8 +195,8 @@ class DoctrEngine(BaseOCREngine):
             _, buf = cv2.imencode(".jpg", rgb)
             buffers.append(buf.tobytes())
 
-        docs = DocumentFile.from_images(buffers)
-        with torch.no_grad():
+        docs = self.document_file.from_images(buffers)
+        with self.torch.no_grad():
             result = self.model(docs)
 
         return result.pages
@@ -91,6 +209,27 @@ class DoctrEngine(BaseOCREngine):
             for word in line.words
         ]
 
+    def to_records(self, page, shape):
+        # Word records; "line" lets draw_records highlight whole lines
+        h, w = shape[:2]
+        records = []
+        line_no = 0
+        for block in page.blocks:
+            for line in block.lines:
+                for word in line.words:
+                    (x0, y0), (x1, y1) = word.geometry
+                    x0, x1 = x0 * w, x1 * w
+                    y0, y1 = y0 * h, y1 * h
+                    record = self._record(
+                        word.value,
+                        [[x0, y0], [x1, y0], [x1, y1], [x0, y1]],
+                        word.confidence
+                    )
+                    record["line"] = line_no
+                    records.append(record)
+                line_no += 1
+        return records
+
     def extract_matches(self, page, regex):
         pattern = re.compile(regex, re.IGNORECASE)
         matches = []
@@ -138,7 +277,12 @@ class DoctrEngine(BaseOCREngine):
 
 
 class EasyOCREngine(BaseOCREngine):
+    # readtext's default canvas_size
+    DECODE_SIDE = 2560
+
     def __init__(self):
+        import torch
+        import easyocr
         self.reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available(), quantize=True)
 
     def run_batch(self, images):
@@ -147,6 +291,9 @@ class EasyOCREngine(BaseOCREngine):
     def extract_all_text(self, result):
         return [text for _, text, _ in result]
 
+    def to_records(self, result, shape):
+        return [self._record(text, box, conf) for box, text, conf in result]
+
     def extract_matches(self, result, regex):
         pattern = re.compile(regex, re.IGNORECASE)
         matches = []
@@ -178,6 +325,7 @@ class EasyOCREngine(BaseOCREngine):
 
 class PPOCREngine(BaseOCREngine):
     def __init__(self):
+        from paddleocr import PaddleOCR
         self.ocr = PaddleOCR(lang="en", device="gpu", ocr_version="PP-OCRv4")
 
     def run_batch(self, images):
@@ -189,6 +337,21 @@ class PPOCREngine(BaseOCREngine):
             texts.extend(res.get("rec_texts", []))
         return texts
 
+    def to_records(self, result, shape):
+        records = []
+        for res in result:
+            texts = res.get("rec_texts", [])
+            scores = res.get("rec_scores", [1.0] * len(texts))
+            polys = res.get("rec_polys")
+            if polys is None:
+                polys = res.get("dt_polys", [])
+
+            for text, score, poly in zip(texts, scores, polys):
+                pts = self.normalize_box(poly)
+                if pts is not None:
+                    records.append(self._record(text, pts, score))
+        return records
+
     def extract_matches(self, result, regex):
         pattern = re.compile(regex, re.IGNORECASE)
         matches = []
@@ -256,9 +419,241 @@ class PPOCREngine(BaseOCREngine):
 
         return img
 
-class BarcodeEngine(BaseOCREngine):
+# ================= BARCODE BACKENDS =================
+# Backends return BarcodeResult (or pyzbar's Decoded, which has the same
+# data / type / rect / polygon fields), so BarcodeEngine stays engine-agnostic.
+Rect = namedtuple("Rect", "left top width height")
+Point = namedtuple("Point", "x y")
+BarcodeResult = namedtuple("BarcodeResult", "data type rect polygon")
+
+# zbar symbology names; also the names recipes use in "barcode_symbols"
+BARCODE_SYMBOLS = (
+    "EAN2", "EAN5", "EAN8", "UPCE", "ISBN10", "UPCA", "EAN13", "ISBN13",
+    "COMPOSITE", "I25", "DATABAR", "DATABAR_EXP", "CODABAR", "CODE39",
+    "PDF417", "QRCODE", "SQCODE", "CODE93", "CODE128",
+)
+
+
+class BarcodeBackend:
+    name = ""
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def decode(self, gray, symbols=None):
+        """
+        Decode an 8-bit grayscale image
+        - symbols: list of BARCODE_SYMBOLS names, None = everything
+        """
+        raise NotImplementedError
+
+
+class ZbarBackend(BarcodeBackend):
+    name = "zbar"
+
     def __init__(self):
+        self._symbol_cache = {}
+
+    @classmethod
+    def available(cls):
+        return zbar_decode is not None
+
+    def decode(self, gray, symbols=None):
+        if symbols is None:
+            return zbar_decode(gray)
+
+        key = tuple(symbols)
+        if key not in self._symbol_cache:
+            self._symbol_cache[key] = [ZBarSymbol[s] for s in symbols]
+        return zbar_decode(gray, symbols=self._symbol_cache[key])
+
+
+class OpenCVBarcodeBackend(BarcodeBackend):
+    """
+    cv2.barcode (1D: EAN / UPC / Code128 / Code39 ...) + cv2.QRCodeDetector
+    - no native symbology filter; results are filtered after decode
+    - needs OpenCV >= 4.8 (or opencv-contrib 4.5.3+) for 1D codes
+    """
+    name = "opencv"
+
+    # cv2.barcode_BarcodeDetector (contrib < 4.8) returns enum values
+    LEGACY_TYPES = {1: "EAN8", 2: "EAN13", 3: "UPCA", 4: "UPCE"}
+
+    def __init__(self):
+        if hasattr(cv2, "barcode") and hasattr(cv2.barcode, "BarcodeDetector"):
+            self.detector = cv2.barcode.BarcodeDetector()
+        elif hasattr(cv2, "barcode_BarcodeDetector"):
+            self.detector = cv2.barcode_BarcodeDetector()
+        else:
+            self.detector = None
+        self.qr = cv2.QRCodeDetector()
+
+    @classmethod
+    def available(cls):
+        return hasattr(cv2, "barcode") or hasattr(cv2, "barcode_BarcodeDetector")
+
+    def _result(self, text, kind, pts):
+        pts = np.asarray(pts, dtype=np.float32).reshape(-1, 2)
+        x, y, w, h = cv2.boundingRect(pts.astype(np.int32))
+        return BarcodeResult(
+            text.encode("utf-8"),
+            kind,
+            Rect(x, y, w, h),
+            [Point(int(px), int(py)) for px, py in pts]
+        )
+
+    def _decode_1d(self, gray):
+        if self.detector is None:
+            return []
+
+        if hasattr(self.detector, "detectAndDecodeWithType"):
+            ok, infos, types, points = self.detector.detectAndDecodeWithType(gray)
+        else:
+            ok, infos, types, points = self.detector.detectAndDecode(gray)
+
+        if not ok or points is None:
+            return []
+
+        out = []
+        for text, kind, pts in zip(infos, types, points):
+            if not text:
+                continue
+            # OpenCV reports "CODE_128", "EAN_13" (ints before 4.8); zbar says "CODE128"
+            if not isinstance(kind, str):
+                kind = self.LEGACY_TYPES.get(int(kind), "")
+            out.append(self._result(text, kind.replace("_", ""), pts))
+        return out
+
+    def _decode_qr(self, gray):
+        ok, infos, points, _ = self.qr.detectAndDecodeMulti(gray)
+        if not ok or points is None:
+            return []
+        return [
+            self._result(text, "QRCODE", pts)
+            for text, pts in zip(infos, points)
+            if text
+        ]
+
+    def decode(self, gray, symbols=None):
+        results = []
+        if symbols is None or any(s != "QRCODE" for s in symbols):
+            results.extend(self._decode_1d(gray))
+        if symbols is None or "QRCODE" in symbols:
+            results.extend(self._decode_qr(gray))
+
+        if symbols is not None:
+            results = [r for r in results if r.type in symbols]
+        return results
+
+
+BARCODE_BACKENDS = {
+    ZbarBackend.name: ZbarBackend,
+    OpenCVBarcodeBackend.name: OpenCVBarcodeBackend,
+}
+
+
+def make_barcode_backend(name=None):
+    """
+    Build a backend by name; None picks zbar, else OpenCV if pyzbar is missing
+    """
+    if name is None:
+        name = "zbar" if ZbarBackend.available() else "opencv"
+    if name not in BARCODE_BACKENDS:
+        raise ValueError(f"Unknown barcode backend: {name}")
+
+    cls = BARCODE_BACKENDS[name]
+    if not cls.available():
+        raise ValueError(f"Barcode backend not available: {name}")
+    return cls()
+
+
+# Decode ladder rungs, cheapest first. Each rung is a fallback for the previous
+# one; BarcodeEngine.ladder_stats counts which rung produced the read.
+DECODE_LADDER = ("raw", "downscale", "otsu", "invert", "sharpen", "rotate")
+
+
+class BarcodeEngine(BaseOCREngine):
+    # Ladder tuning
+    LADDER_DOWNSCALE = 0.5
+    LADDER_ANGLES = (10, -10, 20, -20, 30, -30, 45, -45)
+
+    # Localization runs on a downscaled copy; crops are cut from full-res
+    LOCATE_MAX_SIDE = 640
+    LOCATE_MAX_REGIONS = 4
+    LOCATE_MIN_AREA = 0.002     # fraction of the downscaled frame
+    LOCATE_PAD = 0.15           # quiet-zone padding, fraction of box size
+
+    def __init__(self, use_localization=True, symbols=None, grayscale=True,
+                 ladder=DECODE_LADDER, budget_ms=None, backend=None):
         super().__init__()
+        self.backend = make_barcode_backend(backend)
+        self.use_localization = use_localization
+        self.grayscale = grayscale
+        self.decoder = ImageDecoder(grayscale=grayscale, color_out=False)
+        self.symbols = None
+        self.set_symbols(symbols)
+
+        self.ladder = []
+        self.set_ladder(ladder)
+        self.budget_ms = budget_ms
+        self.reset_ladder_stats()
+
+    # ---------------- RECIPE ----------------
+    @property
+    def engine_id(self):
+        return f"{type(self).__name__}:{self.backend.name}"
+
+    def set_backend(self, name):
+        if name != self.backend.name:
+            self.backend = make_barcode_backend(name)
+
+    def set_symbols(self, names):
+        """
+        Restrict decoding to a symbology whitelist
+        - names like "CODE128", "QRCODE", "EAN13" (see BARCODE_SYMBOLS)
+        - empty / None scans every symbology
+        """
+        if not names:
+            self.symbols = None
+            return
+
+        if isinstance(names, str):
+            names = [n for n in re.split(r"[,\s]+", names) if n]
+
+        symbols = []
+        for name in names:
+            key = name.strip().upper().replace("-", "")
+            if key not in BARCODE_SYMBOLS:
+                raise ValueError(f"Unknown barcode symbology: {name}")
+            symbols.append(key)
+
+        self.symbols = symbols or None
+
+    def set_ladder(self, rungs):
+        rungs = list(rungs or DECODE_LADDER)
+        unknown = [r for r in rungs if r not in DECODE_LADDER]
+        if unknown:
+            raise ValueError(f"Unknown decode ladder rung(s): {unknown}")
+        self.ladder = rungs
+
+    def configure(self, cfg):
+        if cfg.get("barcode_backend"):
+            self.set_backend(cfg["barcode_backend"])
+        self.use_localization = cfg.get("barcode_localize", self.use_localization)
+        self.grayscale = cfg.get("barcode_grayscale", self.grayscale)
+        self.set_symbols(cfg.get("barcode_symbols"))
+        self.set_ladder(cfg.get("barcode_ladder", self.ladder))
+        self.budget_ms = cfg.get("barcode_budget_ms", self.budget_ms)
+        # Bars need their pixels: reduced decoding only when the recipe asks
+        max_side = cfg.get("decode_max_side")
+        if max_side == "engine":
+            max_side = self.DECODE_SIDE
+        self.decoder = ImageDecoder(max_side, self.grayscale, color_out=False)
+
+    def read_image(self, path):
+        # Also reads one page of a multi-page TIFF ("scan.tif#2")
+        return self.decoder.read(path)
 
     # ---------------- NORMALIZATION ----------------
     def normalize(self, text: str) -> str:
@@ -269,7 +664,228 @@ class BarcodeEngine(BaseOCREngine):
             .replace("_", "")
         )
 
+    # ---------------- LOCALIZATION ----------------
+    def _to_gray(self, img):
+        if img.ndim == 2:
+            return img
+        if img.shape[2] == 4:
+            return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+        if img.shape[2] == 1:
+            return img[:, :, 0]
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    def _gradient_mask(self, grad, kernel_size):
+        grad = cv2.blur(grad, (7, 7))
+        _, mask = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, kernel_size)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        mask = cv2.erode(mask, None, iterations=3)
+        mask = cv2.dilate(mask, None, iterations=3)
+        return mask
+
+    def locate(self, img):
+        """
+        Find candidate barcode regions
+        - gradient + morphology on a downscaled grayscale copy
+        - 1D bars (both orientations) and 2D codes (QR / DataMatrix)
+        - returns (x, y, w, h) boxes in full-resolution coordinates
+        """
+        gray = self._to_gray(img)
+        h, w = gray.shape[:2]
+
+        scale = min(1.0, self.LOCATE_MAX_SIDE / float(max(h, w)))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(
+                gray,
+                (max(1, int(w * scale)), max(1, int(h * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+
+        gx = cv2.Sobel(small, cv2.CV_32F, 1, 0, ksize=-1)
+        gy = cv2.Sobel(small, cv2.CV_32F, 0, 1, ksize=-1)
+        ax, ay = np.abs(gx), np.abs(gy)
+
+        masks = [
+            # vertical bars -> strong x gradient, closed horizontally
+            self._gradient_mask(cv2.convertScaleAbs(np.maximum(ax - ay, 0)), (21, 7)),
+            # horizontal bars (rotated 90°)
+            self._gradient_mask(cv2.convertScaleAbs(np.maximum(ay - ax, 0)), (7, 21)),
+            # 2D codes -> strong gradient in both directions
+            self._gradient_mask(cv2.convertScaleAbs(np.minimum(ax, ay)), (11, 11)),
+        ]
+
+        mask = masks[0]
+        for m in masks[1:]:
+            mask = cv2.bitwise_or(mask, m)
+
+        contours, _ = cv2.findContours(
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+
+        min_area = self.LOCATE_MIN_AREA * small.shape[0] * small.shape[1]
+        boxes = [cv2.boundingRect(c) for c in contours]
+        boxes = [b for b in boxes if b[2] * b[3] >= min_area]
+        boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+
+        regions = []
+        for bx, by, bw, bh in boxes[:self.LOCATE_MAX_REGIONS]:
+            pad = int(max(bw, bh) * self.LOCATE_PAD) + 2
+            x0 = max(0, int((bx - pad) / scale))
+            y0 = max(0, int((by - pad) / scale))
+            x1 = min(w, int((bx + bw + pad) / scale))
+            y1 = min(h, int((by + bh + pad) / scale))
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+
+        return regions
+
+    def _backend_decode(self, gray):
+        return self.backend.decode(gray, self.symbols)
+
+    def _shift_result(self, b, dx, dy):
+        rect = type(b.rect)(b.rect.left + dx, b.rect.top + dy, b.rect.width, b.rect.height)
+        polygon = [type(p)(p.x + dx, p.y + dy) for p in b.polygon]
+        return b._replace(rect=rect, polygon=polygon)
+
+    def _map_points(self, pts, M):
+        pts = np.asarray(pts, dtype=np.float32).reshape(-1, 1, 2)
+        return cv2.transform(pts, M).reshape(-1, 2)
+
+    def _map_result(self, b, M):
+        pts = self._map_points([(p.x, p.y) for p in b.polygon], M)
+        x, y, w, h = cv2.boundingRect(pts.astype(np.int32))
+        polygon = [type(p)(int(px), int(py)) for p, (px, py) in zip(b.polygon, pts)]
+        return b._replace(rect=type(b.rect)(x, y, w, h), polygon=polygon)
+
+    def _map_region(self, region, M):
+        x, y, w, h = region
+        corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+        return cv2.boundingRect(self._map_points(corners, M).astype(np.int32))
+
+    # ---------------- DECODE LADDER ----------------
+    def _ladder_variants(self, rung, gray):
+        """
+        Yield (variant, M) for one rung
+        - M maps variant coordinates back to the frame (None = identity)
+        """
+        if rung == "raw":
+            yield gray, None
+
+        elif rung == "downscale":
+            s = self.LADDER_DOWNSCALE
+            small = cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+            yield small, np.float32([[1 / s, 0, 0], [0, 1 / s, 0]])
+
+        elif rung == "otsu":
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            yield binary, None
+
+        elif rung == "invert":
+            yield cv2.bitwise_not(gray), None
+
+        elif rung == "sharpen":
+            blur = cv2.GaussianBlur(gray, (0, 0), 3)
+            yield cv2.addWeighted(gray, 1.5, blur, -0.5, 0), None
+
+        elif rung == "rotate":
+            for deg in self.LADDER_ANGLES:
+                rotated, M = self.rotate_bound(gray, deg, border_value=255)
+                yield rotated, cv2.invertAffineTransform(M)
+
+    def reset_ladder_stats(self):
+        self.ladder_stats = {rung: 0 for rung in DECODE_LADDER}
+        self.ladder_stats["miss"] = 0
+        self.ladder_stats["budget"] = 0
+
+    def ladder_report(self):
+        """
+        Per-rung hit counts and hit rate, most productive first
+        - "miss": every rung ran without a read
+        - "budget": the frame ran out of time before the ladder finished
+        """
+        total = sum(self.ladder_stats.values())
+        rows = [
+            (rung, hits, hits / total if total else 0.0)
+            for rung, hits in self.ladder_stats.items()
+        ]
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows
+
+    def ladder_by_hit_rate(self):
+        return [
+            rung for rung, _, _ in self.ladder_report()
+            if rung in self.ladder
+        ]
+
     # ---------------- DECODE ----------------
+    def decode(self, img):
+        """
+        Decode one frame through the ladder
+        - stops at the first rung that reads a barcode
+        - the first attempt always runs; later ones only inside budget_ms
+        - returns (results, regions); regions are the crops that decoded
+        """
+        if img is None:
+            return [], []
+
+        # Backends decode 8-bit luminance; convert once, not per crop
+        gray = self._to_gray(img)
+
+        t0 = time.perf_counter()
+        first = True
+
+        for rung in self.ladder:
+            for variant, M in self._ladder_variants(rung, gray):
+                if not first and self.budget_ms is not None:
+                    if (time.perf_counter() - t0) * 1000 > self.budget_ms:
+                        self.ladder_stats["budget"] += 1
+                        return [], []
+                first = False
+
+                results, regions = self._decode_gray(variant)
+                if not results:
+                    continue
+
+                if M is not None:
+                    results = [self._map_result(b, M) for b in results]
+                    regions = [self._map_region(r, M) for r in regions]
+
+                self.ladder_stats[rung] += 1
+                return results, regions
+
+        self.ladder_stats["miss"] += 1
+        return [], []
+
+    def _decode_gray(self, gray):
+        """
+        Single backend pass
+        - localized crops first, full-frame decode as fallback
+        """
+        if not self.use_localization:
+            return self._backend_decode(gray), []
+
+        results = []
+        regions = []
+        seen = set()
+
+        for x, y, w, h in self.locate(gray):
+            found = self._backend_decode(gray[y:y + h, x:x + w])
+            if not found:
+                continue
+
+            regions.append((x, y, w, h))
+            for b in found:
+                key = (b.type, b.data)
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(self._shift_result(b, x, y))
+
+        if not results:
+            return self._backend_decode(gray), []
+
+        return results, regions
+
     def run_batch(self, images):
         outputs = []
 
@@ -278,61 +894,62 @@ class BarcodeEngine(BaseOCREngine):
                 outputs.append([])
                 continue
 
-            # Alpha-safe
-            # if img.ndim == 3 and img.shape[2] == 4:
-            #     img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-
-            # # Grayscale
-            # if img.ndim == 3:
-            #     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            # else:
-            #     gray = img
-
-            # Soft binarization
-            # _, gray = cv2.threshold(
-            #     gray, 0, 255,
-            #     cv2.THRESH_BINARY + cv2.THRESH_OTSU
-            # )
-
-            # if np.mean(gray) > 127:
-            #     gray = cv2.bitwise_not(gray)
-
-            outputs.append(zbar_decode(img))
+            outputs.append(self.decode(img)[0])
 
         return outputs
 
     # ---------------- MATCH LOGIC ----------------
-    def extract_matches(self, result, expected_input: str):
+    def raw_values(self, result):
+        return [b.data.decode("utf-8", errors="ignore") for b in result]
+
+    def match_values(self, raws, expected_input):
+        """
+        expected_input is a single value (str) or an ExpectedValueIndex
+        """
         matches = []
         values = []
 
-        if not result:
+        if not raws:
             return matches, values
 
-        expected_clean = (
-            self.normalize(expected_input)
-            if expected_input else None
-        )
-
-        pattern = None
-        if expected_clean:
-            pattern = re.compile(
-                re.escape(expected_clean),
-                re.IGNORECASE
-            )
+        index = expected_input
+        if not isinstance(index, ExpectedValueIndex):
+            index = ExpectedValueIndex([expected_input] if expected_input else [])
 
-        for b in result:
-            raw = b.data.decode("utf-8", errors="ignore")
+        for raw in raws:
             clean = self.normalize(raw)
             values.append(clean)
 
-            if pattern and pattern.fullmatch(clean):
+            if index.match(raw):
                 matches.append(clean)
 
         return matches, values
 
+    def extract_matches(self, result, expected_input):
+        return self.match_values(self.raw_values(result or []), expected_input)
+
+    def verdict(self, result, expected_input):
+        return self.verdict_values(self.raw_values(result or []), expected_input)
+
+    def verdict_values(self, raws, expected_input):
+        matches, values = self.match_values(raws, expected_input)
+
+        if not values:
+            status = "NO BARCODE"
+        elif matches:
+            status = "MATCH"
+        else:
+            status = "NOT MATCH"
+
+        return status, values
+
     # ---------------- VISUAL FEEDBACK ----------------
-    def draw_matches(self, img, result, expected_input: str):
+    def draw_regions(self, img, regions, color=(255, 200, 0)):
+        for x, y, w, h in regions:
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
+        return img
+
+    def draw_matches(self, img, result, expected_input):
         matches, values = self.extract_matches(result, expected_input)
 
         if matches:
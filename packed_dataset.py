@@ -0,0 +1,199 @@
+"""
+Packed image sets for repeatable benchmarks
+
+    python packed_dataset.py barcodee packs/barcodee.pack
+    python packed_dataset.py labels/ packs/labels.pack --max-side 2048
+    python batch_cli.py ocr packs/labels.pack
+
+A pack is a directory:
+- pixels.u8   decoded images back to back (64-byte aligned), raw uint8
+- index.npy   one (offset, h, w, c) row per image
+- meta.json   format version, source, decode settings, item paths
+
+Images are decoded once when packing; reading is a memory-mapped,
+zero-copy view, so a run over a pack measures the engine, not the decoder
+(batch_cli turns the result cache off for packs).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from image_decode import ImageDecoder, PageStream
+
+
+VERSION = 1
+ALIGN = 64
+
+PIXELS_FILE = "pixels.u8"
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+
+INDEX_DTYPE = np.dtype([("offset", "<i8"), ("h", "<i4"), ("w", "<i4"), ("c", "<i2")])
+
+
+def is_pack(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+# ==================================================
+# WRITE
+# ==================================================
+def pack_images(paths, out_dir, max_side=None, grayscale=False, source=None, on_progress=None):
+    """
+    Decode paths once and write them as a pack
+    - max_side / grayscale as ImageDecoder; the defaults keep full BGR
+    - unreadable files are skipped; returns the number of images packed
+    - meta.json is written last, so an interrupted pack is never opened
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path = os.path.join(out_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    decoder = ImageDecoder(max_side, grayscale, color_out=False)
+    rows, items = [], []
+    offset = 0
+
+    with open(os.path.join(out_dir, PIXELS_FILE), "wb") as f:
+        for i, path in enumerate(PageStream(paths)):
+            img = decoder.read(path)
+            if on_progress:
+                on_progress(i + 1, path, img is not None)
+            if img is None:
+                continue
+
+            img = np.ascontiguousarray(img, dtype=np.uint8)
+            h, w = img.shape[:2]
+            c = 1 if img.ndim == 2 else img.shape[2]
+            f.write(img.data)
+
+            rows.append((offset, h, w, c))
+            items.append(path)
+            offset += img.nbytes
+            pad = -offset % ALIGN
+            if pad:
+                f.write(b"\0" * pad)
+                offset += pad
+
+    np.save(os.path.join(out_dir, INDEX_FILE), np.array(rows, dtype=INDEX_DTYPE))
+
+    meta = {
+        "version": VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source": source,
+        "count": len(items),
+        "bytes": offset,
+        "decode": decoder.describe(),
+        "paths": items
+    }
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+    return len(items)
+
+
+# ==================================================
+# READ
+# ==================================================
+class PackedDataset:
+    """
+    Read-only, memory-mapped pack
+    - dataset[i] / read(path) return NumPy views into the mapping (no copy,
+      not writeable); the OS page cache is shared between processes
+    - read / describe / summary make it a drop-in decoder for OCRPipeline
+      and BarcodeEngine; color_out converts one-channel packs for engines
+      that want BGR (that read is a copy)
+    """
+
+    def __init__(self, path, color_out=True):
+        self.path = path
+        self.color_out = color_out
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"{path}: unsupported pack version {self.meta.get('version')}")
+
+        self.index = np.load(os.path.join(path, INDEX_FILE), mmap_mode="r")
+        self.paths = self.meta["paths"]
+        self.positions = {p: i for i, p in enumerate(self.paths)}
+
+        size = os.path.getsize(os.path.join(path, PIXELS_FILE))
+        self.pixels = (
+            np.memmap(os.path.join(path, PIXELS_FILE), dtype=np.uint8, mode="r")
+            if size else np.zeros(0, dtype=np.uint8)
+        )
+        self.reads = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        offset, h, w, c = (int(v) for v in self.index[i])
+        view = self.pixels[offset:offset + h * w * c]
+        return view.reshape((h, w) if c == 1 else (h, w, c))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.paths[i], self[i]
+
+    # ---------------- DECODER INTERFACE ----------------
+    def read(self, path):
+        i = self.positions.get(path)
+        if i is None:
+            return None
+        self.reads += 1
+        img = self[i]
+        if self.color_out and img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
+
+    def describe(self):
+        # The decode settings the pixels were packed with
+        return self.meta.get("decode")
+
+    def summary(self):
+        return f"packed {self.path}: {self.reads} images mapped, no decode"
+
+
+# ================= ENTRY POINT =================
+def main(argv=None):
+    from ocr_batch import list_images
+
+    ap = argparse.ArgumentParser(description="Pack an image folder for benchmarks")
+    ap.add_argument("source", help="image folder or glob pattern")
+    ap.add_argument("out", help="pack directory, e.g. packs/labels.pack")
+    ap.add_argument("--max-side", type=int, help="decode reduced, keeping this long side")
+    ap.add_argument("--gray", action="store_true", help="store one channel")
+    args = ap.parse_args(argv)
+
+    paths = list_images(args.source)
+    if not paths:
+        print(f"No images found: {args.source}", file=sys.stderr)
+        return 1
+
+    def on_progress(n, path, ok):
+        if not ok:
+            print(f"⚠️ {os.path.basename(path)}: could not be read", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    count = pack_images(
+        paths, args.out, args.max_side, args.gray,
+        source=os.path.abspath(args.source), on_progress=on_progress
+    )
+    size = os.path.getsize(os.path.join(args.out, PIXELS_FILE))
+    print(
+        f"✅ {count} images, {size / 1e6:.1f} MB in {args.out} "
+        f"({time.perf_counter() - t0:.1f} s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
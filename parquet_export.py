@@ -0,0 +1,175 @@
+"""
+Columnar result exports (Parquet, written as Arrow record batches)
+
+- typed columns: counts are int32, flags bool, timings float32, raw text
+  list<string>; "" / "N/A" placeholders of the CSV rows become nulls
+- repeated strings (status, regex) are dictionary-encoded
+- rows are buffered and written one record batch at a time, so a long
+  live or watch run streams to disk instead of piling up in memory
+
+pyarrow is optional; without it `available()` is False and callers keep
+to CSV.
+
+    import parquet_export
+    table = parquet_export.load("exports/batch_result_....parquet")
+    df = table.to_pandas()
+"""
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def available():
+    return pq is not None
+
+
+# ==================================================
+# SCHEMAS
+# ==================================================
+# column -> kind; kinds map to Arrow types in _arrow_type
+OCR_BATCH_COLUMNS = {
+    "ts": "time",
+    "file_name": "str",
+    "expected_count": "int",
+    "regex": "dict",
+    "detected_count": "int",
+    "regex_match": "bool",
+    "duplicate": "bool",
+    "final_result": "dict",
+    "raw_text": "list",
+    "matches": "list",
+    "decode_ms": "ms",
+    "infer_ms": "ms",
+}
+
+OCR_LIVE_COLUMNS = {
+    "ts": "time",
+    "frame": "int",
+    "expected_count": "int",
+    "regex": "dict",
+    "detected_count": "int",
+    "regex_match": "bool",
+    "duplicate": "bool",
+    "final_result": "dict",
+    "raw_text": "list",
+    "ocr_ms": "ms",
+}
+
+BARCODE_COLUMNS = {
+    "ts": "time",
+    "image": "str",
+    "values": "list",
+    "status": "dict",
+    "duplicate": "bool",
+}
+
+
+def _arrow_type(kind):
+    return {
+        "time": pa.timestamp("ms"),
+        "str": pa.string(),
+        "int": pa.int32(),
+        "bool": pa.bool_(),
+        "ms": pa.float32(),
+        "list": pa.list_(pa.string()),
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+    }[kind]
+
+
+# CSV-row placeholders that become nulls
+NULLS = ("", "N/A")
+
+
+def _column(kind, values):
+    values = [None if v is None or v in NULLS else v for v in values]
+    if kind == "time":
+        values = [datetime.fromisoformat(v) if isinstance(v, str) else v for v in values]
+    elif kind == "dict":
+        return pa.array(values, pa.string()).dictionary_encode()
+    return pa.array(values, _arrow_type(kind))
+
+
+def schema(columns):
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in columns.items()])
+
+
+# ==================================================
+# WRITE
+# ==================================================
+class ParquetRowWriter:
+    """
+    Row dicts -> Parquet, one record batch per `chunk` rows
+    - missing keys are null; "ts" defaults to the time the row was added
+    - Parquet writes its footer in close(); until then the file can't be read
+    """
+
+    def __init__(self, path, columns, chunk=4096):
+        if not available():
+            raise RuntimeError("pyarrow is not installed")
+        self.path = path
+        self.columns = columns
+        self.chunk = chunk
+        self.schema = schema(columns)
+        self.rows = []
+        self.count = 0
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def append(self, row):
+        if "ts" in self.columns and not row.get("ts"):
+            row = {**row, "ts": datetime.now()}
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _batch(self, rows):
+        arrays = [
+            _column(kind, [r.get(name) for r in rows])
+            for name, kind in self.columns.items()
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def flush(self):
+        if self.rows and self.writer is not None:
+            self.writer.write_table(pa.Table.from_batches([self._batch(self.rows)]))
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+
+def export_rows(path, rows, columns):
+    """
+    One-shot export of a list of row dicts; returns the row count
+    """
+    writer = ParquetRowWriter(path, columns)
+    try:
+        writer.extend(rows)
+    finally:
+        writer.close()
+    return writer.count
+
+
+# ==================================================
+# READ
+# ==================================================
+def load(path, columns=None, filters=None):
+    """
+    pyarrow Table; columns / filters are pushed down to the file, e.g.
+    filters=[("final_result", "=", "NOT_OK")]
+    """
+    if not available():
+        raise RuntimeError("pyarrow is not installed")
+    return pq.read_table(path, columns=columns, filters=filters)
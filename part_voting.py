@@ -0,0 +1,187 @@
+from collections import Counter, deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+
+class PartVoter:
+    """
+    Sliding-window vote over per-frame reads of one part
+    - add() returns a verdict once `agree` of the last `window` reads agree
+    - frames without a read are not votes: an empty belt or a part still
+      sliding in must not lock a verdict; no_read() closes a part that
+      left unread (see PartPresence)
+    - after a verdict the voter stays locked until reset()
+    """
+
+    def __init__(self, window=7, agree=4):
+        if not 0 < agree <= window:
+            raise ValueError("vote agree count must be in 1..window")
+
+        self.window = window
+        self.agree = agree
+        self.frames = deque(maxlen=window)
+        self.verdict = None
+
+    @property
+    def locked(self):
+        return self.verdict is not None
+
+    def reset(self):
+        self.frames.clear()
+        self.verdict = None
+
+    def add(self, status, value=None):
+        if self.locked or not value:
+            return None
+
+        self.frames.append((status, value))
+        (key, votes), = Counter(self.frames).most_common(1)
+
+        if votes < self.agree:
+            return None
+
+        self.verdict = {
+            "status": key[0],
+            "value": key[1],
+            "votes": votes,
+            "frames": len(self.frames)
+        }
+        return self.verdict
+
+    def no_read(self, status="NO BARCODE", undecided="UNDECIDED"):
+        """
+        Verdict for a part that left the view without a verdict; the
+        voter is reset, not locked, since the part is already gone
+        - `status` when nothing was read, `undecided` when reads came in
+          but never agreed (conflicting or too few)
+        """
+        verdict = {
+            "status": undecided if self.frames else status,
+            "value": None,
+            "votes": 0,
+            "frames": len(self.frames)
+        }
+        self.reset()
+        return verdict
+
+
+class SceneChangeDetector:
+    """
+    Cheap "did the part move?" test
+    - compares a small grayscale thumbnail against a reference frame
+    - threshold is the mean absolute difference on the 0-255 scale
+    """
+
+    THUMB_SIZE = (64, 48)
+
+    def __init__(self, threshold=12.0):
+        self.threshold = threshold
+        self.reference = None
+
+    def _thumb(self, frame):
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        elif frame.ndim == 3:
+            frame = frame[:, :, 0]
+        thumb = cv2.resize(frame, self.THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        return thumb.astype(np.int16)
+
+    def set_reference(self, frame):
+        self.reference = self._thumb(frame)
+
+    def clear(self):
+        self.reference = None
+
+    def changed(self, frame):
+        if self.reference is None:
+            return True
+        diff = np.abs(self._thumb(frame) - self.reference)
+        return float(diff.mean()) > self.threshold
+
+
+class PartPresence:
+    """
+    "Was a part in view, and has it gone?" against a learnt empty scene
+    - the empty scene is learnt once the view stays still for `settle`
+      frames at start (start the camera on an empty belt); every empty
+      frame after that refreshes it, so lighting drift is followed
+    - update() returns True when an undecided part has gone; the caller
+      closes it as NO BARCODE / UNDECIDED:
+      - back to the empty scene after at least `min_frames` frames
+      - indexed conveyor: another part comes to rest where an undecided
+        one rested, with no empty belt in between
+      - back-to-back flow (optional): `max_frames` moving frames without
+        a verdict; the belt is never empty, so time is the only signal
+    - decided() after a part verdict: that part leaving is not reported
+    """
+
+    def __init__(self, threshold=12.0, settle=7, min_frames=3, max_frames=None):
+        self.empty = SceneChangeDetector(threshold)
+        self.still = SceneChangeDetector(threshold)
+        self.rest = SceneChangeDetector(threshold)
+        self.settle = settle
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.still_frames = 0
+        self.present_frames = 0
+
+    @property
+    def learning(self):
+        return self.empty.reference is None
+
+    def decided(self):
+        self.present_frames = 0
+        self.rest.clear()
+
+    def _close(self):
+        left = self.present_frames >= self.min_frames
+        self.decided()
+        return left
+
+    def update(self, frame):
+        # A scene "settles" once, on its `settle`-th still frame
+        if self.still.changed(frame):
+            self.still.set_reference(frame)
+            self.still_frames = 0
+        else:
+            self.still_frames += 1
+        settled = self.still_frames == self.settle
+
+        if self.learning:
+            if settled:
+                self.empty.set_reference(frame)
+            return False
+
+        if not self.empty.changed(frame):
+            self.empty.set_reference(frame)
+            return self._close()
+
+        left = False
+        if settled:
+            if self.rest.reference is not None and self.rest.changed(frame):
+                left = self._close()
+            self.rest.set_reference(frame)
+
+        self.present_frames += 1
+        resting = self.rest.reference is not None and not self.rest.changed(frame)
+        if (self.max_frames and not resting
+                and self.present_frames >= self.max_frames):
+            left = self._close() or left
+        return left
+
+
+class PartCounter:
+    """
+    Part ids that stay unique across camera starts: start time + number,
+    e.g. "261019143005-17" (fits the PLC's 20-character part field)
+    """
+
+    def __init__(self):
+        self.session = datetime.now().strftime("%y%m%d%H%M%S")
+        self.n = 0
+
+    def next(self):
+        self.n += 1
+        return f"{self.session}-{self.n}"
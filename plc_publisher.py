@@ -0,0 +1,380 @@
+"""
+Live verdicts pushed to a PLC / MES over one persistent TCP connection
+
+Enabled by a "plc" object in the live recipe JSON:
+
+    "plc": {"host": "192.168.0.10", "port": 5020, "protocol": "frames"}
+    "plc": {"host": "192.168.0.10", "port": 502, "protocol": "modbus",
+            "unit": 1, "base_register": 100}
+
+Try it against the bundled simulator:
+
+    python plc_simulator.py --protocol frames --port 5020
+    python plc_simulator.py --selftest modbus
+
+FRAME LAYOUT ("frames", big-endian)
+- u32 length of what follows
+- header: "VR" | u8 version | u8 type (1 verdict, 2 heartbeat) | u32 seq | u64 unix µs
+- verdict: u8 status | u8 flags (bit 0 duplicate) | u32 inference µs |
+  u16 len + part id | u8 field count | per field: u8 len + key, u16 len + value
+
+REGISTER MAP ("modbus": one Write Multiple Registers, function 0x10, per verdict)
+- base + 0  sequence (u16, wraps); the block is one write, so a new
+  sequence means the rest of it belongs to the new part
+- base + 1  status (STATUS_CODES)        base + 2  flags (bit 0 duplicate)
+- base + 3  inference µs, high word      base + 4  low word
+- base + 5  part id, ASCII, 2 chars per register (part_regs registers)
+- then the first field's value, ASCII (value_regs registers)
+
+A duplicate is never PASS on the wire: a MATCH / OK with the duplicate
+flag goes out as FAIL, and the flag says why.
+"""
+import time
+import queue
+import socket
+import struct
+import threading
+from collections import deque
+
+
+VERSION = 1
+MAGIC = b"VR"
+TYPE_VERDICT = 1
+TYPE_HEARTBEAT = 2
+
+# Verdict statuses of both live modes -> wire code (0 = unknown)
+STATUS_CODES = {
+    "OK": 1, "MATCH": 1,
+    "NOT_OK": 2, "NOT MATCH": 2, "UNDECIDED": 2,
+    "NO BARCODE": 3, "NO_READ": 3,
+}
+STATUS_NAMES = {0: "UNKNOWN", 1: "PASS", 2: "FAIL", 3: "NO_READ"}
+PASS, FAIL = 1, 2
+
+FLAG_DUPLICATE = 1
+
+FRAME_LENGTH = struct.Struct(">I")
+LENGTH = struct.Struct(">H")
+HEADER = struct.Struct(">2sBBIQ")
+VERDICT = struct.Struct(">BBI")
+
+MODBUS_WRITE = 0x10
+MODBUS_READ = 0x03
+MBAP = struct.Struct(">HHHB")
+MAX_WRITE_REGS = 123
+
+_STOP = object()
+
+
+# ==================================================
+# ENCODING
+# ==================================================
+def _clip(text, limit):
+    data = str(text).encode("utf-8")
+    return data[:limit]
+
+
+def status_code(status, flags):
+    # A re-used serial must not pass a PLC that only reads the status
+    code = STATUS_CODES.get(status, 0)
+    return FAIL if code == PASS and flags & FLAG_DUPLICATE else code
+
+
+def encode_frame(seq, ts_us, msg_type=TYPE_HEARTBEAT, verdict=None):
+    body = HEADER.pack(MAGIC, VERSION, msg_type, seq & 0xFFFFFFFF, ts_us)
+    if verdict is not None:
+        part, status, flags, infer_us, fields = verdict
+        part = _clip(part, 0xFFFF)
+        parts = [
+            body,
+            VERDICT.pack(status_code(status, flags), flags, min(infer_us, 0xFFFFFFFF)),
+            LENGTH.pack(len(part)), part,
+            bytes([min(len(fields), 255)])
+        ]
+        for key, value in list(fields.items())[:255]:
+            key, value = _clip(key, 255), _clip(value, 0xFFFF)
+            parts += [bytes([len(key)]), key, LENGTH.pack(len(value)), value]
+        body = b"".join(parts)
+    return FRAME_LENGTH.pack(len(body)) + body
+
+
+def decode_frame(body):
+    """
+    Frame without its length prefix -> dict
+    """
+    magic, version, msg_type, seq, ts_us = HEADER.unpack_from(body)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a v{VERSION} verdict frame")
+    msg = {"type": msg_type, "seq": seq, "ts_us": ts_us}
+    if msg_type != TYPE_VERDICT:
+        return msg
+
+    pos = HEADER.size
+    status, flags, infer_us = VERDICT.unpack_from(body, pos)
+    pos += VERDICT.size
+    (n,) = LENGTH.unpack_from(body, pos)
+    pos += LENGTH.size
+    part = body[pos:pos + n].decode("utf-8", errors="replace")
+    pos += n
+
+    fields = {}
+    count = body[pos]
+    pos += 1
+    for _ in range(count):
+        k = body[pos]
+        key = body[pos + 1:pos + 1 + k].decode("utf-8", errors="replace")
+        pos += 1 + k
+        (v,) = LENGTH.unpack_from(body, pos)
+        pos += LENGTH.size
+        fields[key] = body[pos:pos + v].decode("utf-8", errors="replace")
+        pos += v
+
+    msg.update(
+        part=part, status=STATUS_NAMES.get(status, str(status)),
+        duplicate=bool(flags & FLAG_DUPLICATE), infer_us=infer_us, fields=fields
+    )
+    return msg
+
+
+def ascii_registers(text, count):
+    data = _clip(text, count * 2).ljust(count * 2, b"\0")
+    return list(struct.unpack(f">{count}H", data))
+
+
+def registers_text(regs):
+    return struct.pack(f">{len(regs)}H", *regs).rstrip(b"\0").decode("ascii", errors="replace")
+
+
+def verdict_registers(seq, verdict, part_regs=10, value_regs=16):
+    part, status, flags, infer_us, fields = verdict
+    infer_us = min(infer_us, 0xFFFFFFFF)
+    value = next(iter(fields.values()), "") if fields else ""
+    return (
+        [seq & 0xFFFF, status_code(status, flags), flags, infer_us >> 16, infer_us & 0xFFFF]
+        + ascii_registers(part, part_regs)
+        + ascii_registers(value, value_regs)
+    )
+
+
+def decode_registers(regs, part_regs=10, value_regs=16):
+    return {
+        "seq": regs[0],
+        "status": STATUS_NAMES.get(regs[1], str(regs[1])),
+        "duplicate": bool(regs[2] & FLAG_DUPLICATE),
+        "infer_us": (regs[3] << 16) | regs[4],
+        "part": registers_text(regs[5:5 + part_regs]),
+        "value": registers_text(regs[5 + part_regs:5 + part_regs + value_regs]),
+    }
+
+
+def modbus_request(tid, unit, fn, body):
+    return MBAP.pack(tid & 0xFFFF, 0, len(body) + 2, unit) + bytes([fn]) + body
+
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+# ==================================================
+# PUBLISHER
+# ==================================================
+class ResultPublisher:
+    """
+    Pushes each verdict as soon as it is made
+    - publish() never blocks the inspection thread: it stamps the verdict
+      and hands it to the sender thread, which writes it with TCP_NODELAY
+    - the connection is kept open; "frames" sends a heartbeat when idle,
+      "modbus" reads the sequence register, so a dead link shows up
+      between parts, not on the next reject
+    - after a reconnect, verdicts older than max_age_ms are dropped rather
+      than sent: a gate must not act on a part that has already passed
+    - stats: sent, dropped, reconnects, last_error; latency_us() is the
+      publish() -> written (modbus: acknowledged) time
+    """
+
+    def __init__(self, host, port, protocol="frames", unit=1, base_register=0,
+                 part_regs=10, value_regs=16, max_age_ms=2000, max_queue=1000,
+                 heartbeat_s=1.0, connect_timeout=1.0):
+        if protocol not in ("frames", "modbus"):
+            raise ValueError(f"unknown PLC protocol '{protocol}'")
+        if protocol == "modbus" and 5 + part_regs + value_regs > MAX_WRITE_REGS:
+            raise ValueError("part_regs + value_regs too large for one register write")
+
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.unit = unit
+        self.base_register = base_register
+        self.part_regs = part_regs
+        self.value_regs = value_regs
+        self.max_age = max_age_ms / 1000.0
+        self.heartbeat_s = heartbeat_s
+        self.connect_timeout = connect_timeout
+
+        self.q = queue.Queue(maxsize=max_queue)
+        self.sock = None
+        self.seq = 0
+        self.tid = 0
+        self.stats = {"sent": 0, "dropped": 0, "reconnects": 0, "last_error": None}
+        self.latencies = deque(maxlen=4096)
+        self.running = True
+        self.thread = threading.Thread(target=self._sender, name="plc-publisher", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, cfg):
+        """
+        The recipe's "plc" object -> publisher; None when it has none
+        """
+        if not cfg or not cfg.get("host"):
+            return None
+        args = {k: v for k, v in cfg.items() if k != "host" and k != "port"}
+        return cls(cfg["host"], int(cfg.get("port", 5020)), **args)
+
+    def describe(self):
+        return f"{self.protocol}://{self.host}:{self.port}"
+
+    # ---------------- CALLER SIDE ----------------
+    def publish(self, part, status, fields=None, infer_ms=None, duplicate=False):
+        verdict = (
+            part, status, FLAG_DUPLICATE if duplicate else 0,
+            int((infer_ms or 0) * 1000), dict(fields or {})
+        )
+        try:
+            self.q.put_nowait((time.perf_counter(), time.time_ns() // 1000, verdict))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def latency_us(self):
+        values = sorted(self.latencies)
+        if not values:
+            return {}
+        n = len(values)
+        return {f"p{p}": values[min(n - 1, n * p // 100)] for p in (50, 99)}
+
+    def summary(self):
+        s = self.stats
+        lat = self.latency_us()
+        text = f"{self.describe()}: {s['sent']} sent, {s['dropped']} dropped, {s['reconnects']} reconnects"
+        if lat:
+            text += f", publish→wire p50 {lat['p50']} µs / p99 {lat['p99']} µs"
+        return text
+
+    def close(self, timeout=2.0):
+        # Sends what is queued (up to timeout), then closes the connection
+        self.running = False
+        try:
+            self.q.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    # ---------------- SENDER THREAD ----------------
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.connect_timeout)
+        self.sock = sock
+
+    def _disconnect(self, error):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.stats["last_error"] = str(error)
+
+    def _send(self, ts_us, verdict):
+        if self.protocol == "frames":
+            msg_type = TYPE_HEARTBEAT if verdict is None else TYPE_VERDICT
+            self.sock.sendall(encode_frame(self.seq, ts_us, msg_type, verdict))
+            return
+
+        self.tid += 1
+        if verdict is None:
+            body = struct.pack(">HH", self.base_register, 1)
+            fn = MODBUS_READ
+        else:
+            regs = verdict_registers(self.seq, verdict, self.part_regs, self.value_regs)
+            body = struct.pack(f">HHB{len(regs)}H", self.base_register, len(regs),
+                               len(regs) * 2, *regs)
+            fn = MODBUS_WRITE
+        self.sock.sendall(modbus_request(self.tid, self.unit, fn, body))
+
+        # The write is acknowledged before the next one goes out
+        head = recv_exact(self.sock, MBAP.size + 1)
+        _, _, length, _ = MBAP.unpack(head[:MBAP.size])
+        rest = recv_exact(self.sock, length - 2)
+        if head[-1] & 0x80:
+            raise ConnectionError(f"Modbus exception {rest[0] if rest else '?'}")
+
+    def _sender(self):
+        backoff = 0.1
+        item = None
+        while True:
+            if self.sock is None:
+                try:
+                    self._connect()
+                    backoff = 0.1
+                except OSError as e:
+                    self.stats["last_error"] = str(e)
+                    if not self.running:
+                        return
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 2.0)
+                    continue
+
+            if item is None:
+                try:
+                    item = self.q.get(timeout=self.heartbeat_s)
+                except queue.Empty:
+                    try:
+                        self._send(time.time_ns() // 1000, None)
+                    except OSError as e:
+                        self._disconnect(e)
+                        self.stats["reconnects"] += 1
+                    continue
+            if item is _STOP:
+                self._disconnect("closed")
+                return
+
+            queued, ts_us, verdict = item
+            if time.perf_counter() - queued > self.max_age:
+                self.stats["dropped"] += 1
+                item = None
+                continue
+
+            self.seq += 1
+            try:
+                self._send(ts_us, verdict)
+            except OSError as e:
+                # Kept in hand; resent after reconnecting if still fresh
+                self._disconnect(e)
+                self.stats["reconnects"] += 1
+                continue
+            self.latencies.append(int((time.perf_counter() - queued) * 1e6))
+            self.stats["sent"] += 1
+            item = None
+
+
+def publisher_from_config(cfg, log=None):
+    """
+    ResultPublisher for a live recipe, or None; a bad "plc" object is
+    reported through log instead of stopping the camera
+    """
+    try:
+        publisher = ResultPublisher.from_config(cfg.get("plc"))
+    except (TypeError, ValueError) as e:
+        if log:
+            log(f"PLC publisher not started: {e}")
+        return None
+    if publisher is not None and log:
+        log(f"Publishing verdicts to {publisher.describe()}")
+    return publisher
@@ -0,0 +1,218 @@
+"""
+Local PLC / MES endpoint for testing plc_publisher.py
+
+    python plc_simulator.py --protocol frames --port 5020
+    python plc_simulator.py --protocol modbus --port 5020 --base-register 100
+    python plc_simulator.py --selftest frames -n 5000
+
+- frames: decodes verdict frames and prints one line per part
+- modbus: holding-register bank answering Write Multiple Registers (0x10)
+  and Read Holding Registers (0x03); a write of the verdict block prints it
+- wire latency is verdict time -> received (same host clock, so only
+  meaningful on one machine); --selftest runs a publisher against the
+  simulator and prints its percentiles
+"""
+import sys
+import time
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+from array import array
+
+from plc_publisher import (
+    FRAME_LENGTH, MBAP, MODBUS_READ, MODBUS_WRITE, TYPE_VERDICT,
+    ResultPublisher, decode_frame, decode_registers, recv_exact
+)
+
+
+class Receiver:
+    """
+    What the simulator got: decoded messages and their wire latency
+    """
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.verdicts = 0
+        self.heartbeats = 0
+        self.last = None
+
+    def verdict(self, msg, ts_us):
+        latency = time.time_ns() // 1000 - ts_us if ts_us else None
+        with self.lock:
+            self.verdicts += 1
+            self.last = msg
+            if latency is not None:
+                self.latencies.append(latency)
+        if not self.quiet:
+            fields = " ".join(f"{k}={v}" for k, v in msg.get("fields", {}).items())
+            value = msg.get("value")
+            print(
+                f"#{msg['seq']} {msg['part']} {msg['status']}"
+                f"{' DUPLICATE' if msg['duplicate'] else ''}"
+                f" infer={msg['infer_us'] / 1000:.1f} ms"
+                f"{f' value={value}' if value else ''} {fields}"
+                f"{f' (+{latency} µs)' if latency is not None else ''}",
+                flush=True
+            )
+
+    def report(self):
+        with self.lock:
+            values = sorted(self.latencies)
+        if not values:
+            return f"{self.verdicts} verdicts"
+        n = len(values)
+        pct = {p: values[min(n - 1, n * p // 100)] for p in (50, 99)}
+        return (
+            f"{self.verdicts} verdicts, {self.heartbeats} heartbeats | wire latency "
+            f"p50 {pct[50]} µs, p99 {pct[99]} µs, max {values[-1]} µs"
+        )
+
+
+# ==================================================
+# PROTOCOL HANDLERS
+# ==================================================
+class FrameHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock, receiver = self.request, self.server.receiver
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                (n,) = FRAME_LENGTH.unpack(recv_exact(sock, FRAME_LENGTH.size))
+                msg = decode_frame(recv_exact(sock, n))
+                if msg["type"] == TYPE_VERDICT:
+                    receiver.verdict(msg, msg["ts_us"])
+                else:
+                    receiver.heartbeats += 1
+        except (ConnectionError, OSError, ValueError, struct.error):
+            return
+
+
+class ModbusHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock, server = self.request, self.server
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                tid, proto, length, unit = MBAP.unpack(recv_exact(sock, MBAP.size))
+                pdu = recv_exact(sock, length - 1)
+                reply = server.modbus(pdu)
+                sock.sendall(MBAP.pack(tid, proto, len(reply) + 1, unit) + reply)
+        except (ConnectionError, OSError, struct.error):
+            return
+
+
+class Simulator(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, protocol="frames", base_register=0, part_regs=10,
+                 value_regs=16, quiet=False):
+        handler = FrameHandler if protocol == "frames" else ModbusHandler
+        super().__init__(address, handler)
+        self.receiver = Receiver(quiet)
+        self.registers = array("H", [0] * 65536)
+        self.reg_lock = threading.Lock()
+        self.base_register = base_register
+        self.part_regs = part_regs
+        self.value_regs = value_regs
+
+    def modbus(self, pdu):
+        fn = pdu[0]
+        if fn == MODBUS_READ:
+            start, count = struct.unpack_from(">HH", pdu, 1)
+            if not 1 <= count <= 125 or start + count > len(self.registers):
+                return bytes([fn | 0x80, 2])
+            with self.reg_lock:
+                regs = self.registers[start:start + count]
+            return bytes([fn, count * 2]) + struct.pack(f">{count}H", *regs)
+
+        if fn == MODBUS_WRITE:
+            start, count, nbytes = struct.unpack_from(">HHB", pdu, 1)
+            if nbytes != count * 2 or start + count > len(self.registers):
+                return bytes([fn | 0x80, 3])
+            regs = struct.unpack_from(f">{count}H", pdu, 6)
+            with self.reg_lock:
+                self.registers[start:start + count] = array("H", regs)
+            if start == self.base_register and count >= 5 + self.part_regs + self.value_regs:
+                # Registers carry no verdict time; latency is measured on arrival
+                self.receiver.verdict(
+                    decode_registers(list(regs), self.part_regs, self.value_regs), None
+                )
+            return bytes([fn]) + struct.pack(">HH", start, count)
+
+        return bytes([fn | 0x80, 1])
+
+
+# ==================================================
+# SELF TEST
+# ==================================================
+def selftest(protocol, count, base_register=0):
+    """
+    Publisher -> simulator on localhost; prints both sides' latency
+    """
+    server = Simulator(("127.0.0.1", 0), protocol, base_register, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    publisher = ResultPublisher(
+        "127.0.0.1", port, protocol=protocol, base_register=base_register
+    )
+    # Spaced like parts on a line, not a burst into the queue
+    for i in range(count):
+        publisher.publish(
+            f"part {i + 1}", "OK" if i % 10 else "NOT_OK",
+            {"serial": f"SN{i:08d}"}, infer_ms=12.5, duplicate=(i % 97 == 0)
+        )
+        time.sleep(0.001)
+
+    deadline = time.monotonic() + 5
+    while server.receiver.verdicts < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.close()
+    server.shutdown()
+
+    print(f"publisher: {publisher.summary()}")
+    print(f"simulator: {server.receiver.report()}")
+    return 0 if server.receiver.verdicts == count else 1
+
+
+# ================= ENTRY POINT =================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="PLC / MES simulator for plc_publisher.py")
+    ap.add_argument("--protocol", choices=["frames", "modbus"], default="frames")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5020)
+    ap.add_argument("--base-register", type=int, default=0)
+    ap.add_argument("--part-regs", type=int, default=10)
+    ap.add_argument("--value-regs", type=int, default=16)
+    ap.add_argument("--quiet", action="store_true", help="no line per verdict")
+    ap.add_argument("--selftest", choices=["frames", "modbus"],
+                    help="run a local publisher against the simulator and exit")
+    ap.add_argument("-n", type=int, default=2000, help="--selftest verdicts")
+    args = ap.parse_args(argv)
+
+    if args.selftest:
+        return selftest(args.selftest, args.n, args.base_register)
+
+    server = Simulator(
+        (args.host, args.port), args.protocol, args.base_register,
+        args.part_regs, args.value_regs, args.quiet
+    )
+    print(f"🏭 {args.protocol} simulator on {args.host}:{args.port} (Ctrl+C to stop)",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.receiver.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import cv2
+
+
+# ================= PREVIEW PIPELINE =================
+class PreviewPipeline:
+    """
+    Stage-memoized preprocessing for the interactive preview
+    - tone -> clahe -> rotate, each stage output cached with the params that produced it
+    - a slider change recomputes only from the changed stage onward
+    - "proxy" renders on a copy downscaled to the preview label, "full" on the source
+    """
+
+    STAGES = ("tone", "clahe", "rotate")
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.source = None
+        self.proxy_size = None
+        self.levels = {}
+
+    def set_engine(self, engine):
+        self.engine = engine
+        self.levels = {}
+
+    def set_source(self, img):
+        self.source = img
+        self.proxy_size = None
+        self.levels = {}
+
+    def clear(self):
+        self.set_source(None)
+
+    # ---------------- LEVELS ----------------
+    def _level(self, name, max_size):
+        if name == "full":
+            if "full" not in self.levels:
+                self.levels["full"] = {"base": self.source, "stages": {}}
+            return self.levels["full"]
+
+        if self.proxy_size != max_size or "proxy" not in self.levels:
+            self.proxy_size = max_size
+            self.levels["proxy"] = {
+                "base": self._downscale(self.source, max_size),
+                "stages": {}
+            }
+        return self.levels["proxy"]
+
+    @staticmethod
+    def _downscale(img, max_size):
+        h, w = img.shape[:2]
+        max_w, max_h = max_size
+        scale = min(max_w / w, max_h / h, 1.0)
+        if scale >= 1.0:
+            return img
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    # ---------------- STAGES ----------------
+    def _stage_params(self, recipe):
+        return {
+            "tone": (recipe["brightness"], recipe["contrast"], recipe["gamma"]),
+            "clahe": (recipe["use_clahe"],),
+            "rotate": (recipe["fine_rotate"],)
+        }
+
+    def _run_stage(self, name, img, params):
+        if name == "tone":
+            return self.engine.apply_tone(img, *params)
+        if name == "clahe":
+            return self.engine.apply_clahe(img, *params)
+        return self.engine.apply_rotate(img, *params)
+
+    def render(self, recipe, proxy=None):
+        """
+        Preprocessed image for the recipe
+        - proxy=(w, h) renders on the downscaled copy, None renders full resolution
+        - returned arrays are shared with the cache; copy before drawing on them
+        """
+        if self.source is None:
+            return None
+
+        level = self._level("proxy" if proxy else "full", proxy)
+        if not recipe["enable_preprocessing"]:
+            return level["base"]
+
+        params = self._stage_params(recipe)
+        stages = level["stages"]
+
+        img = level["base"]
+        key = ()
+        for name in self.STAGES:
+            # Key is cumulative, so a change upstream invalidates everything after it
+            key = key + params[name]
+            cached = stages.get(name)
+            if cached is not None and cached[0] == key:
+                img = cached[1]
+                continue
+            img = self._run_stage(name, img, params[name])
+            stages[name] = (key, img)
+        return img
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import cv2
+from PyQt5.QtCore import Qt, QThread, QCoreApplication, pyqtSignal
+from PyQt5.QtGui import QImage
+
+
+def to_qimage(img, width, height):
+    """
+    BGR / gray ndarray -> QImage scaled to fit (width, height)
+    - QImage (unlike QPixmap) is safe to build off the GUI thread
+    """
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    h, w, _ = rgb.shape
+    qimg = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+    # scaled() returns an image that owns its pixels, so rgb may be freed
+    return qimg.scaled(
+        max(1, width), max(1, height), Qt.KeepAspectRatio, Qt.SmoothTransformation
+    )
+
+
+# ================= PREVIEW THREAD =================
+class PreviewWorker(QThread):
+    """
+    Latest-wins preview renderer
+    - submit() replaces any pending job; only the newest one is rendered
+    - every submit/invalidate bumps the generation; stale results are dropped
+    - rendered(gen, qimage, img, tag): img is the unscaled render
+    """
+    rendered = pyqtSignal(int, object, object, object)
+    failed = pyqtSignal(str)
+
+    # Quiet time after a request before rendering, to coalesce slider bursts
+    DEBOUNCE = 0.015
+
+    def __init__(self):
+        super().__init__()
+        self.generation = 0
+        self.pending = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = True
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def submit(self, job, size, tag=None):
+        """
+        job() -> ndarray, run on the worker thread
+        - must not touch widgets; read their values before submitting
+        """
+        with self.lock:
+            self.generation += 1
+            self.pending = (self.generation, job, size, tag)
+            gen = self.generation
+        if not self.isRunning():
+            self.start()
+        self.wake.set()
+        return gen
+
+    def invalidate(self):
+        # Something else took over the preview label; drop in-flight results
+        with self.lock:
+            self.generation += 1
+            self.pending = None
+
+    def is_current(self, gen):
+        return gen == self.generation
+
+    def run(self):
+        while self.running:
+            if not self.wake.wait(0.5):
+                continue
+            time.sleep(self.DEBOUNCE)
+
+            with self.lock:
+                self.wake.clear()
+                job, self.pending = self.pending, None
+            if job is None:
+                continue
+
+            gen, fn, size, tag = job
+            try:
+                img = fn()
+                if img is None or not self.is_current(gen):
+                    continue
+                qimg = to_qimage(img, *size)
+            except Exception as e:
+                self.failed.emit(f"Preview failed: {e}")
+                continue
+
+            self.rendered.emit(gen, qimg, img, tag)
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        self.wait()
@@ -0,0 +1,122 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+
+DEFAULT_PATH = os.path.join("cache", "results.db")
+
+# Recipe keys that only affect validation, never the engine output
+VALIDATION_KEYS = (
+    "expected_value", "expected_index_path", "regex",
+    "expected_char_count", "lot", "seen_store",
+)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def data_digest(data):
+    # file_digest of bytes already in memory
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def config_digest(recipe):
+    """
+    Hash of the settings that change engine output
+    - validation-only keys are ignored, so a regex change still hits
+    """
+    relevant = {k: v for k, v in recipe.items() if k not in VALIDATION_KEYS}
+    blob = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def cache_key(content_digest, cfg_digest, engine_id):
+    return f"{engine_id}:{cfg_digest}:{content_digest}"
+
+
+class ResultCache:
+    """
+    Persistent engine-output cache
+    - key: (image content hash, preprocessing config hash, engine id)
+    - value: JSON payload (raw barcode strings, OCR texts, ...)
+    - hit / miss counters for the batch log
+    """
+
+    def __init__(self, path=DEFAULT_PATH, commit_every=200):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT payload FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, payload):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results (key, payload, created) VALUES (?, ?, ?)",
+                (key, json.dumps(payload), datetime.now().isoformat(timespec="seconds"))
+            )
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_every:
+                self.db.commit()
+                self.uncommitted = 0
+
+    def flush(self):
+        with self.lock:
+            self.db.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(path=DEFAULT_PATH):
+    path = os.path.abspath(path)
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = ResultCache(path)
+        return _shared[path]
@@ -0,0 +1,314 @@
+"""
+Inspection results in one SQLite database
+
+    python results_store.py query --status NOT_OK --lot J12B1 --since 7d
+    python results_store.py query --value 8901234567890 --csv hits.csv
+    python results_store.py count --mode barcode_live --since 2026-10-01
+
+Every mode records here (mode column): ocr_batch, ocr_cli, ocr_live,
+barcode_batch, barcode_cli, barcode_live, and ocr_api / barcode_api
+(inference_server.py). The CSV / JSON exports stay as
+they are; this is the one place to query across runs.
+"""
+import os
+import re
+import csv
+import sys
+import json
+import queue
+import atexit
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+
+DEFAULT_PATH = os.path.join("results", "results.db")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS results ("
+    " id INTEGER PRIMARY KEY,"
+    " ts TEXT NOT NULL,"
+    " mode TEXT NOT NULL,"
+    " source TEXT NOT NULL,"
+    " status TEXT NOT NULL,"
+    " lot TEXT NOT NULL DEFAULT '',"
+    " recipe TEXT NOT NULL DEFAULT '',"
+    " engine TEXT NOT NULL DEFAULT '',"
+    " duplicate INTEGER NOT NULL DEFAULT 0,"
+    " payload TEXT"
+    ")",
+    # Extracted values (regex matches, barcode values), one row each
+    "CREATE TABLE IF NOT EXISTS result_values ("
+    " result_id INTEGER NOT NULL,"
+    " value TEXT NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_results_ts ON results (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_results_status_ts ON results (status, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_results_lot_ts ON results (lot, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_results_recipe_ts ON results (recipe, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_values_value ON result_values (value)",
+    "CREATE INDEX IF NOT EXISTS idx_values_result ON result_values (result_id)",
+]
+
+COLUMNS = ["id", "ts", "mode", "source", "status", "lot", "recipe", "engine", "duplicate"]
+
+_STOP = object()
+
+
+def now_ts():
+    # Sortable local time; the ts index serves range queries on it
+    return datetime.now().isoformat(sep=" ", timespec="milliseconds")
+
+
+def parse_time(text):
+    """
+    "7d" / "12h" / "30m" ago, or an ISO date / datetime
+    """
+    m = re.fullmatch(r"(\d+)\s*([dhm])", text.strip())
+    if m:
+        n, unit = int(m.group(1)), m.group(2)
+        delta = {"d": timedelta(days=n), "h": timedelta(hours=n), "m": timedelta(minutes=n)}
+        return (datetime.now() - delta[unit]).isoformat(sep=" ", timespec="milliseconds")
+    return datetime.fromisoformat(text.strip()).isoformat(sep=" ", timespec="milliseconds")
+
+
+class ResultsStore:
+    """
+    Append-mostly results table (SQLite, WAL)
+    - add() only queues the row and never blocks; a writer thread inserts
+      whatever is queued in one transaction per chunk
+    - rows that don't fit a full queue are counted in `dropped`, not waited on
+    - indexed by time, status, lot, recipe and extracted value
+    - query() / count() use their own connection; WAL lets them run
+      while the writer inserts
+    """
+
+    def __init__(self, path=DEFAULT_PATH, chunk=2000, max_queue=100_000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.chunk = chunk
+        self.dropped = 0
+        self.written = 0
+
+        db = self._connect()
+        for stmt in SCHEMA:
+            db.execute(stmt)
+        db.commit()
+        db.close()
+
+        self.q = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ---------------- WRITE ----------------
+    def add(self, mode, source, status, values=(), lot="", recipe="", engine="",
+            duplicate=False, payload=None):
+        row = (
+            now_ts(), mode, source, status, lot or "", recipe or "", engine or "",
+            int(bool(duplicate)),
+            None if payload is None else json.dumps(payload, ensure_ascii=False, default=str),
+            [str(v) for v in values or ()]
+        )
+        try:
+            self.q.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        db = self._connect()
+        stopping = False
+        while not stopping:
+            rows = [self.q.get()]
+            while len(rows) < self.chunk:
+                try:
+                    rows.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            if rows[-1] is _STOP:
+                stopping = True
+
+            batch = [r for r in rows if r is not _STOP]
+            try:
+                with db:
+                    for *fields, values in batch:
+                        cur = db.execute(
+                            "INSERT INTO results (ts, mode, source, status, lot, recipe,"
+                            " engine, duplicate, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            fields
+                        )
+                        if values:
+                            db.executemany(
+                                "INSERT INTO result_values (result_id, value) VALUES (?, ?)",
+                                [(cur.lastrowid, v) for v in values]
+                            )
+                self.written += len(batch)
+            except sqlite3.Error as e:
+                print(f"[results] {len(batch)} rows not written: {e}", file=sys.stderr)
+            finally:
+                for _ in rows:
+                    self.q.task_done()
+        db.close()
+
+    def flush(self):
+        # Wait until everything queued so far is committed
+        if self._thread.is_alive():
+            self.q.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self.q.put(_STOP)
+            self._thread.join()
+
+    # ---------------- QUERY ----------------
+    def _where(self, status=None, lot=None, recipe=None, mode=None, value=None,
+               source=None, since=None, until=None):
+        where, args = [], []
+        for col, val in (("status", status), ("lot", lot), ("recipe", recipe), ("mode", mode)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        if source is not None:
+            where.append("source LIKE ?")
+            args.append(source)
+        if value is not None:
+            where.append("id IN (SELECT result_id FROM result_values WHERE value = ?)")
+            args.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(where)) if where else "", args
+
+    def query(self, limit=1000, oldest_first=False, **filters):
+        """
+        Rows matching the filters, newest first
+        - filters: status, lot, recipe, mode, value (exact extracted value),
+          source (SQL LIKE pattern), since / until (parse_time strings)
+        - each row: the COLUMNS, "values" and the decoded "payload"
+        """
+        where, args = self._where(**filters)
+        order = "ASC" if oldest_first else "DESC"
+        db = self._connect()
+        try:
+            rows = db.execute(
+                f"SELECT {', '.join(COLUMNS)}, payload FROM results{where}"
+                f" ORDER BY ts {order}, id {order} LIMIT ?",
+                args + [limit]
+            ).fetchall()
+
+            values = {}
+            ids = [r[0] for r in rows]
+            for i in range(0, len(ids), 500):
+                part = ids[i:i + 500]
+                for rid, v in db.execute(
+                    "SELECT result_id, value FROM result_values WHERE result_id IN"
+                    f" ({', '.join('?' * len(part))})",
+                    part
+                ):
+                    values.setdefault(rid, []).append(v)
+        finally:
+            db.close()
+
+        out = []
+        for r in rows:
+            row = dict(zip(COLUMNS, r))
+            row["duplicate"] = bool(row["duplicate"])
+            row["values"] = values.get(row["id"], [])
+            row["payload"] = json.loads(r[-1]) if r[-1] else None
+            out.append(row)
+        return out
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        db = self._connect()
+        try:
+            return db.execute(f"SELECT COUNT(*) FROM results{where}", args).fetchone()[0]
+        finally:
+            db.close()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_results(path=DEFAULT_PATH):
+    path = os.path.abspath(path)
+    with _shared_lock:
+        if path not in _shared:
+            store = ResultsStore(path)
+            # Rows still queued at exit are written, not lost
+            atexit.register(store.close)
+            _shared[path] = store
+        return _shared[path]
+
+
+# ================= ENTRY POINT =================
+def build_parser():
+    p = argparse.ArgumentParser(description="Query the inspection results store")
+    p.add_argument("command", choices=["query", "count"])
+    p.add_argument("--db", default=DEFAULT_PATH)
+    p.add_argument("--status",
+                   help="OK, NOT_OK, MATCH, 'NOT MATCH', 'NO BARCODE', UNDECIDED")
+    p.add_argument("--lot")
+    p.add_argument("--recipe", help="recipe digest, or the recipe JSON file")
+    p.add_argument("--mode", help="ocr_batch, ocr_cli, ocr_live, barcode_batch, ...")
+    p.add_argument("--value", help="exact extracted value / barcode")
+    p.add_argument("--source", help="file name pattern, SQL LIKE (e.g. 'IMG_%%')")
+    p.add_argument("--since", help="7d, 12h, 30m or an ISO date")
+    p.add_argument("--until", help="7d, 12h, 30m or an ISO date")
+    p.add_argument("--limit", type=int, default=1000)
+    p.add_argument("--csv", help="write rows to this CSV instead of stdout")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"No results database at {args.db}", file=sys.stderr)
+        return 1
+
+    recipe = args.recipe
+    if recipe and os.path.isfile(recipe):
+        from result_cache import config_digest
+        with open(recipe, "r", encoding="utf-8") as f:
+            recipe = config_digest(json.load(f))
+
+    filters = {
+        "status": args.status, "lot": args.lot, "recipe": recipe, "mode": args.mode,
+        "value": args.value, "source": args.source,
+        "since": args.since and parse_time(args.since),
+        "until": args.until and parse_time(args.until)
+    }
+    store = ResultsStore(args.db)
+
+    if args.command == "count":
+        print(store.count(**filters))
+        return 0
+
+    rows = store.query(limit=args.limit, **filters)
+    fields = COLUMNS + ["values"]
+    out = open(args.csv, "w", newline="", encoding="utf-8") if args.csv else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "values": ";".join(row["values"])})
+    finally:
+        if args.csv:
+            out.close()
+    if args.csv:
+        print(f"{len(rows)} rows → {args.csv}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
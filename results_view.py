@@ -0,0 +1,514 @@
+"""
+Batch results table
+
+- ResultsModel keeps one compact row per image (path, name, status, detail);
+  rows arrive in bursts and are inserted on a timer, not one by one
+- the view only asks for the rows on screen, so 100k+ rows scroll freely
+- thumbnails and annotated overlays are rendered on a background thread
+  when first shown and kept in byte-bounded LRU pixmap caches; memory
+  doesn't grow with the batch
+- status filter with per-status counts
+"""
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+
+from PyQt5.QtCore import (
+    Qt, QSize, QThread, QTimer, QAbstractTableModel, QModelIndex, QCoreApplication,
+    pyqtSignal
+)
+from PyQt5.QtGui import QPixmap, QColor
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView,
+    QAbstractItemView, QHeaderView
+)
+
+from image_decode import ImageDecoder
+from preview_worker import to_qimage
+
+
+THUMB_SIZE = 72
+
+# Status cell colors; anything else stays uncolored
+STATUS_COLORS = {
+    "OK": "#dcfce7",
+    "MATCH": "#dcfce7",
+    "NOT_OK": "#fee2e2",
+    "NOT MATCH": "#ffedd5",
+    "NO BARCODE": "#fee2e2",
+    "UNDECIDED": "#ffedd5",
+}
+
+# Longest detail text kept per row
+DETAIL_CHARS = 160
+
+
+# ==================================================
+# PIXMAP CACHE
+# ==================================================
+class PixmapCache:
+    """
+    LRU of QPixmaps bounded by their pixel bytes
+    - GUI thread only (QPixmap)
+    """
+
+    def __init__(self, max_mb):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bytes = 0
+        self.items = OrderedDict()
+
+    @staticmethod
+    def cost(pix):
+        return pix.width() * pix.height() * max(pix.depth(), 8) // 8
+
+    def get(self, key):
+        pix = self.items.get(key)
+        if pix is not None:
+            self.items.move_to_end(key)
+        return pix
+
+    def put(self, key, pix):
+        old = self.items.pop(key, None)
+        if old is not None:
+            self.bytes -= self.cost(old)
+        self.items[key] = pix
+        self.bytes += self.cost(pix)
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            _, evicted = self.items.popitem(last=False)
+            self.bytes -= self.cost(evicted)
+
+    def clear(self):
+        self.items.clear()
+        self.bytes = 0
+
+
+# ==================================================
+# RENDER THREAD
+# ==================================================
+class ImageJobs(QThread):
+    """
+    Newest-first background renderer
+    - request(key, job, size): job() -> ndarray runs on this thread and is
+      scaled to fit size; a key already queued moves to the front
+    - the queue is bounded: rows scrolled past long ago are dropped, and
+      asked for again if they come back on screen
+    - done(key, qimage); failed(key, message)
+    """
+    done = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+    MAX_PENDING = 256
+
+    def __init__(self):
+        super().__init__()
+        self.pending = OrderedDict()
+        self.busy = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = True
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def request(self, key, job, size):
+        with self.lock:
+            if key == self.busy:
+                return
+            self.pending.pop(key, None)
+            self.pending[key] = (job, size)
+            while len(self.pending) > self.MAX_PENDING:
+                self.pending.popitem(last=False)
+        if not self.isRunning():
+            self.start()
+        self.wake.set()
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+
+    def run(self):
+        while self.running:
+            with self.lock:
+                if self.pending:
+                    key, (job, size) = self.pending.popitem(last=True)
+                    self.busy = key
+                else:
+                    key = None
+                    self.wake.clear()
+            if key is None:
+                self.wake.wait(0.5)
+                continue
+
+            try:
+                img = job()
+                if img is None:
+                    self.failed.emit(key, "could not be read")
+                else:
+                    self.done.emit(key, to_qimage(img, *size))
+            except Exception as e:
+                self.failed.emit(key, str(e))
+            finally:
+                with self.lock:
+                    self.busy = None
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        self.wait()
+
+
+# ==================================================
+# MODEL
+# ==================================================
+class ResultsModel(QAbstractTableModel):
+    """
+    Batch rows for a QTableView
+    - add() buffers; the buffer is inserted every FLUSH_MS as one block
+    - set_filter(status) keeps an index of matching rows (array of ints)
+      instead of a proxy model
+    - row numbers outside the model are source rows, in arrival order
+    """
+    HEADERS = ["", "#", "File", "Status", "Detail"]
+    THUMB, NUMBER, FILE, STATUS, DETAIL = range(5)
+
+    FLUSH_MS = 150
+
+    counts_changed = pyqtSignal()
+
+    def __init__(self, jobs, thumb_cache_mb=48, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.buffer = []
+        self.counts = Counter()
+        self.status_filter = None
+        self.visible = None     # source rows shown when filtered
+
+        self.jobs = jobs
+        self.thumbs = PixmapCache(thumb_cache_mb)
+        self.failed = set()
+        # Thumbnails only need a few pixels; JPEGs decode at 1/8
+        self.decoder = ImageDecoder(THUMB_SIZE * 2)
+        jobs.done.connect(self.on_rendered)
+        jobs.failed.connect(self.on_failed)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.FLUSH_MS)
+        self.timer.timeout.connect(self.flush)
+
+    # ---------------- ROWS ----------------
+    def add(self, path, file_name, status, detail=""):
+        self.buffer.append(
+            (path, file_name, sys.intern(str(status)), str(detail)[:DETAIL_CHARS])
+        )
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        start = len(self.rows)
+
+        if self.visible is None:
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+        else:
+            shown = [start + i for i, r in enumerate(rows) if r[2] == self.status_filter]
+            self.rows.extend(rows)
+            if shown:
+                first = len(self.visible)
+                self.beginInsertRows(QModelIndex(), first, first + len(shown) - 1)
+                self.visible.extend(shown)
+                self.endInsertRows()
+
+        self.counts.update(r[2] for r in rows)
+        self.counts_changed.emit()
+
+    def replace(self, rows):
+        # Re-scored batch: same images (thumbnails stay cached), new verdicts
+        self.buffer = []
+        self.beginResetModel()
+        self.rows = [
+            (path, name, sys.intern(str(status)), str(detail)[:DETAIL_CHARS])
+            for path, name, status, detail in rows
+        ]
+        self.counts = Counter(r[2] for r in self.rows)
+        self._refilter()
+        self.endResetModel()
+        self.counts_changed.emit()
+
+    def clear(self):
+        self.timer.stop()
+        self.buffer = []
+        self.beginResetModel()
+        self.rows = []
+        self.counts = Counter()
+        self.visible = None if self.status_filter is None else array("l")
+        self.endResetModel()
+        self.thumbs.clear()
+        self.failed.clear()
+        self.jobs.clear()
+        self.counts_changed.emit()
+
+    def set_filter(self, status):
+        self.flush()
+        self.beginResetModel()
+        self.status_filter = status
+        self._refilter()
+        self.endResetModel()
+
+    def _refilter(self):
+        if self.status_filter is None:
+            self.visible = None
+        else:
+            self.visible = array(
+                "l", (i for i, r in enumerate(self.rows) if r[2] == self.status_filter)
+            )
+
+    def source_row(self, row):
+        return row if self.visible is None else self.visible[row]
+
+    def view_row(self, source):
+        # -1 when the row is filtered out
+        if self.visible is None:
+            return source if source < len(self.rows) else -1
+        i = bisect_left(self.visible, source)
+        return i if i < len(self.visible) and self.visible[i] == source else -1
+
+    def path(self, source):
+        return self.rows[source][0]
+
+    # ---------------- QT MODEL ----------------
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows) if self.visible is None else len(self.visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        source = self.source_row(index.row())
+        path, name, status, detail = self.rows[source]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col == self.NUMBER:
+                return source + 1
+            if col == self.FILE:
+                return name
+            if col == self.STATUS:
+                return status
+            if col == self.DETAIL:
+                return detail
+        elif role == Qt.DecorationRole and col == self.THUMB:
+            return self.thumbnail(source, path)
+        elif role == Qt.BackgroundRole and col == self.STATUS:
+            color = STATUS_COLORS.get(status)
+            return QColor(color) if color else None
+        elif role == Qt.ToolTipRole:
+            return detail if col == self.DETAIL else path
+        elif role == Qt.TextAlignmentRole and col == self.NUMBER:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    # ---------------- THUMBNAILS ----------------
+    def thumbnail(self, source, path):
+        pix = self.thumbs.get(path)
+        if pix is None and path not in self.failed:
+            decoder = self.decoder
+            self.jobs.request(
+                ("thumb", source, path), lambda: decoder.read(path), (THUMB_SIZE, THUMB_SIZE)
+            )
+        return pix
+
+    def on_rendered(self, key, qimg):
+        if key[0] != "thumb":
+            return
+        _, source, path = key
+        self.thumbs.put(path, QPixmap.fromImage(qimg))
+        self._thumb_changed(source, path)
+
+    def on_failed(self, key, message):
+        if key[0] == "thumb":
+            # Not asked for again on every repaint
+            self.failed.add(key[2])
+
+    def _thumb_changed(self, source, path):
+        if source >= len(self.rows) or self.rows[source][0] != path:
+            return
+        row = self.view_row(source)
+        if row >= 0:
+            index = self.index(row, self.THUMB)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+# ==================================================
+# WIDGET
+# ==================================================
+class ResultsView(QWidget):
+    """
+    Status filter + results table
+    - add() / replace() / clear() as ResultsModel
+    - row_selected(source_row) when the user picks a row
+    - show_overlay(key, job, size): annotated image for the selected row,
+      rendered off the GUI thread and cached; overlay_ready(pixmap) when
+      it is the one still selected
+    - follows the newest row while scrolled to the bottom
+    """
+    row_selected = pyqtSignal(int)
+    overlay_ready = pyqtSignal(object)
+    overlay_failed = pyqtSignal(str)
+
+    def __init__(self, thumb_cache_mb=48, overlay_cache_mb=64, parent=None):
+        super().__init__(parent)
+        self.jobs = ImageJobs()
+        self.model = ResultsModel(self.jobs, thumb_cache_mb, self)
+        self.overlays = PixmapCache(overlay_cache_mb)
+        self.overlay_key = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        bar = QHBoxLayout()
+        self.filter = QComboBox()
+        self.filter.addItem("All", None)
+        self.summary = QLabel("")
+        bar.addWidget(QLabel("Show"))
+        bar.addWidget(self.filter)
+        bar.addStretch()
+        bar.addWidget(self.summary)
+        layout.addLayout(bar)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        # Fixed row heights: the view never measures rows it doesn't show
+        rows = self.table.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(THUMB_SIZE + 6)
+        rows.hide()
+        cols = self.table.horizontalHeader()
+        cols.setSectionResizeMode(QHeaderView.Interactive)
+        cols.setStretchLastSection(True)
+        self.table.setColumnWidth(ResultsModel.THUMB, THUMB_SIZE + 8)
+        self.table.setColumnWidth(ResultsModel.NUMBER, 60)
+        self.table.setColumnWidth(ResultsModel.FILE, 220)
+        self.table.setColumnWidth(ResultsModel.STATUS, 100)
+        layout.addWidget(self.table)
+
+        self.filter.currentIndexChanged.connect(self.on_filter_changed)
+        self.model.counts_changed.connect(self.update_counts)
+        self.model.rowsAboutToBeInserted.connect(self.remember_scroll)
+        self.model.rowsInserted.connect(self.follow)
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_changed)
+        self.jobs.done.connect(self.on_rendered)
+        self.jobs.failed.connect(self.on_failed)
+        self.at_bottom = True
+
+    # ---------------- ROWS ----------------
+    def add(self, path, file_name, status, detail=""):
+        self.model.add(path, file_name, status, detail)
+
+    def replace(self, rows):
+        self.overlays.clear()
+        self.model.replace(rows)
+
+    def clear(self):
+        self.overlays.clear()
+        self.overlay_key = None
+        self.model.clear()
+
+    def flush(self):
+        self.model.flush()
+
+    def has_selection(self):
+        return self.table.selectionModel().hasSelection()
+
+    def selected_row(self):
+        # Source row of the selection, or -1
+        index = self.table.currentIndex()
+        if not index.isValid() or not self.has_selection():
+            return -1
+        return self.model.source_row(index.row())
+
+    # ---------------- FILTER ----------------
+    def on_filter_changed(self, i):
+        source = self.selected_row()
+        self.model.set_filter(self.filter.itemData(i))
+        if source >= 0:
+            row = self.model.view_row(source)
+            if row >= 0:
+                self.table.selectRow(row)
+                self.table.scrollTo(self.model.index(row, 0))
+
+    def update_counts(self):
+        counts = self.model.counts
+        self.filter.blockSignals(True)
+        for status in sorted(counts):
+            if self.filter.findData(status) < 0:
+                self.filter.addItem(status, status)
+        for i in range(self.filter.count()):
+            status = self.filter.itemData(i)
+            n = len(self.model.rows) if status is None else counts.get(status, 0)
+            self.filter.setItemText(i, f"{status or 'All'} ({n})")
+        # Statuses a re-score removed
+        for i in range(self.filter.count() - 1, 0, -1):
+            if not counts.get(self.filter.itemData(i)) and i != self.filter.currentIndex():
+                self.filter.removeItem(i)
+        self.filter.blockSignals(False)
+        self.summary.setText(f"{self.model.rowCount()} shown")
+
+    # ---------------- SCROLL ----------------
+    def remember_scroll(self, *args):
+        bar = self.table.verticalScrollBar()
+        self.at_bottom = bar.value() >= bar.maximum() - 2
+
+    def follow(self, *args):
+        if self.at_bottom and not self.has_selection():
+            self.table.scrollToBottom()
+
+    # ---------------- OVERLAY ----------------
+    def on_current_changed(self, current, previous):
+        if current.isValid():
+            self.row_selected.emit(self.model.source_row(current.row()))
+
+    def show_overlay(self, key, job, size):
+        """
+        key identifies the render (path + whatever changes the drawing);
+        job() -> ndarray runs on the render thread
+        """
+        self.overlay_key = key
+        pix = self.overlays.get(key)
+        if pix is not None:
+            self.overlay_ready.emit(pix)
+            return
+        self.jobs.request(("overlay", key), job, size)
+
+    def on_rendered(self, key, qimg):
+        if key[0] != "overlay":
+            return
+        pix = QPixmap.fromImage(qimg)
+        self.overlays.put(key[1], pix)
+        if key[1] == self.overlay_key:
+            self.overlay_ready.emit(pix)
+
+    def on_failed(self, key, message):
+        if key[0] == "overlay" and key[1] == self.overlay_key:
+            self.overlay_failed.emit(message)
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from image_decode import split_page
+
+
+DEFAULT_DIR = "journals"
+
+
+def file_stamp(path):
+    # Size + mtime: a rewritten file is processed again on resume;
+    # a TIFF page ("scan.tif#2") is stamped by its file
+    st = os.stat(split_page(path)[0])
+    return [st.st_size, st.st_mtime_ns]
+
+
+class RunJournal:
+    """
+    Append-only record of finished files for one batch run
+    - one JSON line per file: {"path", "stamp", "result"}
+    - fsynced every sync_every entries, so a crash loses at most one chunk
+    - reopening the same journal skips files already recorded (same stamp)
+    - a torn last line from a crash is cut off before appending
+    """
+
+    def __init__(self, path, sync_every=16):
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self.unsynced = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.done = self._load()
+        self.f = open(path, "ab")
+
+    @classmethod
+    def for_run(cls, kind, paths, digest, root=DEFAULT_DIR, **kwargs):
+        """
+        Journal for (kind, input folders, settings digest)
+        - the same folders with the same settings resume the same journal
+        """
+        folders = sorted({os.path.dirname(os.path.abspath(p)) for p in paths})
+        h = hashlib.blake2b(digest_size=10)
+        h.update(json.dumps([kind, folders, digest]).encode("utf-8"))
+        return cls(os.path.join(root, f"{kind}_{h.hexdigest()}.jsonl"), **kwargs)
+
+    def _load(self):
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                done[rec["path"]] = rec
+                good += len(line)
+
+        if good < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        return done
+
+    def __len__(self):
+        return len(self.done)
+
+    # ---------------- RESUME ----------------
+    def result(self, path):
+        """
+        Recorded result for path, or None if it must be (re)processed
+        """
+        rec = self.done.get(os.path.abspath(path))
+        if rec is None:
+            return None
+        try:
+            if rec["stamp"] != file_stamp(path):
+                return None
+        except OSError:
+            return None
+        return rec["result"]
+
+    def unfinished(self, paths, on_done):
+        """
+        Lazy filter over streamed inputs
+        - yields paths still to process; on_done(path, result) for the rest
+        """
+        for p in paths:
+            result = self.result(p)
+            if result is None:
+                yield p
+            else:
+                on_done(p, result)
+
+    # ---------------- WRITE ----------------
+    def append(self, path, result):
+        try:
+            stamp = file_stamp(path)
+        except OSError:
+            stamp = None
+        rec = {"path": os.path.abspath(path), "stamp": stamp, "result": result}
+        self.f.write((json.dumps(rec) + "\n").encode("utf-8"))
+        self.done[rec["path"]] = rec
+
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        if self.f and self.unsynced:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        if self.f:
+            self.sync()
+            self.f.close()
+            self.f = None
+
+    def finish(self):
+        """
+        Run completed: keep the journal for audit, but stop resuming from it
+        """
+        self.close()
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        os.replace(self.path, f"{os.path.splitext(self.path)[0]}.{ts}.done.jsonl")
@@ -0,0 +1,224 @@
+import os
+import mmap
+import math
+import struct
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+from expected_store import normalize_key
+
+
+class BloomFilter:
+    """
+    File-backed Bloom filter (mmap)
+    - bits live in the page cache, so they survive a process restart
+    - header records (m, k); a mismatch means the file must be rebuilt
+    """
+
+    MAGIC = b"BLM1"
+    HEADER = struct.Struct("<4sQI")
+
+    def __init__(self, path, capacity, error_rate):
+        self.m = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.path = path
+
+        size = self.HEADER.size + (self.m + 7) // 8
+        self.fresh = not self._header_ok(size)
+
+        mode = "w+b" if self.fresh else "r+b"
+        self.f = open(path, mode)
+        if self.fresh:
+            self.f.truncate(size)
+            self.f.write(self.HEADER.pack(self.MAGIC, self.m, self.k))
+            self.f.flush()
+
+        self.mm = mmap.mmap(self.f.fileno(), size)
+        self.offset = self.HEADER.size
+
+    def _header_ok(self, size):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) != size:
+            return False
+        with open(self.path, "rb") as f:
+            magic, m, k = self.HEADER.unpack(f.read(self.HEADER.size))
+        return magic == self.MAGIC and m == self.m and k == self.k
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key):
+        mm, off = self.mm, self.offset
+        for pos in self._positions(key):
+            i = off + (pos >> 3)
+            mm[i] = mm[i] | (1 << (pos & 7))
+
+    def __contains__(self, key):
+        mm, off = self.mm, self.offset
+        return all(mm[off + (pos >> 3)] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def flush(self):
+        self.mm.flush()
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        self.f.close()
+
+
+class SeenStore:
+    """
+    Persistent "already seen?" set for serials / barcode values
+    - Bloom filter in front: unseen values never touch the disk index
+    - SQLite (WAL) behind it holds the exact set and first-seen details
+    - values are scoped, e.g. per lot, and normalized like expected values
+    """
+
+    def __init__(self, path, capacity=5_000_000, error_rate=1e-4, commit_every=500):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.commit_every = commit_every
+        self.uncommitted = 0
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " scope TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " first_seen TEXT NOT NULL,"
+            " source TEXT,"
+            " image TEXT,"
+            " PRIMARY KEY (scope, value)"
+            ") WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(seen)")}
+        if "image" not in columns:
+            self.db.execute("ALTER TABLE seen ADD COLUMN image TEXT")
+        self.db.commit()
+
+        self.bloom = BloomFilter(path + ".bloom", capacity, error_rate)
+        if self.bloom.fresh:
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        for scope, value in self.db.execute("SELECT scope, value FROM seen"):
+            self.bloom.add(self._key(scope, value))
+        self.bloom.flush()
+
+    def _key(self, scope, value):
+        return f"{scope}\x1f{value}"
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def _exists(self, scope, value):
+        if self._key(scope, value) not in self.bloom:
+            return False
+        row = self.db.execute(
+            "SELECT 1 FROM seen WHERE scope = ? AND value = ?",
+            (scope, value)
+        ).fetchone()
+        return row is not None
+
+    def seen(self, value, scope=""):
+        value = normalize_key(value)
+        with self.lock:
+            return self._exists(scope, value)
+
+    def check_and_add(self, value, scope="", source=""):
+        """
+        Record a value; True when it was already seen in this scope
+        """
+        value = normalize_key(value)
+        if not value:
+            return False
+
+        with self.lock:
+            if self._exists(scope, value):
+                return True
+            self._insert(scope, value, source)
+            return False
+
+    def check_values(self, values, scope="", source="", image=None):
+        """
+        Record every value read from one image; True when one of them was
+        first seen on another image
+        - values repeated on the label (QR + Code128) are checked once
+        - image is the content digest of the image; a hit first recorded
+          with the same digest, by any tool, is a re-run of that image,
+          not a duplicate. Without one every hit is a duplicate
+        """
+        keys = dict.fromkeys(k for k in map(normalize_key, values) if k)
+
+        duplicate = False
+        with self.lock:
+            for value in keys:
+                if not self._exists(scope, value):
+                    self._insert(scope, value, source, image)
+                    continue
+                first = self.db.execute(
+                    "SELECT image FROM seen WHERE scope = ? AND value = ?",
+                    (scope, value)
+                ).fetchone()
+                if not image or first[0] != image:
+                    duplicate = True
+        return duplicate
+
+    def _insert(self, scope, value, source, image=None):
+        self.db.execute(
+            "INSERT OR IGNORE INTO seen (scope, value, first_seen, source, image)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (scope, value, datetime.now().isoformat(timespec="seconds"), source, image)
+        )
+        self.bloom.add(self._key(scope, value))
+
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self._commit()
+
+    def first_seen(self, value, scope=""):
+        with self.lock:
+            return self.db.execute(
+                "SELECT first_seen, source FROM seen WHERE scope = ? AND value = ?",
+                (scope, normalize_key(value))
+            ).fetchone()
+
+    def _commit(self):
+        self.db.commit()
+        self.bloom.flush()
+        self.uncommitted = 0
+
+    def flush(self):
+        with self.lock:
+            self._commit()
+
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.db.close()
+            self.bloom.close()
+
+
+DEFAULT_PATH = os.path.join("seen", "seen_values.db")
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_store(path=DEFAULT_PATH):
+    """
+    One SeenStore per file per process, shared by every GUI page
+    """
+    path = os.path.abspath(path)
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = SeenStore(path)
+        return _shared[path]
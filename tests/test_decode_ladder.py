@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+import ocr_engine
+from ocr_engine import DECODE_LADDER, BarcodeEngine, BarcodeResult, Point, Rect
+
+
+class FakeBackend:
+    """
+    Reads only bright images (the "invert" rung of a black frame);
+    every call takes `delay` seconds
+    """
+    name = "fake"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def decode(self, gray, symbols=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if gray.mean() < 128:
+            return []
+        h, w = gray.shape[:2]
+        return [BarcodeResult(
+            b"SN0001", "CODE128", Rect(0, 0, w, h),
+            [Point(0, 0), Point(w, 0), Point(w, h), Point(0, h)]
+        )]
+
+
+@pytest.fixture
+def make_engine(monkeypatch):
+    def make(delay=0.0, **kwargs):
+        backend = FakeBackend(delay)
+        monkeypatch.setattr(ocr_engine, "make_barcode_backend", lambda name=None: backend)
+        return BarcodeEngine(use_localization=False, **kwargs), backend
+    return make
+
+
+def black(h=80, w=120):
+    return np.zeros((h, w), np.uint8)
+
+
+def test_unbounded_ladder_runs_every_rung(make_engine):
+    engine, backend = make_engine(ladder=("raw", "downscale", "otsu", "sharpen"))
+    assert engine.decode(black()) == ([], [])
+    assert backend.calls == 4
+    assert engine.ladder_stats["miss"] == 1
+
+
+def test_ladder_stops_at_the_first_read(make_engine):
+    engine, backend = make_engine()
+    results, _ = engine.decode(black())
+    assert results[0].data == b"SN0001"
+    assert backend.calls == DECODE_LADDER.index("invert") + 1
+    assert engine.ladder_stats["invert"] == 1
+    assert engine.ladder_by_hit_rate()[0] == "invert"
+
+
+def test_budget_cuts_the_ladder_short(make_engine):
+    engine, backend = make_engine(delay=0.05, budget_ms=75)
+    assert engine.decode(black()) == ([], [])
+    assert backend.calls == 2
+    assert engine.ladder_stats["budget"] == 1 and engine.ladder_stats["miss"] == 0
+
+
+def test_first_attempt_runs_even_over_budget(make_engine):
+    engine, backend = make_engine(delay=0.01, budget_ms=0)
+    engine.decode(black())
+    assert backend.calls == 1 and engine.ladder_stats["budget"] == 1
+
+
+def test_unknown_rung_is_rejected(make_engine):
+    engine, _ = make_engine()
+    with pytest.raises(ValueError):
+        engine.set_ladder(["raw", "deblur"])
@@ -0,0 +1,58 @@
+from expected_store import GS, ExpectedValueIndex, parse_gs1
+
+
+def test_plain_values_match_normalized():
+    index = ExpectedValueIndex(["J12B1-0001", "K7*"])
+    assert index.match(" j12b1 0001 ")
+    assert index.match("K7-99")
+    assert not index.match("J12B1-0002")
+
+
+def test_plain_value_starting_with_ai_digits_is_not_gs1():
+    assert parse_gs1("2112345") == {}
+    assert not ExpectedValueIndex(["12345"]).match("2112345")
+    assert not ExpectedValueIndex(["12345"]).match("1012345")
+    assert not ExpectedValueIndex(["A" * 14]).match("01" + "A" * 14)
+
+
+def test_plain_expected_value_is_not_indexed_per_ai():
+    index = ExpectedValueIndex(["2112345"])
+    assert index.ai_values == {}
+    assert not index.match("(21)12345")
+
+
+def test_gs1_forms_match_serial_list():
+    index = ExpectedValueIndex(["ABC123"])
+    assert index.match("(01)09501101530003(21)ABC123")
+    assert index.match("]C10109501101530003" + "21ABC123")
+    assert index.match("0109501101530003" + GS + "21ABC123")
+    assert not index.match("(01)09501101530003(21)ABC124")
+
+
+def test_gs1_expected_value_indexed_per_ai():
+    index = ExpectedValueIndex(["(01)09501101530003(21)ABC123"])
+    assert index.match("]d2" + "0109501101530003" + "21ABC123")
+
+
+
+def test_csv_header_is_skipped(tmp_path):
+    path = tmp_path / "serials.csv"
+    path.write_text("serial\nSN0001\nSN0002\n", encoding="utf-8")
+    index = ExpectedValueIndex.from_csv(str(path))
+    assert len(index) == 2
+    assert not index.match("serial")
+    assert index.match("SN0002")
+
+
+def test_csv_without_header_keeps_first_row(tmp_path):
+    path = tmp_path / "serials.txt"
+    path.write_text("SN0001\nSN0002\n", encoding="utf-8")
+    index = ExpectedValueIndex.load(str(path))
+    assert index.match("SN0001") and len(index) == 2
+
+
+def test_csv_named_column(tmp_path):
+    path = tmp_path / "order.csv"
+    path.write_text("line,serial\n1,SN0001\n2,SN0002\n", encoding="utf-8")
+    index = ExpectedValueIndex.from_csv(str(path), column="serial")
+    assert index.match("SN0001") and not index.match("1")
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from folder_scan import FolderScan, iter_images, known_total
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in ("IMG_1.jpg", "IMG_2.PNG", "notes.txt", "top_a.tif"):
+        (tmp_path / name).write_bytes(b"x")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "IMG_3.jpg").write_bytes(b"x")
+    return tmp_path
+
+
+def names(paths):
+    return sorted(os.path.basename(p) for p in paths)
+
+
+def test_images_only_and_subfolders_on_request(tree):
+    assert names(iter_images(str(tree))) == ["IMG_1.jpg", "IMG_2.PNG", "top_a.tif"]
+    assert "IMG_3.jpg" in names(iter_images(str(tree), recursive=True))
+
+
+def test_patterns_match_any(tree):
+    found = iter_images(str(tree), recursive=True, patterns=["IMG_*", "*_a.tif"])
+    assert names(found) == ["IMG_1.jpg", "IMG_2.PNG", "IMG_3.jpg", "top_a.tif"]
+    assert names(iter_images(str(tree), patterns=["*.jpg"])) == ["IMG_1.jpg"]
+
+
+def test_missing_folder_yields_nothing(tmp_path):
+    assert list(iter_images(str(tmp_path / "gone"))) == []
+
+
+def test_scan_can_be_iterated_again(tree):
+    scan = FolderScan(str(tree), recursive=True).start()
+    first = list(scan)
+    assert scan.done and len(first) == 4
+    assert list(scan) == first
+    assert known_total(scan) == 4
+    assert known_total(["a", "b"]) == 2 and known_total(iter([])) == 0
+
+
+def test_stopped_scan_ends(tree):
+    scan = FolderScan(str(tree), recursive=True)
+    scan.stop()
+    scan.start()
+    assert list(scan) == [] and scan.done
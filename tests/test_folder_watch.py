@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from folder_watch import FolderWatcher
+
+
+def drop(folder, name, data=b"image"):
+    path = folder / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_file_is_ready_once_it_settles(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0)
+    path = drop(tmp_path, "a.jpg")
+    drop(tmp_path, "notes.txt")
+    assert watcher.scan() == []          # first sighting starts the settle clock
+    assert watcher.scan() == [path]
+    assert watcher.scan() == []          # handed out once
+
+
+def test_growing_file_waits(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0)
+    path = drop(tmp_path, "a.jpg", b"part")
+    watcher.scan()
+    with open(path, "ab") as f:
+        f.write(b" more")
+    assert watcher.scan() == []
+    assert watcher.scan() == [path]
+
+
+def test_empty_file_is_not_ready(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0)
+    drop(tmp_path, "a.jpg", b"")
+    watcher.scan()
+    assert watcher.scan() == []
+
+
+def test_done_files_are_skipped(tmp_path):
+    done = drop(tmp_path, "done.jpg")
+    todo = drop(tmp_path, "todo.jpg")
+    watcher = FolderWatcher(str(tmp_path), settle=0, is_done=lambda p: p == done)
+    watcher.scan()
+    assert watcher.scan() == [todo]
+
+
+def test_rewritten_file_comes_back(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0, rescan=0)
+    path = drop(tmp_path, "a.jpg")
+    watcher.scan()
+    assert watcher.scan() == [path]
+    drop(tmp_path, "a.jpg", b"a new image")
+    watcher.scan()
+    assert watcher.scan() == [path]
+
+
+def test_removed_files_are_forgotten(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0, rescan=0)
+    path = drop(tmp_path, "a.jpg")
+    watcher.scan()
+    watcher.scan()
+    os.remove(path)
+    watcher.scan()
+    assert not watcher.yielded and not watcher.candidates
+
+
+def test_iteration_yields_new_files_until_stopped(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle=0.05, poll=0.02)
+    expected = [drop(tmp_path, f"{i}.jpg") for i in range(3)]
+    got = []
+
+    def consume():
+        for path in watcher:
+            got.append(path)
+            if len(got) == 3:
+                watcher.stop()
+
+    t = threading.Thread(target=consume)
+    t.start()
+    t.join(10)
+    assert not t.is_alive() and sorted(got) == sorted(expected)
@@ -0,0 +1,82 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_decode import ImageDecoder, content_digest, image_id, page_ids, split_page
+
+
+class Engine:
+    DECODE_SIDE = 500
+
+
+def write(folder, name, h, w):
+    path = str(folder / name)
+    img = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    cv2.imwrite(path, img)
+    return path
+
+
+def test_split_page():
+    assert split_page("scan.tif#3") == ("scan.tif", 3)
+    assert split_page("IMG#3.jpg") == ("IMG#3.jpg", None)
+    assert split_page("scan.tif") == ("scan.tif", None)
+
+
+def test_full_decode_by_default(tmp_path):
+    path = write(tmp_path, "a.jpg", 1200, 1600)
+    img = ImageDecoder().read(path)
+    assert img.shape == (1200, 1600, 3)
+
+
+def test_reduced_size_keeps_max_side(tmp_path):
+    path = write(tmp_path, "a.jpg", 1200, 1600)
+    decoder = ImageDecoder(max_side=400)
+    # 1600 / 4 = 400 is the smallest step that keeps the long side >= 400
+    assert decoder.read(path).shape == (300, 400, 3)
+    assert decoder.read(path).shape == (300, 400, 3)
+    assert decoder.stats["reduced"] == 2
+
+
+def test_small_file_in_a_large_folder_is_decoded_again(tmp_path):
+    write(tmp_path, "big.jpg", 1200, 1600)
+    small = write(tmp_path, "small.jpg", 300, 400)
+    decoder = ImageDecoder(max_side=400)
+    decoder.read(str(tmp_path / "big.jpg"))
+    assert decoder.read(small).shape == (300, 400, 3)
+    assert decoder.stats["redecoded"] == 1
+
+
+def test_grayscale_output(tmp_path):
+    path = write(tmp_path, "a.png", 60, 80)
+    assert ImageDecoder(grayscale=True, color_out=False).read(path).shape == (60, 80)
+    assert ImageDecoder(grayscale=True).read(path).shape == (60, 80, 3)
+
+
+def test_reduced_decode_is_opt_in_per_recipe():
+    assert ImageDecoder.for_engine(Engine(), {}).describe() is None
+    assert ImageDecoder.for_engine(Engine(), {"decode_max_side": 800}).max_side == 800
+    assert ImageDecoder.for_engine(Engine(), {"decode_max_side": "engine"}).max_side == 500
+
+
+def test_unreadable_file(tmp_path):
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not an image")
+    assert ImageDecoder().read(str(bad)) is None
+    assert ImageDecoder(max_side=100).read(str(bad)) is None
+
+
+def test_tiff_pages(tmp_path):
+    if not hasattr(cv2, "imcount"):
+        pytest.skip("OpenCV without imcount")
+    path = str(tmp_path / "scan.tif")
+    pages = [np.full((20, 30, 3), v, np.uint8) for v in (10, 200)]
+    cv2.imwritemulti(path, pages)
+    ids = page_ids(path)
+    assert ids == [f"{path}#0", f"{path}#1"]
+    assert ImageDecoder().read(ids[1])[0, 0, 0] == 200
+    assert content_digest(ids[0]) != content_digest(ids[1])
+
+
+def test_image_id_of_missing_file(tmp_path):
+    assert image_id(str(tmp_path / "gone.jpg")) is None
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from inference_server import Busy, Job, MicroBatcher, make_server, percentiles
+
+
+class Gate:
+    """
+    run_batch that records batch sizes; holds every batch until opened
+    """
+
+    def __init__(self, open_=True):
+        self.opened = threading.Event()
+        self.entered = threading.Event()
+        self.batches = []
+        if open_:
+            self.opened.set()
+
+    def __call__(self, jobs):
+        self.batches.append(len(jobs))
+        self.entered.set()
+        assert self.opened.wait(5)
+        return [job.img for job in jobs]
+
+
+def submit(lane, n, recipe=None):
+    jobs = [Job(i, recipe or {}) for i in range(n)]
+    lane.submit(jobs)
+    return jobs
+
+
+def wait(jobs):
+    for job in jobs:
+        assert job.done.wait(5)
+
+
+def test_one_request_is_one_batch():
+    gate = Gate()
+    lane = MicroBatcher("t", gate, max_batch=8, max_wait_ms=50)
+    jobs = submit(lane, 5)
+    wait(jobs)
+    assert gate.batches == [5]
+    assert [job.result for job in jobs] == list(range(5))
+    assert all(job.batch == 5 for job in jobs)
+
+
+def test_requests_arriving_within_max_wait_share_a_batch():
+    gate = Gate()
+    lane = MicroBatcher("t", gate, max_batch=8, max_wait_ms=200)
+    jobs = submit(lane, 2) + submit(lane, 3)
+    wait(jobs)
+    assert gate.batches == [5]
+
+
+def test_max_batch_splits_a_large_request():
+    gate = Gate()
+    lane = MicroBatcher("t", gate, max_batch=4, max_wait_ms=50)
+    wait(submit(lane, 10))
+    assert gate.batches == [4, 4, 2]
+    assert lane.metrics.counts["batches"] == 3
+
+
+def test_max_wait_flushes_a_partial_batch():
+    gate = Gate()
+    lane = MicroBatcher("t", gate, max_batch=8, max_wait_ms=1)
+    jobs = submit(lane, 1)
+    wait(jobs)
+    assert gate.batches == [1] and jobs[0].batch == 1
+
+
+def test_full_queue_rejects_the_whole_request():
+    gate = Gate(open_=False)
+    lane = MicroBatcher("t", gate, max_batch=1, max_wait_ms=0, max_queue=3)
+    running = submit(lane, 1)
+    assert gate.entered.wait(5)
+
+    queued = submit(lane, 2)
+    with pytest.raises(Busy):
+        submit(lane, 2)
+    assert lane.q.qsize() == 2
+    assert lane.metrics.counts["rejected"] == 1
+
+    gate.opened.set()
+    wait(running + queued)
+    assert [job.result for job in queued] == [0, 1]
+
+
+def test_engine_error_fails_every_job_in_the_batch():
+    def broken(jobs):
+        raise RuntimeError("engine down")
+
+    lane = MicroBatcher("t", broken, max_batch=4, max_wait_ms=50)
+    jobs = submit(lane, 3)
+    wait(jobs)
+    assert all(isinstance(job.error, RuntimeError) for job in jobs)
+    assert lane.metrics.counts["errors"] == 3
+
+
+def test_workers_drain_in_parallel():
+    both = threading.Barrier(2, timeout=5)
+
+    def run_batch(jobs):
+        both.wait()
+        return [job.img for job in jobs]
+
+    lane = MicroBatcher("t", run_batch, max_batch=1, max_wait_ms=0, workers=2)
+    jobs = submit(lane, 2)
+    wait(jobs)
+    assert all(job.error is None for job in jobs)
+
+
+def test_percentiles():
+    assert percentiles([]) == {"p50": None, "p95": None, "p99": None}
+    assert percentiles(list(range(100)), (50, 99)) == {"p50": 50, "p99": 99}
+
+
+class LaneService:
+    """
+    InferenceService stand-in: one lane, image bytes come back as text
+    """
+
+    def __init__(self, lane):
+        self.lane = lane
+
+    def ocr(self, images, recipe, source, named):
+        jobs = [Job(data.decode(), recipe) for data in images]
+        self.lane.submit(jobs)
+        wait(jobs)
+        return self.lane, [job.result for job in jobs]
+
+    barcode = ocr
+
+    def metrics(self):
+        return self.lane.metrics.snapshot()
+
+
+@pytest.fixture
+def server():
+    gate = Gate(open_=False)
+    lane = MicroBatcher("t", gate, max_batch=1, max_wait_ms=0, max_queue=1)
+    httpd = make_server(LaneService(lane), port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", gate, lane
+    gate.opened.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(url, body):
+    req = urllib.request.Request(f"{url}/ocr", data=body, method="POST")
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.status, json.loads(resp.read())
+
+
+def test_busy_lane_answers_429(server):
+    url, gate, lane = server
+    out = []
+    first = threading.Thread(target=lambda: out.append(post(url, b"A")))
+    first.start()
+    assert gate.entered.wait(5)
+    second = threading.Thread(target=lambda: out.append(post(url, b"B")))
+    second.start()
+    for _ in range(250):
+        if lane.q.qsize():
+            break
+        time.sleep(0.02)
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(url, b"C")
+    assert e.value.code == 429
+    assert e.value.headers["Retry-After"] == "1"
+
+    gate.opened.set()
+    first.join(5)
+    second.join(5)
+    assert sorted(r["results"][0] for _, r in out) == ["A", "B"]
@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from ocr_batch import OCRPipeline
+
+
+class FakeEngine:
+    """
+    Reads back the number written into each image
+    - fail_batch: run_batch raises; bad_value: to_records raises for it
+    """
+    engine_id = "FakeEngine"
+    DECODE_SIDE = None
+
+    def __init__(self, fail_batch=False, bad_value=None):
+        self.fail_batch = fail_batch
+        self.bad_value = bad_value
+        self.calls = 0
+
+    def apply_recipe(self, img, recipe):
+        return img
+
+    def run_batch(self, images):
+        self.calls += 1
+        if self.fail_batch:
+            raise RuntimeError("engine down")
+        return [int(img[0, 0, 0]) for img in images]
+
+    def to_records(self, result, shape):
+        if result == self.bad_value:
+            raise ValueError("bad result")
+        return [{"text": str(result)}]
+
+
+class DictCache(dict):
+    def get(self, key):
+        return dict.get(self, key)
+
+    def put(self, key, value):
+        self[key] = value
+
+    def flush(self):
+        pass
+
+
+def make_images(folder, n, copies=1):
+    paths = []
+    for i in range(n):
+        img = np.zeros((32, 32, 3), np.uint8)
+        img[0, 0, 0] = i
+        for c in range(copies):
+            path = str(folder / f"{i:02d}_{c}.png")
+            cv2.imwrite(path, img)
+            paths.append(path)
+    return paths
+
+
+def run(pipeline, paths):
+    out, errors = [], []
+    done = pipeline.run(
+        paths,
+        on_result=lambda path, records, img: out.append(records[0]["text"]),
+        on_error=lambda path, e: errors.append((path, e))
+    )
+    return done, out, errors
+
+
+def test_unreadable_file_is_reported_in_place(tmp_path):
+    paths = make_images(tmp_path, 3)
+    missing = str(tmp_path / "missing.png")
+    done, out, errors = run(OCRPipeline(FakeEngine(), {}), paths[:1] + [missing] + paths[1:])
+    assert done == 4 and out == ["0", "1", "2"]
+    assert [p for p, _ in errors] == [missing]
+
+
+def test_engine_failure_fails_its_files_not_the_run(tmp_path):
+    pipeline = OCRPipeline(FakeEngine(fail_batch=True), {}, batch_size=2)
+    done, out, errors = run(pipeline, make_images(tmp_path, 3))
+    assert done == 3 and not out and len(errors) == 3
+    assert pipeline.error is None
+
+
+def test_bad_result_fails_one_file(tmp_path):
+    done, out, errors = run(OCRPipeline(FakeEngine(bad_value=1), {}), make_images(tmp_path, 3))
+    assert out == ["0", "2"] and isinstance(errors[0][1], ValueError)
+
+
+def test_infer_stage_crash_sets_error(tmp_path):
+    pipeline = OCRPipeline(FakeEngine(), {})
+
+    def crash(item, shape):
+        raise MemoryError("no room")
+    pipeline.batcher.add = crash
+
+    done, out, errors = run(pipeline, make_images(tmp_path, 3))
+    assert isinstance(pipeline.error, MemoryError)
+    assert pipeline.stopped and not out
+
+
+def test_stop_abandons_the_rest(tmp_path):
+    pipeline = OCRPipeline(FakeEngine(), {}, batch_size=1)
+    seen = []
+
+    def on_result(path, records, img):
+        seen.append(path)
+        if len(seen) == 2:
+            pipeline.stop()
+
+    done = pipeline.run(make_images(tmp_path, 20), on_result)
+    assert done == 2 and pipeline.stopped
+
+
+def test_pause_holds_results_until_resume(tmp_path):
+    pipeline = OCRPipeline(FakeEngine(), {})
+    pipeline.pause()
+    out = []
+    worker = threading.Thread(
+        target=lambda: out.append(run(pipeline, make_images(tmp_path, 4)))
+    )
+    worker.start()
+    worker.join(0.5)
+    assert worker.is_alive() and pipeline.engine.calls == 0
+
+    pipeline.resume()
+    worker.join(5)
+    done, texts, _ = out[0]
+    assert done == 4 and texts == ["0", "1", "2", "3"]
+
+
+def test_identical_files_run_once_and_cache_serves_reruns(tmp_path):
+    paths = make_images(tmp_path, 3, copies=2)
+    cache = DictCache()
+    engine = FakeEngine()
+
+    pipeline = OCRPipeline(engine, {}, batch_size=8, cache=cache)
+    done, out, _ = run(pipeline, paths)
+    assert out == ["0", "0", "1", "1", "2", "2"]
+    assert pipeline.stats["misses"] == 3 and pipeline.stats["duplicates"] == 3
+
+    rerun = OCRPipeline(engine, {}, cache=cache)
+    images = []
+    rerun.run(paths, lambda path, records, img: images.append(img))
+    assert rerun.stats["hits"] + rerun.stats["duplicates"] == 6
+    assert rerun.stats["misses"] == 0 and all(img is None for img in images)
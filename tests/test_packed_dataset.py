@@ -0,0 +1,67 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from packed_dataset import PackedDataset, is_pack, pack_images
+
+
+def write_images(folder, shapes):
+    paths = []
+    for i, shape in enumerate(shapes):
+        img = np.random.default_rng(i).integers(0, 255, shape, dtype=np.uint8)
+        path = str(folder / f"{i}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def test_round_trip_keeps_pixels_and_order(tmp_path):
+    paths = write_images(tmp_path, [(20, 30, 3), (7, 5, 3), (40, 10, 3)])
+    out = str(tmp_path / "pack")
+    assert pack_images(paths, out) == 3
+    assert is_pack(out)
+
+    pack = PackedDataset(out)
+    assert len(pack) == 3 and pack.paths == paths
+    for path, img in pack:
+        assert np.array_equal(img, cv2.imread(path))
+        assert not img.flags.writeable
+    assert pack.describe() is None
+
+
+def test_unreadable_files_are_skipped(tmp_path):
+    paths = write_images(tmp_path, [(8, 8, 3)])
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"nope")
+    out = str(tmp_path / "pack")
+    assert pack_images([str(bad)] + paths, out) == 1
+    pack = PackedDataset(out)
+    assert pack.read(str(bad)) is None
+    assert pack.read(paths[0]).shape == (8, 8, 3)
+
+
+def test_grayscale_pack_as_decoder(tmp_path):
+    paths = write_images(tmp_path, [(16, 24, 3)])
+    out = str(tmp_path / "pack")
+    pack_images(paths, out, grayscale=True)
+
+    assert PackedDataset(out, color_out=False).read(paths[0]).shape == (16, 24)
+    pack = PackedDataset(out)
+    assert pack.read(paths[0]).shape == (16, 24, 3)
+    assert pack.describe() == {"max_side": None, "grayscale": True}
+    assert pack.reads == 1
+
+
+def test_empty_pack(tmp_path):
+    out = str(tmp_path / "pack")
+    assert pack_images([], out) == 0
+    assert len(PackedDataset(out)) == 0
+
+
+def test_interrupted_pack_is_not_a_pack(tmp_path):
+    paths = write_images(tmp_path, [(8, 8, 3)])
+    out = tmp_path / "pack"
+    pack_images(paths, str(out))
+    (out / "meta.json").unlink()
+    assert not is_pack(str(out))
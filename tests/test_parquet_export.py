@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import parquet_export
+from parquet_export import (
+    BARCODE_COLUMNS, OCR_BATCH_COLUMNS, ParquetRowWriter, export_rows, load
+)
+
+
+def test_typed_columns_and_nulls(tmp_path):
+    path = str(tmp_path / "batch.parquet")
+    rows = [
+        {"ts": "2026-10-01 08:00:00", "file_name": "a.jpg", "expected_count": 12,
+         "regex": "SN\\d+", "detected_count": 12, "regex_match": True, "duplicate": False,
+         "final_result": "OK", "raw_text": ["SN0001", "LOT 7"], "matches": ["SN0001"],
+         "decode_ms": 3.5, "infer_ms": 41.0},
+        {"ts": "2026-10-01 08:00:01", "file_name": "b.jpg", "expected_count": "",
+         "regex": "N/A", "detected_count": 3, "regex_match": False, "duplicate": True,
+         "final_result": "NOT_OK", "raw_text": [], "matches": []},
+    ]
+    assert export_rows(path, rows, OCR_BATCH_COLUMNS) == 2
+
+    table = load(path)
+    assert table.schema.field("expected_count").type == "int32"
+    assert str(table.schema.field("final_result").type).startswith("dictionary")
+    data = table.to_pylist()
+    assert data[0]["ts"] == datetime(2026, 10, 1, 8, 0)
+    assert data[0]["raw_text"] == ["SN0001", "LOT 7"]
+    assert data[1]["expected_count"] is None and data[1]["regex"] is None
+    assert data[1]["decode_ms"] is None and data[1]["duplicate"] is True
+
+
+def test_streamed_chunks_and_pushdown(tmp_path):
+    path = str(tmp_path / "barcode.parquet")
+    writer = ParquetRowWriter(path, BARCODE_COLUMNS, chunk=3)
+    for i in range(10):
+        writer.append({
+            "image": f"{i}.jpg", "values": [f"SN{i}"],
+            "status": "MATCH" if i % 4 else "NO BARCODE"
+        })
+    assert writer.count == 9 and len(writer.rows) == 1
+    writer.close()
+    assert writer.count == 10
+
+    table = load(path, columns=["image", "ts"], filters=[("status", "=", "NO BARCODE")])
+    assert table.column_names == ["image", "ts"]
+    assert table.column("image").to_pylist() == ["0.jpg", "4.jpg", "8.jpg"]
+    assert all(ts is not None for ts in table.column("ts").to_pylist())
+
+
+def test_without_pyarrow(monkeypatch, tmp_path):
+    monkeypatch.setattr(parquet_export, "pq", None)
+    assert not parquet_export.available()
+    with pytest.raises(RuntimeError):
+        ParquetRowWriter(str(tmp_path / "x.parquet"), BARCODE_COLUMNS)
@@ -0,0 +1,124 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from part_voting import PartCounter, PartPresence, PartVoter, SceneChangeDetector
+
+
+def frame(level):
+    return np.full((120, 160), level, dtype=np.uint8)
+
+
+def test_agreeing_reads_lock_one_verdict():
+    voter = PartVoter(window=5, agree=3)
+    assert voter.add("MATCH", "SN1") is None
+    assert voter.add("NOT MATCH", "SN9") is None
+    assert voter.add("MATCH", "SN1") is None
+    verdict = voter.add("MATCH", "SN1")
+    assert verdict == {"status": "MATCH", "value": "SN1", "votes": 3, "frames": 4}
+    assert voter.locked and voter.add("MATCH", "SN1") is None
+
+
+def test_frames_without_a_read_are_not_votes():
+    voter = PartVoter(window=5, agree=3)
+    for _ in range(10):
+        assert voter.add("NO BARCODE", None) is None
+    assert not voter.locked
+
+
+def test_no_read_resets_instead_of_locking():
+    voter = PartVoter(window=5, agree=3)
+    verdict = voter.no_read()
+    assert verdict["status"] == "NO BARCODE" and verdict["value"] is None
+    assert not voter.locked and not voter.frames
+
+
+def test_conflicting_reads_leave_undecided():
+    voter = PartVoter(window=5, agree=3)
+    voter.add("MATCH", "SN1")
+    voter.add("NOT MATCH", "SN9")
+    verdict = voter.no_read()
+    assert verdict["status"] == "UNDECIDED" and verdict["frames"] == 2
+    assert not voter.frames
+
+
+def test_vote_agree_must_fit_window():
+    with pytest.raises(ValueError):
+        PartVoter(window=3, agree=4)
+
+
+def test_scene_change_detector():
+    scene = SceneChangeDetector(threshold=10)
+    assert scene.changed(frame(50))
+    scene.set_reference(frame(50))
+    assert not scene.changed(frame(55))
+    assert scene.changed(frame(90))
+
+
+def test_empty_belt_gives_no_part():
+    presence = PartPresence(threshold=10, settle=3, min_frames=2)
+    assert not any(presence.update(frame(20)) for _ in range(50))
+
+
+def test_part_leaving_unread_is_reported_once():
+    presence = PartPresence(threshold=10, settle=3, min_frames=2)
+    for _ in range(5):
+        presence.update(frame(20))
+    assert not presence.learning
+
+    assert not any(presence.update(frame(120)) for _ in range(4))
+    assert presence.update(frame(20))
+    assert not presence.update(frame(20))
+
+
+def test_flicker_shorter_than_min_frames_is_ignored():
+    presence = PartPresence(threshold=10, settle=3, min_frames=3)
+    for _ in range(5):
+        presence.update(frame(20))
+    presence.update(frame(120))
+    assert not presence.update(frame(20))
+
+
+def settle(presence, level, n=5):
+    return [presence.update(frame(level)) for _ in range(n)]
+
+
+def test_decided_part_leaving_is_not_reported():
+    presence = PartPresence(threshold=10, settle=3, min_frames=2)
+    settle(presence, 20)
+    settle(presence, 120)
+    presence.decided()
+    assert not any(settle(presence, 20))
+
+
+def test_indexed_parts_without_empty_belt_between():
+    # Start on an empty belt, then parts index in back to back and rest
+    presence = PartPresence(threshold=10, settle=3, min_frames=2)
+    settle(presence, 20)
+    assert not any(settle(presence, 120))
+    assert sum(settle(presence, 200)) == 1
+    presence.decided()
+    assert not any(settle(presence, 60))
+    assert sum(settle(presence, 20)) == 1
+
+
+def test_back_to_back_flow_closes_on_max_frames():
+    presence = PartPresence(threshold=10, settle=3, min_frames=2, max_frames=6)
+    settle(presence, 20)
+    # Moving parts: every frame differs from the last, never the empty scene
+    moving = [presence.update(frame(100 + (i % 2) * 40)) for i in range(12)]
+    assert sum(moving) == 2
+
+
+def test_empty_scene_follows_lighting_drift():
+    presence = PartPresence(threshold=10, settle=3, min_frames=2)
+    for level in (20, 26, 32, 38, 44):
+        assert not any(settle(presence, level))
+
+
+def test_part_ids_are_unique_across_sessions():
+    first, second = PartCounter(), PartCounter()
+    second.session = "other"
+    assert first.next() != second.next()
+    assert first.next().endswith("-2")
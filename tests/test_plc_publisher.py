@@ -0,0 +1,50 @@
+from plc_publisher import (
+    FRAME_LENGTH, TYPE_HEARTBEAT, TYPE_VERDICT,
+    decode_frame, decode_registers, encode_frame, verdict_registers
+)
+
+VERDICT = ("part 7", "MATCH", 0, 12500, {"value": "SN0007", "line": "L2"})
+
+
+def body(frame):
+    (n,) = FRAME_LENGTH.unpack_from(frame)
+    assert len(frame) == FRAME_LENGTH.size + n
+    return frame[FRAME_LENGTH.size:]
+
+
+def test_verdict_frame_round_trip():
+    msg = decode_frame(body(encode_frame(42, 1_700_000_000_000_000, TYPE_VERDICT, VERDICT)))
+    assert msg["type"] == TYPE_VERDICT and msg["seq"] == 42
+    assert msg["ts_us"] == 1_700_000_000_000_000
+    assert msg["part"] == "part 7" and msg["status"] == "PASS"
+    assert msg["infer_us"] == 12500 and not msg["duplicate"]
+    assert msg["fields"] == {"value": "SN0007", "line": "L2"}
+
+
+def test_heartbeat_frame():
+    msg = decode_frame(body(encode_frame(3, 99)))
+    assert msg == {"type": TYPE_HEARTBEAT, "seq": 3, "ts_us": 99}
+
+
+def test_duplicate_is_never_pass_on_the_wire():
+    dup = ("part 8", "MATCH", 1, 0, {"value": "SN0007"})
+    msg = decode_frame(body(encode_frame(1, 0, TYPE_VERDICT, dup)))
+    assert msg["status"] == "FAIL" and msg["duplicate"]
+
+    regs = decode_registers(verdict_registers(1, ("part 8", "OK", 1, 0, {})))
+    assert regs["status"] == "FAIL" and regs["duplicate"]
+
+
+def test_register_block_round_trip():
+    regs = verdict_registers(70000, VERDICT, part_regs=4, value_regs=8)
+    assert len(regs) == 5 + 4 + 8
+    msg = decode_registers(regs, part_regs=4, value_regs=8)
+    assert msg["seq"] == 70000 & 0xFFFF
+    assert msg["status"] == "PASS" and msg["infer_us"] == 12500
+    assert msg["part"] == "part 7" and msg["value"] == "SN0007"
+
+
+def test_no_barcode_and_unknown_status():
+    assert decode_registers(verdict_registers(1, ("p", "NO BARCODE", 0, 0, {})))["status"] == "NO_READ"
+    assert decode_registers(verdict_registers(1, ("p", "NO_READ", 0, 0, {})))["status"] == "NO_READ"
+    assert decode_registers(verdict_registers(1, ("p", "???", 0, 0, {})))["status"] == "UNKNOWN"
@@ -0,0 +1,33 @@
+from result_cache import ResultCache, cache_key, config_digest, file_digest
+
+
+def test_validation_keys_do_not_change_the_digest():
+    base = {"brightness": 10, "regex": "SN\\d+", "lot": "A"}
+    assert config_digest(base) == config_digest({**base, "regex": "X", "lot": "B"})
+    assert config_digest(base) != config_digest({**base, "brightness": 11})
+
+
+def test_file_digest_follows_content(tmp_path):
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+    assert file_digest(str(a)) == file_digest(str(b))
+    b.write_bytes(b"other")
+    assert file_digest(str(a)) != file_digest(str(b))
+
+
+def test_put_get_and_stats(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    key = cache_key("content", "cfg", "BarcodeEngine")
+    assert cache.get(key) is None
+    cache.put(key, ["SN0001"])
+    assert cache.get(key) == ["SN0001"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResultCache(path)
+    cache.put("k", {"records": []})
+    cache.close()
+    assert ResultCache(path).get("k") == {"records": []}
@@ -0,0 +1,79 @@
+import csv
+from datetime import datetime, timedelta
+
+import pytest
+
+import results_store
+from results_store import ResultsStore, parse_time
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.add("barcode_cli", "a.jpg", "MATCH", ["SN1"], lot="L1", recipe="r1",
+              engine="BarcodeEngine:zbar", payload={"path": "/x/a.jpg"})
+    store.add("barcode_cli", "b.jpg", "NOT MATCH", ["SN2", "SN3"], lot="L1", recipe="r1")
+    store.add("ocr_cli", "IMG_c.jpg", "NOT_OK", [], lot="L2", duplicate=True)
+    store.add("ocr_live", "frame 1", "OK", ["SN1"], lot="L2")
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_filters(store):
+    assert store.count() == 4
+    assert store.count(lot="L1") == 2
+    assert store.count(status="NOT MATCH") == 1
+    assert store.count(mode="ocr_cli", lot="L2") == 1
+    assert store.count(recipe="r1", status="MATCH") == 1
+    assert store.count(source="IMG_%") == 1
+
+
+def test_value_lookup_spans_modes(store):
+    rows = store.query(value="SN1")
+    assert sorted(r["mode"] for r in rows) == ["barcode_cli", "ocr_live"]
+    assert store.count(value="SN3") == 1
+
+
+def test_row_contents(store):
+    row, = store.query(source="a.jpg")
+    assert row["values"] == ["SN1"] and row["payload"] == {"path": "/x/a.jpg"}
+    assert row["engine"] == "BarcodeEngine:zbar" and row["duplicate"] is False
+    dup, = store.query(status="NOT_OK")
+    assert dup["duplicate"] is True and dup["values"] == [] and dup["payload"] is None
+
+
+def test_order_and_limit(store):
+    newest = store.query(limit=2)
+    assert [r["source"] for r in newest] == ["frame 1", "IMG_c.jpg"]
+    oldest = store.query(limit=1, oldest_first=True)
+    assert oldest[0]["source"] == "a.jpg"
+
+
+def test_time_window(store):
+    assert store.count(since=parse_time("1h")) == 4
+    assert store.count(until=parse_time("1h")) == 0
+    tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
+    assert store.count(since=tomorrow) == 0
+
+
+def test_parse_time():
+    assert parse_time("2026-10-01") == "2026-10-01 00:00:00.000"
+    ago = datetime.fromisoformat(parse_time("30m"))
+    assert timedelta(minutes=29) < datetime.now() - ago < timedelta(minutes=31)
+
+
+def test_cli_count_and_csv(store, tmp_path, capsys):
+    db = store.path
+    assert results_store.main(["count", "--db", db, "--lot", "L1"]) == 0
+    assert capsys.readouterr().out.strip() == "2"
+
+    out = str(tmp_path / "hits.csv")
+    assert results_store.main(["query", "--db", db, "--value", "SN2", "--csv", out]) == 0
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["source"], r["values"]) for r in rows] == [("b.jpg", "SN2;SN3")]
+
+
+def test_cli_missing_database(tmp_path):
+    assert results_store.main(["count", "--db", str(tmp_path / "none.db")]) == 1
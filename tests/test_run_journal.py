@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from run_journal import RunJournal
+
+
+def make_files(tmp_path, n):
+    paths = []
+    for i in range(n):
+        p = tmp_path / f"{i}.jpg"
+        p.write_bytes(b"x" * (i + 1))
+        paths.append(str(p))
+    return paths
+
+
+def test_reopened_journal_skips_recorded_files(tmp_path):
+    paths = make_files(tmp_path, 3)
+    journal = RunJournal(str(tmp_path / "j.jsonl"))
+    journal.append(paths[0], {"status": "OK"})
+    journal.close()
+
+    journal = RunJournal(str(tmp_path / "j.jsonl"))
+    replayed = []
+    todo = list(journal.unfinished(paths, lambda p, r: replayed.append((p, r))))
+    assert todo == paths[1:]
+    assert replayed == [(paths[0], {"status": "OK"})]
+
+
+def test_rewritten_file_is_processed_again(tmp_path):
+    paths = make_files(tmp_path, 1)
+    journal = RunJournal(str(tmp_path / "j.jsonl"))
+    journal.append(paths[0], {"status": "OK"})
+    with open(paths[0], "wb") as f:
+        f.write(b"new content")
+    assert journal.result(paths[0]) is None
+
+
+def test_torn_last_line_is_cut_off(tmp_path):
+    paths = make_files(tmp_path, 2)
+    path = str(tmp_path / "j.jsonl")
+    journal = RunJournal(path)
+    journal.append(paths[0], {"status": "OK"})
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"path": "torn')
+
+    journal = RunJournal(path)
+    assert len(journal) == 1
+    journal.append(paths[1], {"status": "NOT_OK"})
+    journal.close()
+    assert len(RunJournal(path)) == 2
+
+
+def test_finish_retires_the_journal(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    journal = RunJournal(path)
+    journal.finish()
+    assert not os.path.exists(path)
+    assert any(name.endswith(".done.jsonl") for name in os.listdir(tmp_path))
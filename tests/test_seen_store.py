@@ -0,0 +1,64 @@
+from seen_store import SeenStore
+
+
+def make_store(tmp_path):
+    return SeenStore(str(tmp_path / "seen.db"), capacity=1000)
+
+
+def test_check_and_add_flags_second_sighting(tmp_path):
+    store = make_store(tmp_path)
+    assert not store.check_and_add("SN-0001", "LOT1", "ocr_live")
+    assert store.check_and_add("sn 0001", "LOT1", "ocr_live")
+    assert not store.check_and_add("SN-0001", "LOT2", "ocr_live")
+    assert len(store) == 2
+
+
+def test_same_value_twice_on_one_label_is_not_a_duplicate(tmp_path):
+    store = make_store(tmp_path)
+    assert not store.check_values(["SN0001", "SN-0001"], "LOT1", "barcode_cli:a.jpg", "d1")
+
+
+def test_rerun_of_same_image_is_not_a_duplicate(tmp_path):
+    store = make_store(tmp_path)
+    assert not store.check_values(["SN0001"], "LOT1", "barcode_batch:a.jpg", "d1")
+    assert not store.check_values(["SN0001"], "LOT1", "barcode_cli:a.jpg", "d1")
+
+
+def test_same_name_different_image_is_a_duplicate(tmp_path):
+    store = make_store(tmp_path)
+    assert not store.check_values(["SN0001"], "LOT1", "barcode_cli:line1/a.jpg", "d1")
+    assert store.check_values(["SN0001"], "LOT1", "barcode_cli:line2/a.jpg", "d2")
+
+
+def test_no_image_id_gets_no_exemption(tmp_path):
+    store = make_store(tmp_path)
+    assert not store.check_values(["SN0001"], "LOT1", "barcode_api:10.0.0.5")
+    assert store.check_values(["SN0001"], "LOT1", "barcode_api:10.0.0.5")
+
+
+def test_store_survives_reopen(tmp_path):
+    store = make_store(tmp_path)
+    store.check_values(["SN0001"], "LOT1", "barcode_cli:a.jpg", "d1")
+    store.close()
+
+    store = make_store(tmp_path)
+    assert store.seen("SN0001", "LOT1")
+    assert store.first_seen("SN0001", "LOT1")[1] == "barcode_cli:a.jpg"
+    assert not store.check_values(["SN0001"], "LOT1", "barcode_cli:a.jpg", "d1")
+    assert store.check_values(["SN0001"], "LOT1", "barcode_cli:b.jpg", "d2")
+
+
+def test_old_table_gets_the_image_column(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "seen.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE seen (scope TEXT NOT NULL, value TEXT NOT NULL,"
+        " first_seen TEXT NOT NULL, source TEXT, PRIMARY KEY (scope, value)) WITHOUT ROWID"
+    )
+    db.execute("INSERT INTO seen VALUES ('LOT1', 'SN0001', '2024-01-01T00:00:00', 'x:a.jpg')")
+    db.commit()
+    db.close()
+
+    store = SeenStore(path, capacity=1000)
+    assert store.check_values(["SN0001"], "LOT1", "barcode_cli:a.jpg", "d1")
@@ -0,0 +1,85 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from ocr_batch import OCRPipeline, ShapeBatcher
+
+
+class ShapeEngine:
+    """
+    Reads back the number written into each image; records the batches
+    """
+    engine_id = "ShapeEngine"
+    DECODE_SIDE = None
+
+    def __init__(self):
+        self.batches = []
+
+    def apply_recipe(self, img, recipe):
+        return img
+
+    def run_batch(self, images):
+        self.batches.append([img.shape[:2] for img in images])
+        return [int(img[0, 0, 0]) for img in images]
+
+    def to_records(self, result, shape):
+        return [{"text": str(result)}]
+
+
+def test_same_shape_fills_one_bucket():
+    batcher = ShapeBatcher(max_batch=3, budget_mb=0)
+    assert batcher.add("a", (100, 200, 3)) is None
+    assert batcher.add("b", (100, 200, 3)) is None
+    assert batcher.add("c", (100, 200, 3)) == ["a", "b", "c"]
+    assert not batcher.buckets
+
+
+def test_aspect_and_size_get_separate_buckets():
+    batcher = ShapeBatcher(max_batch=8, budget_mb=0)
+    batcher.add("wide", (100, 400, 3))
+    batcher.add("tall", (400, 100, 3))
+    batcher.add("big", (1000, 4000, 3))
+    assert len(batcher.buckets) == 3
+
+
+def test_memory_budget_caps_large_frames():
+    batcher = ShapeBatcher(max_batch=16, budget_mb=1)
+    assert batcher.limit((1000, 1000, 3)) == 1
+    assert batcher.limit((100, 100, 3)) == 16
+    assert ShapeBatcher(max_batch=4, by_shape=False).limit((1000, 1000, 3)) == 4
+
+
+def test_take_and_drain():
+    batcher = ShapeBatcher(max_batch=8, budget_mb=0)
+    first, second = object(), object()
+    batcher.add(first, (100, 100))
+    batcher.add(second, (100, 400))
+    assert batcher.take(first) == [first]
+    assert batcher.take(first) is None
+    assert list(batcher.drain()) == [[second]]
+
+
+def test_pipeline_restores_input_order(tmp_path):
+    # Two shapes interleaved: buckets run out of order, results must not
+    paths = []
+    for i in range(12):
+        shape = (40, 160, 3) if i % 2 else (120, 120, 3)
+        img = np.zeros(shape, np.uint8)
+        img[0, 0, 0] = i
+        path = str(tmp_path / f"{i:02d}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+
+    engine = ShapeEngine()
+    pipeline = OCRPipeline(
+        engine, {}, workers=3, batcher=ShapeBatcher(max_batch=4, budget_mb=0)
+    )
+    out = []
+    done = pipeline.run(paths, lambda path, records, img: out.append((path, records)))
+
+    assert done == 12
+    assert [p for p, _ in out] == paths
+    assert [r[0]["text"] for _, r in out] == [str(i) for i in range(12)]
+    # Every engine batch held a single shape
+    assert all(len(set(batch)) == 1 for batch in engine.batches)